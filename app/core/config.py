@@ -21,7 +21,54 @@ class Settings(BaseSettings):
     log_structured: bool = False  # Set True for JSON logs in production
 
     # Vector store configuration
-    vector_store_type: str = "faiss"  # Options: faiss, pinecone
+    vector_store_type: str = "faiss"  # Options: faiss, faiss_sharded, pinecone
+
+    # FAISS index layout (only if vector_store_type=faiss or faiss_sharded)
+    faiss_index_type: str = "auto"  # Options: auto, flat, ivf, hnsw
+    faiss_nprobe: int = 16  # IVF lists probed per query
+    faiss_ef_search: int = 64  # HNSW candidate list size per query
+    faiss_hnsw_m: int = 32  # HNSW graph degree
+    faiss_mmap: bool = False  # Map index read-only (shared across workers)
+    faiss_quantization: str = "none"  # Options: none, sq8, pq
+    faiss_rerank_factor: int = 4  # Candidates re-ranked per result (0 = off)
+    faiss_truncate_dim: int = 0  # First-pass dims, e.g. 256/512 (0 = full)
+    faiss_num_shards: int = 4  # Shard indexes (only if faiss_sharded)
+    faiss_wal: bool = True  # Log writes instead of re-saving the whole index
+    faiss_wal_compact_bytes: int = 64 * 1024 * 1024  # Snapshot past this log size
+    index_gc_grace_seconds: int = 600  # Keep superseded index versions
+
+    # Lexical and hybrid search (FAISS stores)
+    bm25_k1: float = 1.2  # BM25 term frequency saturation
+    bm25_b: float = 0.75  # BM25 document length normalisation
+    hybrid_rrf_k: int = 60  # Reciprocal rank fusion offset
+    hybrid_fetch_k: int = 50  # Candidates per ranking fused in hybrid mode
+    search_embedding_timeout: float = 5.0  # Seconds before falling back to BM25
+    mmr_fetch_k: int = 20  # Candidates considered by MMR re-ranking
+
+    # Query embedding cache (LRU in memory, optional SQLite tier per host)
+    query_cache_size: int = 1024  # Queries kept in memory (0 = off)
+    query_cache_ttl: float = 86_400  # Seconds a query embedding is reused
+    query_cache_disk: bool = False  # Share via .index/query_cache.sqlite
+
+    # Retriever query rewrite cache (LRU over .index/rewrite_cache.sqlite)
+    rewrite_cache_size: int = 1024  # Rewrites kept in memory (0 = off)
+    rewrite_cache_disk: bool = True  # Persist rewrites across restarts
+    rewrite_cache_ttl: float = 86_400  # Seconds rewrites of old prompts are kept
+
+    # Near-duplicate chunks collapsed at ingest (Jaccard of word 5-grams)
+    dedup_threshold: float = 0.9  # Min similarity to collapse (0 = off)
+
+    # Embedding cache for ingestion (.index/embedding_cache/)
+    embedding_cache: bool = True  # Reuse embeddings of unchanged chunk texts
+    embedding_cache_dtype: str = "float32"  # Options: float32, float16 (half size)
+
+    # Bulk embedding during ingestion
+    embedding_batch_tokens: int = 100_000  # Tokens per embeddings call
+    embedding_concurrency: int = 4  # Embeddings calls in flight
+    embedding_tokens_per_minute: int = 1_000_000  # API budget (0 = unlimited)
+    embedding_requests_per_minute: int = 3_000  # API budget (0 = unlimited)
+    embedding_max_retries: int = 5  # Retries of a rate-limited or failed call
+    upsert_concurrency: int = 4  # Upsert calls in flight (Pinecone)
 
     # Pinecone (optional, only if vector_store_type=pinecone)
     pinecone_api_key: str | None = None
@@ -0,0 +1,134 @@
+"""Single-flight coalescing of concurrent identical calls.
+
+When several requests embed the same query, or rewrite the same query,
+at the same moment, only the first caller (the leader) makes the API
+call. The others wait for it and share its result, or its exception.
+Once the call finishes, the next identical request makes a new call,
+so nothing is cached here.
+
+Works for threads (do) and for asyncio tasks (ado); the two are
+coalesced separately.
+"""
+
+import asyncio
+import threading
+from collections.abc import Awaitable, Callable, Hashable
+from dataclasses import dataclass, replace
+from typing import TypeVar
+
+T = TypeVar("T")
+
+_registry: dict[str, "SingleFlight"] = {}
+_registry_lock = threading.Lock()
+
+
+@dataclass
+class FlightStats:
+    """Single-flight counters."""
+
+    calls: int = 0  # Calls made (one per in-flight key)
+    coalesced: int = 0  # Callers that shared another caller's call
+
+    def to_dict(self) -> dict:
+        return {"calls": self.calls, "coalesced": self.coalesced}
+
+
+class _Flight:
+    """A call in progress on a thread."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one call."""
+
+    def __init__(self, name: str):
+        """Create a group and register it for singleflight_stats().
+
+        Args:
+            name: Name reported by singleflight_stats()
+        """
+        self.name = name
+        self.stats = FlightStats()
+        self._lock = threading.Lock()
+        self._flights: dict[Hashable, _Flight] = {}
+        self._tasks: dict[tuple[int, Hashable], asyncio.Future] = {}
+        with _registry_lock:
+            _registry[name] = self
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> T:
+        """Call fn, or wait for the call already in flight for key.
+
+        Args:
+            key: Identity of the call (e.g. model and normalised input)
+            fn: Makes the call
+
+        Returns:
+            Result of the (shared) call; its exception is raised to all
+            waiting callers
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.stats.calls += 1
+            else:
+                self.stats.coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = fn()
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    async def ado(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """Async variant of do().
+
+        The call runs as its own task, so a caller that is cancelled (a
+        search timing out, say) does not cancel it for the others.
+        """
+        task_key = (id(asyncio.get_running_loop()), key)
+        with self._lock:
+            task = self._tasks.get(task_key)
+            if task is None:
+                task = asyncio.ensure_future(fn())
+                self._tasks[task_key] = task
+                task.add_done_callback(lambda done: self._forget(task_key, done))
+                self.stats.calls += 1
+            else:
+                self.stats.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _forget(self, task_key: tuple[int, Hashable], task: asyncio.Future) -> None:
+        with self._lock:
+            if self._tasks.get(task_key) is task:
+                del self._tasks[task_key]
+        if not task.cancelled():
+            task.exception()  # Retrieved, even if every caller gave up
+
+    def snapshot(self) -> FlightStats:
+        """Copy of the counters."""
+        with self._lock:
+            return replace(self.stats)
+
+
+def singleflight_stats() -> dict[str, FlightStats]:
+    """Counters of every single-flight group, by name."""
+    with _registry_lock:
+        groups = list(_registry.values())
+    return {group.name: group.snapshot() for group in groups}
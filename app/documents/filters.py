@@ -0,0 +1,300 @@
+"""Metadata filter language, compiled once per query.
+
+Filters are dicts in the MongoDB/Pinecone style:
+
+    {"industry": "fintech"}                        # exact match ($eq)
+    {"industry": {"$in": ["fintech", "saas"]}}     # membership
+    {"deal_value": {"$gte": 50_000, "$lt": 250_000}}
+    {"outcome": {"$ne": "lost"}, "date": {"$gte": "2024-01-01"}}
+    {"$or": [{"doc_type": "deal"}, {"tags": "pricing"}]}
+
+Fields of one dict are ANDed. On list fields (tags) a condition matches
+if any element matches, $ne/$nin match if no element does, and an
+empty list counts as missing (null).
+
+parse_filters() validates a dict and compiles it into a small tree of
+Condition / AllOf / AnyOf nodes. Backends evaluate the tree natively:
+FAISS as NumPy masks over its columnar metadata (see select_rows) and
+Pinecone as native filter operators (see to_pinecone).
+"""
+
+from collections.abc import Callable
+from dataclasses import dataclass
+from enum import Enum
+from functools import reduce
+from typing import Any, Protocol
+
+import numpy as np
+
+
+class FilterOp(str, Enum):
+    """Comparison operators."""
+
+    EQ = "$eq"
+    NE = "$ne"
+    IN = "$in"
+    NIN = "$nin"
+    GT = "$gt"
+    GTE = "$gte"
+    LT = "$lt"
+    LTE = "$lte"
+
+
+# Operators answerable from an inverted index (posting lists)
+POSTING_OPS = (FilterOp.EQ, FilterOp.IN)
+# Operators whose match is the complement of a positive operator
+NEGATED_OPS = {FilterOp.NE: FilterOp.EQ, FilterOp.NIN: FilterOp.IN}
+RANGE_OPS = (FilterOp.GT, FilterOp.GTE, FilterOp.LT, FilterOp.LTE)
+
+COMPARE: dict[FilterOp, Callable[[Any, Any], bool]] = {
+    FilterOp.GT: lambda a, b: a > b,
+    FilterOp.GTE: lambda a, b: a >= b,
+    FilterOp.LT: lambda a, b: a < b,
+    FilterOp.LTE: lambda a, b: a <= b,
+}
+
+
+# =============================================================================
+# Compiled Filter
+# =============================================================================
+
+
+@dataclass(frozen=True)
+class Condition:
+    """`field <op> value` for one metadata field."""
+
+    field: str
+    op: FilterOp
+    value: Any
+
+    @property
+    def values(self) -> tuple:
+        """Operand as a tuple ($in/$nin lists, or the single value)."""
+        if self.op in (FilterOp.IN, FilterOp.NIN):
+            return tuple(self.value)
+        return (self.value,)
+
+    @property
+    def positive(self) -> "Condition":
+        """The condition without negation ($ne -> $eq, $nin -> $in)."""
+        return Condition(self.field, NEGATED_OPS.get(self.op, self.op), self.value)
+
+    def matches(self, value: Any) -> bool:
+        """Evaluate the condition on a metadata value (scalar or list)."""
+        if not isinstance(value, list):
+            return self.test(value)
+        if not value:  # an empty list counts as missing
+            return self.test(None)
+        hit = any(self.positive.test(item) for item in value)
+        return not hit if self.op in NEGATED_OPS else hit
+
+    def test(self, value: Any) -> bool:
+        """Evaluate the condition on one scalar value (None = missing)."""
+        if self.op in NEGATED_OPS:
+            return not self.positive.test(value)
+        if self.op in POSTING_OPS:
+            return value in self.values
+        if value is None or isinstance(value, bool) != isinstance(self.value, bool):
+            return False
+        try:
+            return COMPARE[self.op](value, self.value)
+        except TypeError:  # e.g. string field compared with a number
+            return False
+
+
+@dataclass(frozen=True)
+class AllOf:
+    """Conjunction, children ordered cheapest first."""
+
+    children: tuple["FilterNode", ...]
+
+
+@dataclass(frozen=True)
+class AnyOf:
+    """Disjunction."""
+
+    children: tuple["FilterNode", ...]
+
+
+FilterNode = Condition | AllOf | AnyOf
+
+
+# =============================================================================
+# Parsing
+# =============================================================================
+
+
+def parse_filters(filters: dict[str, Any]) -> FilterNode:
+    """Validate a filter dict and compile it.
+
+    Args:
+        filters: Filter in the format described in the module docstring
+
+    Returns:
+        Compiled filter tree
+
+    Raises:
+        ValueError: Unknown operator or malformed operand
+    """
+    if not isinstance(filters, dict):
+        raise ValueError("Filters must be an object")
+
+    children: list[FilterNode] = []
+    for key, spec in filters.items():
+        if key in ("$and", "$or"):
+            if not isinstance(spec, list) or not spec:
+                raise ValueError(f"{key} needs a non-empty list of filters")
+            nodes = tuple(parse_filters(item) for item in spec)
+            children.append(AllOf(_by_cost(nodes)) if key == "$and" else AnyOf(nodes))
+        elif key.startswith("$"):
+            raise ValueError(f"Unknown filter operator {key}")
+        elif isinstance(spec, dict):
+            if not spec:
+                raise ValueError(f"Empty condition for {key}")
+            children.extend(_condition(key, op, value) for op, value in spec.items())
+        else:
+            children.append(_condition(key, FilterOp.EQ.value, spec))
+
+    if len(children) == 1:
+        return children[0]
+    return AllOf(_by_cost(tuple(children)))
+
+
+def _condition(field: str, op: str, value: Any) -> Condition:
+    try:
+        filter_op = FilterOp(op)
+    except ValueError:
+        raise ValueError(f"Unknown operator {op} for {field}") from None
+
+    if filter_op in (FilterOp.IN, FilterOp.NIN):
+        if not isinstance(value, list):
+            raise ValueError(f"{op} on {field} needs a list")
+        if any(isinstance(item, (list, dict)) for item in value):
+            raise ValueError(f"{op} on {field} needs a list of scalars")
+    elif isinstance(value, (list, dict)):
+        raise ValueError(f"{op} on {field} needs a scalar")
+    elif filter_op in RANGE_OPS and (value is None or isinstance(value, bool)):
+        raise ValueError(f"{op} on {field} needs a number or string")
+
+    return Condition(field, filter_op, value)
+
+
+def _cost(node: FilterNode) -> int:
+    if isinstance(node, Condition):
+        return 0 if node.op in POSTING_OPS else 1
+    return 2
+
+
+def _by_cost(nodes: tuple[FilterNode, ...]) -> tuple[FilterNode, ...]:
+    # Exact matches come first: they resolve from posting lists and shrink
+    # the row set every later condition is evaluated on
+    return tuple(sorted(nodes, key=_cost))
+
+
+# =============================================================================
+# Row Selection (local stores)
+# =============================================================================
+
+
+class FilterColumns(Protocol):
+    """Row-aligned metadata that can evaluate a condition as a mask."""
+
+    def __len__(self) -> int: ...
+
+    def condition_mask(
+        self, condition: Condition, rows: np.ndarray | None = None
+    ) -> np.ndarray: ...
+
+
+class FilterPostings(Protocol):
+    """Inverted index from field values to sorted row ids."""
+
+    def is_indexed(self, field: str) -> bool: ...
+
+    def match_any(self, field: str, values: tuple) -> np.ndarray: ...
+
+
+def select_rows(
+    node: FilterNode, columns: FilterColumns, postings: FilterPostings
+) -> np.ndarray:
+    """Row ids matching a compiled filter, sorted.
+
+    Exact matches are read from posting lists; every other condition is
+    evaluated as one vectorised mask over the rows still in play, so a
+    selective first condition makes the rest cheap.
+    """
+    rows = _select(node, columns, postings, None)
+    return np.arange(len(columns), dtype=np.int64) if rows is None else rows
+
+
+def _select(
+    node: FilterNode,
+    columns: FilterColumns,
+    postings: FilterPostings,
+    rows: np.ndarray | None,
+) -> np.ndarray | None:
+    """Narrow rows (None = all rows) to those matching node."""
+    if isinstance(node, Condition):
+        if rows is None:
+            if (
+                node.op in POSTING_OPS
+                and None not in node.values
+                and postings.is_indexed(node.field)
+            ):
+                return postings.match_any(node.field, node.values)
+            return np.flatnonzero(columns.condition_mask(node)).astype(np.int64)
+        return rows[columns.condition_mask(node, rows)]
+
+    if isinstance(node, AllOf):
+        for child in node.children:
+            rows = _select(child, columns, postings, rows)
+            if rows is not None and len(rows) == 0:
+                break
+        return rows
+
+    parts = [
+        select_rows(child, columns, postings)
+        if rows is None
+        else _select(child, columns, postings, rows)
+        for child in node.children
+    ]
+    return reduce(np.union1d, parts).astype(np.int64)
+
+
+# =============================================================================
+# Native Translation (Pinecone)
+# =============================================================================
+
+
+def rewrite(node: FilterNode, fn: Callable[[Condition], Condition]) -> FilterNode:
+    """Apply fn to every condition of a filter tree."""
+    if isinstance(node, Condition):
+        return fn(node)
+    return type(node)(tuple(rewrite(child, fn) for child in node.children))
+
+
+def to_pinecone(node: FilterNode) -> dict[str, Any]:
+    """Translate a compiled filter into Pinecone's filter syntax."""
+    if isinstance(node, Condition):
+        return _pinecone_condition(node)
+    key = "$and" if isinstance(node, AllOf) else "$or"
+    return {key: [to_pinecone(child) for child in node.children]}
+
+
+def _pinecone_condition(condition: Condition) -> dict[str, Any]:
+    """Translate one condition; null operands become $exists tests.
+
+    Pinecone stores no nulls (null and empty-list fields are left out
+    of the metadata), so "equals null" means "field is missing".
+    """
+    field, op = condition.field, condition.op
+    if None not in condition.values:
+        return {field: {op.value: condition.value}}
+
+    negated = op in NEGATED_OPS
+    exists = {field: {"$exists": negated}}
+    values = [value for value in condition.values if value is not None]
+    if not values:
+        return exists
+    # $in / $nin with null among other values
+    return {"$and" if negated else "$or": [{field: {op.value: values}}, exists]}
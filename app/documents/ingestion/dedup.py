@@ -0,0 +1,156 @@
+"""Near-duplicate chunk detection (MinHash + LSH) for ingestion.
+
+Proposal templates and playbooks share boilerplate sections, so many
+chunks are almost identical. Each chunk is reduced to the set of its
+word 5-grams (shingles). A MinHash signature estimates the Jaccard
+similarity of two such sets, and locality-sensitive hashing over bands
+of the signature finds candidate pairs without comparing every pair.
+Candidates are then confirmed with the exact Jaccard similarity.
+
+A duplicate is collapsed into the first chunk it matches (chunks are
+visited in doc_id / chunk_index order, so the choice is stable across
+runs). The kept chunk lists the collapsed chunk_ids in `duplicates`.
+"""
+
+import re
+import zlib
+from dataclasses import dataclass
+
+import numpy as np
+
+from app.core import get_logger, settings
+from app.documents.schemas import Chunk
+
+logger = get_logger(__name__)
+
+SHINGLE_WORDS = 5
+NUM_PERMUTATIONS = 128
+# 16 bands of 8 rows: pairs with Jaccard 0.9 become candidates with
+# probability > 0.999, pairs at 0.8 with ~0.95, pairs at 0.5 with ~0.06
+NUM_BANDS = 16
+ROWS_PER_BAND = NUM_PERMUTATIONS // NUM_BANDS
+
+# Universal hashing h(x) = (a * x + b) mod p over 32-bit shingle hashes;
+# a, b < 2**32 keep a * x + b within uint64
+_PRIME = np.uint64(4_294_967_311)  # smallest prime above 2**32
+_rng = np.random.default_rng(0x5EED)
+_A = _rng.integers(1, 2**32 - 1, size=(NUM_PERMUTATIONS, 1), dtype=np.uint64)
+_B = _rng.integers(0, 2**32 - 1, size=(NUM_PERMUTATIONS, 1), dtype=np.uint64)
+# Mixes the rows of a band into one bucket key (uint64 wraparound)
+_BAND_MIX = _rng.integers(1, 2**63, size=ROWS_PER_BAND, dtype=np.uint64)
+
+WORD_PATTERN = re.compile(r"\w+")
+
+
+@dataclass
+class DedupReport:
+    """What collapsing near-duplicates saved."""
+
+    chunks: int = 0  # Chunks before collapsing
+    duplicates: int = 0  # Chunks collapsed (embeddings not computed or stored)
+    content_bytes: int = 0  # UTF-8 bytes of the collapsed chunks' text
+
+    def bytes_saved(self, embedding_dim: int) -> int:
+        """Content plus float32 vector bytes not stored."""
+        return self.content_bytes + self.duplicates * embedding_dim * 4
+
+
+def shingles(text: str) -> np.ndarray:
+    """Sorted unique hashes of the word 5-grams of a text.
+
+    Texts shorter than five words are one shingle.
+    """
+    words = WORD_PATTERN.findall(text.lower())
+    count = max(len(words) - SHINGLE_WORDS + 1, 1)
+    hashes = {
+        zlib.crc32(" ".join(words[i : i + SHINGLE_WORDS]).encode("utf-8"))
+        for i in range(count)
+    }
+    return np.array(sorted(hashes), dtype=np.uint64)
+
+
+def minhash(shingle_hashes: np.ndarray) -> np.ndarray:
+    """MinHash signature (NUM_PERMUTATIONS values) of a shingle set."""
+    if len(shingle_hashes) == 0:
+        return np.zeros(NUM_PERMUTATIONS, dtype=np.uint64)
+    return ((_A * shingle_hashes[None, :] + _B) % _PRIME).min(axis=1)
+
+
+def band_keys(signature: np.ndarray) -> np.ndarray:
+    """One bucket key per LSH band of a signature."""
+    bands = signature.reshape(NUM_BANDS, ROWS_PER_BAND)
+    return (bands * _BAND_MIX).sum(axis=1)
+
+
+def jaccard(a: np.ndarray, b: np.ndarray) -> float:
+    """Exact Jaccard similarity of two sorted unique hash arrays."""
+    common = len(np.intersect1d(a, b, assume_unique=True))
+    union = len(a) + len(b) - common
+    return common / union if union else 1.0
+
+
+def collapse_near_duplicates(
+    chunks: list[Chunk], threshold: float | None = None
+) -> tuple[list[Chunk], DedupReport]:
+    """Drop chunks that nearly repeat an earlier chunk.
+
+    The first chunk of every document is always kept, so each document
+    stays indexed (and listed) even if all its text is boilerplate.
+
+    Args:
+        chunks: Chunks of the whole knowledge base
+        threshold: Min Jaccard similarity of word 5-grams to collapse
+            (default: DEDUP_THRESHOLD; 0 disables collapsing)
+
+    Returns:
+        (kept chunks in their original order, report)
+    """
+    threshold = settings.dedup_threshold if threshold is None else threshold
+    report = DedupReport(chunks=len(chunks))
+    if threshold <= 0 or len(chunks) < 2:
+        return chunks, report
+
+    order = sorted(
+        range(len(chunks)),
+        key=lambda i: (chunks[i].metadata.doc_id, chunks[i].chunk_index),
+    )
+    sets = [shingles(chunk.content) for chunk in chunks]
+    keys = [band_keys(minhash(s)) for s in sets]
+
+    buckets: list[dict[int, list[int]]] = [{} for _ in range(NUM_BANDS)]
+    duplicates: dict[int, list[str]] = {}  # kept position -> collapsed ids
+    collapsed: set[int] = set()
+    for i in order:
+        candidates = {
+            kept
+            for band, key in enumerate(keys[i].tolist())
+            for kept in buckets[band].get(key, ())
+        }
+        match = None
+        if chunks[i].chunk_index > 0 and candidates:
+            similarity, match = max((jaccard(sets[i], sets[c]), c) for c in candidates)
+            if similarity < threshold:
+                match = None
+
+        if match is None:
+            for band, key in enumerate(keys[i].tolist()):
+                buckets[band].setdefault(key, []).append(i)
+            continue
+        duplicates.setdefault(match, []).append(chunks[i].chunk_id)
+        collapsed.add(i)
+        report.content_bytes += len(chunks[i].content.encode("utf-8"))
+
+    report.duplicates = len(collapsed)
+    kept = [
+        chunk.model_copy(update={"duplicates": duplicates[i]})
+        if i in duplicates
+        else chunk
+        for i, chunk in enumerate(chunks)
+        if i not in collapsed
+    ]
+    if collapsed:
+        logger.info(
+            f"Collapsed {len(collapsed)} near-duplicate chunks into "
+            f"{len(duplicates)} ({report.content_bytes} bytes of text)"
+        )
+    return kept, report
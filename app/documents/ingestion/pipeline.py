@@ -4,6 +4,7 @@ from pathlib import Path
 
 from app.core import get_logger
 from app.documents.ingestion.chunker import DocumentChunker
+from app.documents.ingestion.dedup import DedupReport, collapse_near_duplicates
 from app.documents.ingestion.loader import DocumentLoader
 from app.documents.schemas import Chunk
 
@@ -13,13 +14,25 @@ logger = get_logger(__name__)
 class IngestionPipeline:
     """End-to-end document ingestion pipeline."""
 
-    def __init__(self, knowledge_base_path: Path):
+    def __init__(self, knowledge_base_path: Path, dedup_threshold: float | None = None):
+        """Initialize the pipeline.
+
+        Args:
+            knowledge_base_path: Directory of markdown documents
+            dedup_threshold: Similarity above which chunks are collapsed
+                (default: DEDUP_THRESHOLD; 0 keeps every chunk)
+        """
         self.loader = DocumentLoader(knowledge_base_path)
         self.chunker = DocumentChunker()
+        self.dedup_threshold = dedup_threshold
+        self.dedup_report = DedupReport()
 
     def run(self) -> list[Chunk]:
         """Run full ingestion pipeline.
 
+        Near-duplicate chunks are collapsed into the chunk they repeat;
+        what that saved is in dedup_report afterwards.
+
         Returns:
             List of chunks ready for vector store
         """
@@ -32,7 +45,13 @@ class IngestionPipeline:
             chunks = self.chunker.chunk_document(doc)
             all_chunks.extend(chunks)
 
+        # Collapse boilerplate repeated across templates and playbooks
+        all_chunks, self.dedup_report = collapse_near_duplicates(
+            all_chunks, self.dedup_threshold
+        )
+
         logger.info(
-            f"Ingestion complete: {len(documents)} documents -> {len(all_chunks)} chunks"
+            f"Ingestion complete: {len(documents)} documents -> "
+            f"{len(all_chunks)} chunks ({self.dedup_report.duplicates} collapsed)"
         )
         return all_chunks
@@ -1,9 +1,17 @@
 """Memory layer with vector store implementations."""
 
 from app.documents.memory.base import VectorStoreRepository
-from app.documents.memory.factory import vector_store
+from app.documents.memory.embedding_cache import cache_stats
+from app.documents.memory.factory import document_registry, vector_store
+from app.documents.memory.query_cache import query_cache_stats
+from app.documents.memory.registry import DocumentRegistry, document_hash
 
 __all__ = [
     "vector_store",
+    "document_registry",
+    "DocumentRegistry",
+    "document_hash",
+    "cache_stats",
+    "query_cache_stats",
     "VectorStoreRepository",
 ]
@@ -1,9 +1,12 @@
 """Abstract base class for vector store implementations."""
 
+import asyncio
 from abc import ABC, abstractmethod
+from collections.abc import Iterator
+from contextlib import contextmanager
 from pathlib import Path
 
-from app.documents.schemas import Chunk, SearchQuery, SearchResponse
+from app.documents.schemas import Chunk, SearchMode, SearchQuery, SearchResponse
 
 
 class VectorStoreRepository(ABC):
@@ -18,6 +21,19 @@ class VectorStoreRepository(ABC):
             def search(self, query): ...
     """
 
+    # Ranking modes the backend implements (others are rejected)
+    search_modes: frozenset[SearchMode] = frozenset(SearchMode)
+
+    def check_modes(self, queries: list[SearchQuery]) -> None:
+        """Raise ValueError for queries asking for a mode the backend lacks."""
+        for query in queries:
+            if query.mode not in self.search_modes:
+                supported = ", ".join(sorted(mode.value for mode in self.search_modes))
+                raise ValueError(
+                    f"Search mode {query.mode.value} is not supported by "
+                    f"{type(self).__name__} (supported: {supported})"
+                )
+
     @property
     @abstractmethod
     def count(self) -> int:
@@ -36,6 +52,33 @@ class VectorStoreRepository(ABC):
         """
         pass
 
+    @abstractmethod
+    def upsert_document(self, doc_id: str, chunks: list[Chunk]) -> int:
+        """Replace all chunks of a document.
+
+        Only this document is re-embedded; other documents are untouched.
+
+        Args:
+            doc_id: Document to replace
+            chunks: New chunks for the document
+
+        Returns:
+            Number of chunks written
+        """
+        pass
+
+    @abstractmethod
+    def delete_document(self, doc_id: str) -> int:
+        """Delete all chunks of a document.
+
+        Args:
+            doc_id: Document to delete
+
+        Returns:
+            Number of chunks deleted
+        """
+        pass
+
     @abstractmethod
     def search(self, query: SearchQuery) -> SearchResponse:
         """Search the vector store.
@@ -48,6 +91,92 @@ class VectorStoreRepository(ABC):
         """
         pass
 
+    def search_many(self, queries: list[SearchQuery]) -> list[SearchResponse]:
+        """Search several queries at once.
+
+        Backends override this to batch embedding and search calls; the
+        default runs the queries one by one.
+
+        Args:
+            queries: Search queries, each with its own filters and top_k
+
+        Returns:
+            One response per query, in order
+        """
+        return [self.search(query) for query in queries]
+
+    @contextmanager
+    def transaction(self) -> Iterator["VectorStoreRepository"]:
+        """Group writes (e.g., one ingestion run).
+
+        Yields the store to write to. The default applies writes in place;
+        local stores persist when the block exits, and versioned stores
+        publish the writes as a new version.
+        """
+        yield self
+
+    def attach_wal(self, path: Path) -> None:
+        """Log further writes to path (for stores with a write-ahead log).
+
+        Only the store that writes to path attaches its log; readers of
+        the same path never open it.
+        """
+
+    @property
+    def log_bytes(self) -> int:
+        """Bytes of writes logged since the last full snapshot."""
+        return 0
+
+    def flush(self) -> None:
+        """Make writes durable at the store's own path (if it has one)."""
+
+    def compact(self) -> None:
+        """Fold logged writes into a full snapshot."""
+
+    # =========================================================================
+    # Async API
+    # =========================================================================
+    # Defaults run the sync methods in a worker thread. Backends override
+    # them with native async I/O so the event loop is never blocked on
+    # embeddings or network round-trips.
+
+    async def acount(self) -> int:
+        """Number of vectors in the store."""
+        return await asyncio.to_thread(lambda: self.count)
+
+    async def aadd_chunks(self, chunks: list[Chunk]) -> int:
+        """Add chunks to the vector store.
+
+        Args:
+            chunks: List of chunks to add
+
+        Returns:
+            Number of chunks added
+        """
+        return await asyncio.to_thread(self.add_chunks, chunks)
+
+    async def asearch(self, query: SearchQuery) -> SearchResponse:
+        """Search the vector store.
+
+        Args:
+            query: Search query with optional filters
+
+        Returns:
+            Search results with scores and metadata
+        """
+        return await asyncio.to_thread(self.search, query)
+
+    async def asearch_many(self, queries: list[SearchQuery]) -> list[SearchResponse]:
+        """Search several queries at once.
+
+        Args:
+            queries: Search queries, each with its own filters and top_k
+
+        Returns:
+            One response per query, in order
+        """
+        return await asyncio.to_thread(self.search_many, queries)
+
     @abstractmethod
     def clear(self) -> None:
         """Clear all data from the store."""
@@ -0,0 +1,454 @@
+"""Token-aware batching and pipelined embed/write for bulk ingestion."""
+
+import asyncio
+import functools
+import itertools
+import random
+import threading
+import time
+from collections.abc import Awaitable, Callable
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+
+import openai
+import tiktoken
+from langchain_core.embeddings import Embeddings
+
+from app.core import get_logger, settings
+from app.documents.schemas import Chunk
+
+logger = get_logger(__name__)
+
+# OpenAI embeddings API limit on inputs per request
+MAX_TEXTS_PER_REQUEST = 2048
+
+# Rough English average, used to budget tokens without a tokenizer
+CHARS_PER_TOKEN = 4
+
+# Backoff between retries of a failed embeddings call (doubles per retry)
+RETRY_BASE_SECONDS = 1.0
+RETRY_MAX_SECONDS = 60.0
+
+Embedding = list[float]
+EmbedFn = Callable[[list[str]], list[Embedding]]
+WriteFn = Callable[[list[Chunk], list[Embedding]], int]
+AsyncEmbedFn = Callable[[list[str]], Awaitable[list[Embedding]]]
+AsyncWriteFn = Callable[[list[Chunk], list[Embedding]], Awaitable[int]]
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count of a text (never zero)."""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+@functools.cache
+def _encoding(model: str | None) -> tiktoken.Encoding | None:
+    if model is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except Exception as e:  # Unknown model, or encoding files not downloadable
+        logger.warning(f"No tiktoken encoding for {model} ({e}), estimating tokens")
+        return None
+
+
+def count_tokens(text: str, model: str | None = None) -> int:
+    """Token count of a text under a model's tiktoken encoding.
+
+    Falls back to estimate_tokens if the model has no known encoding.
+    """
+    encoding = _encoding(model)
+    if encoding is None:
+        return estimate_tokens(text)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def token_batches(
+    texts: list[str],
+    max_tokens: int,
+    max_texts: int = MAX_TEXTS_PER_REQUEST,
+    counts: list[int] | None = None,
+) -> list[range]:
+    """Split texts into consecutive batches under a token budget.
+
+    A text larger than the budget gets a batch of its own.
+
+    Args:
+        texts: Texts to embed, in order
+        max_tokens: Tokens allowed per batch
+        max_texts: Texts allowed per batch
+        counts: Token count of each text (default: estimate_tokens)
+
+    Returns:
+        Index ranges covering all texts, in order
+    """
+    if counts is None:
+        counts = [estimate_tokens(text) for text in texts]
+    batches = []
+    start = tokens = 0
+    for i, text_tokens in enumerate(counts):
+        if i > start and (tokens + text_tokens > max_tokens or i - start >= max_texts):
+            batches.append(range(start, i))
+            start, tokens = i, 0
+        tokens += text_tokens
+    if start < len(texts):
+        batches.append(range(start, len(texts)))
+    return batches
+
+
+# =============================================================================
+# Rate Limits and Retries
+# =============================================================================
+
+
+class RateLimiter:
+    """Token buckets for an API's tokens- and requests-per-minute budget.
+
+    reserve() takes a call's budget up front and returns how long the
+    caller must wait before sending it. Buckets may go negative, so
+    concurrent callers queue behind each other instead of all waking at
+    once. A budget of 0 is unlimited.
+    """
+
+    def __init__(
+        self,
+        tokens_per_minute: int,
+        requests_per_minute: int,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.capacity = (tokens_per_minute, requests_per_minute)
+        self._levels = [float(c) for c in self.capacity]  # Start full
+        self._clock = clock
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens: int) -> float:
+        """Take the budget of one call of `tokens` tokens.
+
+        Returns:
+            Seconds to wait before sending the call
+        """
+        with self._lock:
+            now = self._clock()
+            elapsed, self._updated = now - self._updated, now
+            wait = 0.0
+            for i, (capacity, amount) in enumerate(zip(self.capacity, (tokens, 1))):
+                if capacity <= 0:
+                    continue
+                refilled = self._levels[i] + elapsed * capacity / 60
+                self._levels[i] = min(refilled, capacity) - amount
+                if self._levels[i] < 0:
+                    wait = max(wait, -self._levels[i] * 60 / capacity)
+            return wait
+
+
+_limiter: RateLimiter | None = None
+_limiter_lock = threading.Lock()
+
+
+def shared_limiter() -> RateLimiter:
+    """The process-wide embeddings API budget (EMBEDDING_*_PER_MINUTE)."""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = RateLimiter(
+                settings.embedding_tokens_per_minute,
+                settings.embedding_requests_per_minute,
+            )
+        return _limiter
+
+
+def retry_delay(error: Exception, attempt: int) -> float | None:
+    """Seconds to wait before retrying a failed call (None: don't retry).
+
+    Rate limits (429), server errors (5xx), connection errors and
+    timeouts are retried after the server's Retry-After, or else after an
+    exponential backoff with jitter.
+
+    Args:
+        error: Exception raised by the call
+        attempt: Retries already made (0 for the first failure)
+    """
+    status = getattr(error, "status_code", None)
+    transient = isinstance(
+        error, (openai.APIConnectionError, ConnectionError, TimeoutError)
+    ) or (isinstance(status, int) and (status == 429 or status >= 500))
+    if not transient:
+        return None
+
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return min(float(headers.get("retry-after")), RETRY_MAX_SECONDS)
+    except (TypeError, ValueError):  # Missing, or an HTTP date
+        backoff = min(RETRY_BASE_SECONDS * 2**attempt, RETRY_MAX_SECONDS)
+        return backoff * random.uniform(0.5, 1.0)
+
+
+# =============================================================================
+# Scheduled Embeddings
+# =============================================================================
+
+
+class ScheduledEmbeddings(Embeddings):
+    """Embeddings client that batches, parallelises and paces document calls.
+
+    Texts are packed into batches under a token ceiling, counted with
+    the tiktoken encoding of the wrapped client's model. Batches are
+    sent concurrently within the shared API budget; a batch that hits a
+    rate limit or transient error is retried with backoff on its own,
+    without failing the others. Embeddings come back in input order.
+    Query embeddings pass straight through.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        max_batch_tokens: int | None = None,
+        concurrency: int | None = None,
+        limiter: RateLimiter | None = None,
+        max_retries: int | None = None,
+    ):
+        """Wrap an embeddings client.
+
+        Args:
+            embeddings: Client making one API call per embed_documents
+            max_batch_tokens: Tokens per call (default: EMBEDDING_BATCH_TOKENS)
+            concurrency: Calls in flight (default: EMBEDDING_CONCURRENCY)
+            limiter: API budget (default: the process-wide shared_limiter)
+            max_retries: Retries per batch (default: EMBEDDING_MAX_RETRIES)
+        """
+        self.embeddings = embeddings
+        self.max_batch_tokens = max_batch_tokens or settings.embedding_batch_tokens
+        self.concurrency = concurrency or settings.embedding_concurrency
+        self.limiter = limiter or shared_limiter()
+        self.max_retries = (
+            settings.embedding_max_retries if max_retries is None else max_retries
+        )
+        self.model: str | None = getattr(embeddings, "model", None)
+        # OpenAIEmbeddings splits larger lists into several requests
+        self.max_texts = getattr(embeddings, "chunk_size", MAX_TEXTS_PER_REQUEST)
+        # Bounds calls in flight across threads sharing this client
+        self._slots = threading.BoundedSemaphore(self.concurrency)
+
+    def _batches(self, texts: list[str]) -> list[tuple[list[str], int]]:
+        """(texts, token count) of each batch, in order."""
+        counts = [count_tokens(text, self.model) for text in texts]
+        ranges = token_batches(texts, self.max_batch_tokens, self.max_texts, counts)
+        return [
+            (texts[r.start : r.stop], sum(counts[r.start : r.stop])) for r in ranges
+        ]
+
+    def _retry_delay(self, error: Exception, attempt: int) -> float | None:
+        delay = retry_delay(error, attempt) if attempt < self.max_retries else None
+        if delay is not None:
+            logger.warning(
+                f"Embeddings call failed ({error}), retry {attempt + 1}/"
+                f"{self.max_retries} in {delay:.1f}s"
+            )
+        return delay
+
+    def _embed_batch(self, batch: tuple[list[str], int]) -> list[Embedding]:
+        texts, tokens = batch
+        for attempt in itertools.count():
+            time.sleep(self.limiter.reserve(tokens))
+            try:
+                with self._slots:
+                    return self.embeddings.embed_documents(texts)
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+
+    def embed_documents(self, texts: list[str]) -> list[Embedding]:
+        if not texts:
+            return []
+        batches = self._batches(texts)
+        if len(batches) == 1:
+            return self._embed_batch(batches[0])
+
+        pool = ThreadPoolExecutor(
+            max_workers=min(self.concurrency, len(batches)),
+            thread_name_prefix="embed",
+        )
+        try:
+            results = list(pool.map(self._embed_batch, batches))
+        finally:
+            pool.shutdown(cancel_futures=True)
+        return [embedding for result in results for embedding in result]
+
+    async def aembed_documents(self, texts: list[str]) -> list[Embedding]:
+        if not texts:
+            return []
+        slots = asyncio.Semaphore(self.concurrency)
+
+        async def embed_batch(batch: tuple[list[str], int]) -> list[Embedding]:
+            batch_texts, tokens = batch
+            for attempt in itertools.count():
+                await asyncio.sleep(self.limiter.reserve(tokens))
+                try:
+                    async with slots:
+                        return await self.embeddings.aembed_documents(batch_texts)
+                except Exception as e:
+                    delay = self._retry_delay(e, attempt)
+                    if delay is None:
+                        raise
+                    await asyncio.sleep(delay)
+
+        tasks = [asyncio.ensure_future(embed_batch(b)) for b in self._batches(texts)]
+        try:
+            results = await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+        return [embedding for result in results for embedding in result]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embeddings.embed_query(text)
+
+    async def aembed_query(self, text: str) -> list[float]:
+        return await self.embeddings.aembed_query(text)
+
+
+def _chunk_batches(
+    chunks: list[Chunk], max_tokens: int | None, model: str | None
+) -> list[list[Chunk]]:
+    # Counted like ScheduledEmbeddings counts them, so a pipeline batch
+    # never exceeds the scheduler's per-request budget
+    texts = [chunk.content for chunk in chunks]
+    ranges = token_batches(
+        texts,
+        max_tokens or settings.embedding_batch_tokens,
+        counts=[count_tokens(text, model) for text in texts],
+    )
+    return [chunks[r.start : r.stop] for r in ranges]
+
+
+def _split(items: list, size: int) -> list[tuple[int, int]]:
+    return [(i, min(i + size, len(items))) for i in range(0, len(items), size)]
+
+
+def _log_throughput(count: int, start: float) -> None:
+    seconds = time.perf_counter() - start
+    rate = count / seconds if seconds > 0 else float("inf")
+    logger.info(f"Embedded and wrote {count} chunks in {seconds:.2f}s ({rate:.1f}/s)")
+
+
+# =============================================================================
+# Pipelines
+# =============================================================================
+
+
+def run_pipeline(
+    chunks: list[Chunk],
+    embed: EmbedFn,
+    write: WriteFn,
+    write_batch_size: int,
+    max_batch_tokens: int | None = None,
+    embed_concurrency: int | None = None,
+    write_concurrency: int | None = None,
+    model: str | None = None,
+) -> int:
+    """Embed chunks in concurrent batches and write them as they arrive.
+
+    Embedding and writing run on separate thread pools, so writes of
+    early batches overlap embedding of later ones instead of waiting for
+    the whole corpus. Each embedded batch is split into write batches of
+    write_batch_size that are sent in parallel.
+
+    Args:
+        chunks: Chunks to add
+        embed: Embeds a list of texts (one request)
+        write: Writes chunks with their embeddings, returns the count
+        write_batch_size: Max chunks per write call
+        max_batch_tokens: Tokens per embeddings request
+        embed_concurrency: Embeddings requests in flight
+        write_concurrency: Write calls in flight
+        model: Embedding model whose tiktoken encoding counts the tokens
+            (None: estimate from the text length)
+
+    Returns:
+        Number of chunks written
+    """
+    if not chunks:
+        return 0
+
+    start = time.perf_counter()
+    batches = _chunk_batches(chunks, max_batch_tokens, model)
+
+    with (
+        ThreadPoolExecutor(
+            max_workers=embed_concurrency or settings.embedding_concurrency,
+            thread_name_prefix="embed",
+        ) as embed_pool,
+        ThreadPoolExecutor(
+            max_workers=write_concurrency or settings.upsert_concurrency,
+            thread_name_prefix="write",
+        ) as write_pool,
+    ):
+        embedded: dict[Future, list[Chunk]] = {
+            embed_pool.submit(embed, [c.content for c in batch]): batch
+            for batch in batches
+        }
+        writes: list[Future] = []
+        try:
+            for future in as_completed(embedded):
+                batch, embeddings = embedded[future], future.result()
+                for lo, hi in _split(batch, write_batch_size):
+                    writes.append(
+                        write_pool.submit(write, batch[lo:hi], embeddings[lo:hi])
+                    )
+            written = sum(future.result() for future in writes)
+        except BaseException:
+            for future in [*embedded, *writes]:
+                future.cancel()
+            raise
+
+    _log_throughput(written, start)
+    return written
+
+
+async def arun_pipeline(
+    chunks: list[Chunk],
+    embed: AsyncEmbedFn,
+    write: AsyncWriteFn,
+    write_batch_size: int,
+    max_batch_tokens: int | None = None,
+    embed_concurrency: int | None = None,
+    write_concurrency: int | None = None,
+    model: str | None = None,
+) -> int:
+    """Async variant of run_pipeline (semaphores bound the concurrency).
+
+    The first failure cancels all outstanding embed and write calls.
+    """
+    if not chunks:
+        return 0
+
+    start = time.perf_counter()
+    embed_slots = asyncio.Semaphore(embed_concurrency or settings.embedding_concurrency)
+    write_slots = asyncio.Semaphore(write_concurrency or settings.upsert_concurrency)
+
+    async def write_part(batch: list[Chunk], embeddings: list[Embedding]) -> int:
+        async with write_slots:
+            return await write(batch, embeddings)
+
+    async def process(batch: list[Chunk]) -> int:
+        async with embed_slots:
+            embeddings = await embed([c.content for c in batch])
+        async with asyncio.TaskGroup() as group:
+            parts = [
+                group.create_task(write_part(batch[lo:hi], embeddings[lo:hi]))
+                for lo, hi in _split(batch, write_batch_size)
+            ]
+        return sum(part.result() for part in parts)
+
+    async with asyncio.TaskGroup() as group:
+        tasks = [
+            group.create_task(process(batch))
+            for batch in _chunk_batches(chunks, max_batch_tokens, model)
+        ]
+    written = sum(task.result() for task in tasks)
+
+    _log_throughput(written, start)
+    return written
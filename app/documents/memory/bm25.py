@@ -0,0 +1,302 @@
+"""BM25 inverted index over chunk content, and rank fusion for hybrid search."""
+
+import json
+import re
+from collections import Counter, defaultdict
+from collections.abc import Hashable, Sequence
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import numpy as np
+
+from app.core import get_logger, settings
+from app.documents.memory.files import atomic_path, load_array, save_array
+
+logger = get_logger(__name__)
+
+# Words joined by - . / stay one token (SKUs, versions, domains), and
+# their parts are indexed too
+TOKEN_PATTERN = re.compile(r"\w+(?:[-./]\w+)*")
+TOKEN_SEPARATORS = re.compile(r"[-./_]")
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that "
+    "the this to was were will with".split()
+)
+
+
+def tokenize(text: str) -> list[str]:
+    """Lower-cased terms of a text, stopwords removed.
+
+    "SKU-4410" yields "sku-4410", "sku" and "4410", so both the exact
+    identifier and its parts match.
+    """
+    tokens = []
+    for match in TOKEN_PATTERN.finditer(text.lower()):
+        token = match.group()
+        if token in STOPWORDS:
+            continue
+        tokens.append(token)
+        if not token.isalnum():
+            tokens.extend(
+                part
+                for part in TOKEN_SEPARATORS.split(token)
+                if part and part not in STOPWORDS
+            )
+    return tokens
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Sequence[Hashable]], k: int | None = None
+) -> list[tuple[Hashable, float]]:
+    """Fuse ranked lists: each item scores sum(1 / (k + rank)).
+
+    Args:
+        rankings: Ranked lists of item keys, best first
+        k: Rank offset (larger values flatten the contribution of top ranks)
+
+    Returns:
+        (key, fused score) pairs, best first (ties keep first-seen order)
+    """
+    k = settings.hybrid_rrf_k if k is None else k
+    scores: dict[Hashable, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, key in enumerate(ranking, start=1):
+            scores[key] += 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+@dataclass
+class CorpusStats:
+    """Corpus statistics BM25 scores with, for the terms of one query.
+
+    Partitioned indexes (shards) add up their statistics and score with
+    the sum, so every partition computes the same IDF and average length
+    and their scores can be merged directly.
+    """
+
+    rows: int = 0  # Live rows
+    tokens: int = 0  # Tokens in live rows
+    doc_freq: Counter[str] = field(default_factory=Counter)
+
+    def __add__(self, other: "CorpusStats") -> "CorpusStats":
+        return CorpusStats(
+            self.rows + other.rows,
+            self.tokens + other.tokens,
+            self.doc_freq + other.doc_freq,
+        )
+
+
+class BM25Index:
+    """Okapi BM25 over the text of each row.
+
+    Rows are numbered like the vector store's rows (append-only). Each
+    term maps to a posting list of rows and term frequencies. Removing
+    a row updates the corpus statistics; its postings stay and are
+    skipped at query time through the caller's exclude mask.
+
+    A query only touches the posting lists of its own terms, and scores
+    are accumulated with NumPy, so lexical search costs little next to
+    the embeddings call it runs beside.
+    """
+
+    def __init__(self, k1: float | None = None, b: float | None = None):
+        self.k1 = settings.bm25_k1 if k1 is None else k1
+        self.b = settings.bm25_b if b is None else b
+        # Posting lists stay numpy arrays after load until appended to
+        self._rows: dict[str, list[int] | np.ndarray] = {}
+        self._freqs: dict[str, list[int] | np.ndarray] = {}
+        self._lengths: list[int] | np.ndarray = []
+        # Frozen numpy views of the above, rebuilt after adds
+        self._arrays: dict[str, tuple[np.ndarray, np.ndarray]] = {}
+        self._length_array: np.ndarray | None = None
+        # Statistics over live (not removed) rows
+        self._doc_freq: Counter[str] = Counter()
+        self._live_rows = 0
+        self._live_tokens = 0
+
+    @property
+    def size(self) -> int:
+        """Number of rows indexed (including removed ones)."""
+        return len(self._lengths)
+
+    def add(self, text: str) -> int:
+        """Index the text of the next row.
+
+        Returns:
+            Row id assigned to the text
+        """
+        row = self.size
+        terms = Counter(tokenize(text))
+        for term, freq in terms.items():
+            _append(self._rows, term, row)
+            _append(self._freqs, term, freq)
+        self._doc_freq.update(terms.keys())
+
+        length = sum(terms.values())
+        if isinstance(self._lengths, np.ndarray):
+            self._lengths = self._lengths.tolist()
+        self._lengths.append(length)
+        self._live_rows += 1
+        self._live_tokens += length
+        self._arrays.clear()
+        self._length_array = None
+        return row
+
+    def remove(self, row: int, text: str) -> None:
+        """Drop a row (with the text it was added with) from the statistics."""
+        terms = set(tokenize(text))
+        self._doc_freq.subtract(terms)
+        self._live_rows -= 1
+        self._live_tokens -= int(self._lengths[row])
+
+    def stats(self, text: str) -> CorpusStats:
+        """Statistics of this index for the terms of a query."""
+        return self._stats(set(tokenize(text)))
+
+    def _stats(self, terms: set[str]) -> CorpusStats:
+        return CorpusStats(
+            self._live_rows,
+            self._live_tokens,
+            Counter({term: self._doc_freq[term] for term in terms}),
+        )
+
+    def search(
+        self,
+        text: str,
+        top_k: int,
+        exclude: np.ndarray | None = None,
+        corpus: CorpusStats | None = None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Best-scoring rows for a query.
+
+        Args:
+            text: Query text
+            top_k: Max rows to return
+            exclude: Bool mask of rows to skip (removed or filtered out)
+            corpus: Statistics to score with instead of this index's own
+                (those of all shards, for a sharded store)
+
+        Returns:
+            (scores, rows), best first
+        """
+        query_terms = set(tokenize(text))
+        terms = [term for term in query_terms if self._doc_freq[term] > 0]
+        if corpus is None:
+            corpus = self._stats(query_terms)
+        if not terms or corpus.rows <= 0:
+            return np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64)
+
+        if self._length_array is None:
+            self._length_array = np.asarray(self._lengths, dtype=np.float32)
+        lengths = self._length_array
+        avg_length = max(corpus.tokens / corpus.rows, 1.0)
+
+        row_parts, score_parts = [], []
+        for term in terms:
+            rows, freqs = self._posting(term)
+            if exclude is not None:
+                keep = ~exclude[rows]
+                rows, freqs = rows[keep], freqs[keep]
+
+            doc_freq = corpus.doc_freq[term]
+            idf = np.log1p((corpus.rows - doc_freq + 0.5) / (doc_freq + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * lengths[rows] / avg_length)
+            row_parts.append(rows)
+            score_parts.append(idf * freqs * (self.k1 + 1) / (freqs + norm))
+
+        rows, inverse = np.unique(np.concatenate(row_parts), return_inverse=True)
+        if len(rows) == 0:
+            return np.empty(0, dtype=np.float32), rows
+        scores = np.bincount(inverse, weights=np.concatenate(score_parts))
+
+        k = min(top_k, len(rows))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return scores[top].astype(np.float32), rows[top]
+
+    def _posting(self, term: str) -> tuple[np.ndarray, np.ndarray]:
+        """Rows and term frequencies of a term."""
+        cached = self._arrays.get(term)
+        if cached is None:
+            cached = (
+                np.asarray(self._rows[term], dtype=np.int64),
+                np.asarray(self._freqs[term], dtype=np.float32),
+            )
+            self._arrays[term] = cached
+        return cached
+
+    # =========================================================================
+    # Persistence
+    # =========================================================================
+
+    def save(self, path: Path) -> None:
+        """Persist posting lists as flat .npy arrays in a directory."""
+        path.mkdir(parents=True, exist_ok=True)
+
+        terms = list(self._rows)
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(self._rows[term]) for term in terms])
+
+        def flat(postings: dict, dtype: type) -> np.ndarray:
+            if not terms:
+                return np.empty(0, dtype=dtype)
+            return np.concatenate(
+                [np.asarray(postings[term], dtype=dtype) for term in terms]
+            )
+
+        save_array(path / "rows.npy", flat(self._rows, np.int64))
+        save_array(path / "freqs.npy", flat(self._freqs, np.int32))
+        save_array(path / "offsets.npy", offsets)
+        save_array(path / "lengths.npy", np.asarray(self._lengths, dtype=np.int32))
+        with atomic_path(path / "terms.json") as tmp:
+            tmp.write_text(
+                json.dumps(
+                    {
+                        "terms": terms,
+                        "doc_freq": [self._doc_freq[term] for term in terms],
+                        "live_rows": self._live_rows,
+                        "live_tokens": self._live_tokens,
+                    }
+                )
+            )
+
+    def load(self, path: Path, mmap: bool = True) -> None:
+        """Load an index saved with save().
+
+        Args:
+            path: Directory written by save()
+            mmap: Memory-map the posting arrays instead of reading them
+        """
+        manifest = json.loads((path / "terms.json").read_text())
+        offsets = load_array(path / "offsets.npy", mmap=False)
+        rows = load_array(path / "rows.npy", mmap=mmap)
+        freqs = load_array(path / "freqs.npy", mmap=mmap)
+
+        self._rows, self._freqs = {}, {}
+        for i, term in enumerate(manifest["terms"]):
+            self._rows[term] = rows[offsets[i] : offsets[i + 1]]
+            self._freqs[term] = freqs[offsets[i] : offsets[i + 1]]
+        self._lengths = load_array(path / "lengths.npy", mmap=False)
+        self._arrays = {}
+        self._length_array = None
+        self._doc_freq = Counter(dict(zip(manifest["terms"], manifest["doc_freq"])))
+        self._live_rows = manifest["live_rows"]
+        self._live_tokens = manifest["live_tokens"]
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        self._rows, self._freqs = {}, {}
+        self._lengths = []
+        self._arrays = {}
+        self._length_array = None
+        self._doc_freq = Counter()
+        self._live_rows = 0
+        self._live_tokens = 0
+
+
+def _append(postings: dict[str, list[int] | np.ndarray], term: str, value: int):
+    posting = postings.setdefault(term, [])
+    if isinstance(posting, np.ndarray):
+        posting = postings[term] = posting.tolist()
+    posting.append(value)
@@ -0,0 +1,448 @@
+"""Columnar, memory-mapped storage for chunk metadata and content."""
+
+import json
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from app.core import get_logger
+from app.documents.filters import COMPARE, NEGATED_OPS, POSTING_OPS, Condition
+from app.documents.memory.files import atomic_path, load_array, save_array
+from app.documents.schemas import CompanySize, DealOutcome, DocType
+
+logger = get_logger(__name__)
+
+SCHEMA_VERSION = 1
+
+# =============================================================================
+# Column Schema
+# =============================================================================
+
+# Enum fields: fixed vocabulary, one uint8 code per row (0 = None)
+ENUM_COLUMNS: dict[str, list[str | None]] = {
+    "doc_type": [None, *(m.value for m in DocType)],
+    "company_size": [None, *(m.value for m in CompanySize)],
+    "outcome": [None, *(m.value for m in DealOutcome)],
+}
+
+# Integer fields: one int64 per row
+INT_COLUMNS = ("deal_value", "chunk_index", "total_chunks")
+INT_NULL = np.iinfo(np.int64).min
+
+# String fields: dictionary-encoded (chunks of a document share values)
+STRING_COLUMNS = ("doc_id", "industry", "date", "source_file")
+STRING_NULL = -1
+
+# List-of-string fields: per-row slice of dictionary codes (only tags today)
+LIST_COLUMNS = ("tags",)
+
+# Key order of Chunk.to_dict(), reproduced when materialising rows
+FIELD_ORDER = (
+    "doc_id",
+    "doc_type",
+    "industry",
+    "company_size",
+    "deal_value",
+    "outcome",
+    "date",
+    "tags",
+    "source_file",
+    "chunk_index",
+    "total_chunks",
+)
+
+
+# =============================================================================
+# Column Types
+# =============================================================================
+
+
+class _StringTable:
+    """Variable-length UTF-8 strings stored as offsets + blob.
+
+    Appends are buffered in a Python list and only packed into the
+    blob on save, so reads of loaded rows never copy the blob.
+    """
+
+    def __init__(self):
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._blob = np.empty(0, dtype=np.uint8)
+        self._pending: list[str] = []
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1 + len(self._pending)
+
+    def append(self, value: str) -> int:
+        self._pending.append(value)
+        return len(self) - 1
+
+    def __getitem__(self, i: int) -> str:
+        packed = len(self._offsets) - 1
+        if i >= packed:
+            return self._pending[i - packed]
+        start, end = self._offsets[i], self._offsets[i + 1]
+        return self._blob[start:end].tobytes().decode("utf-8")
+
+    def _pack(self) -> None:
+        if not self._pending:
+            return
+        encoded = [value.encode("utf-8") for value in self._pending]
+        lengths = np.fromiter((len(e) for e in encoded), dtype=np.int64)
+        self._offsets = np.concatenate(
+            [self._offsets, self._offsets[-1] + np.cumsum(lengths)]
+        )
+        self._blob = np.concatenate(
+            [self._blob, np.frombuffer(b"".join(encoded), dtype=np.uint8)]
+        )
+        self._pending = []
+
+    def save(self, path: Path, name: str) -> None:
+        self._pack()
+        save_array(path / f"{name}.offsets.npy", self._offsets)
+        with atomic_path(path / f"{name}.blob") as tmp:
+            self._blob.tofile(tmp)
+
+    @classmethod
+    def load(cls, path: Path, name: str, mmap: bool) -> "_StringTable":
+        table = cls()
+        table._offsets = load_array(path / f"{name}.offsets.npy", mmap)
+        blob_file = path / f"{name}.blob"
+        if blob_file.stat().st_size == 0:
+            table._blob = np.empty(0, dtype=np.uint8)
+        elif mmap:
+            table._blob = np.memmap(blob_file, dtype=np.uint8, mode="r")
+        else:
+            table._blob = np.fromfile(blob_file, dtype=np.uint8)
+        return table
+
+
+class _Dictionary:
+    """String vocabulary mapping values to dense integer codes."""
+
+    def __init__(self, table: _StringTable | None = None):
+        self.table = table if table is not None else _StringTable()
+        # Reverse lookup, built lazily on first encode after a load
+        self._codes: dict[str, int] | None = None if table is not None else {}
+
+    def encode(self, value: str) -> int:
+        if self._codes is None:
+            self._codes = {self.table[i]: i for i in range(len(self.table))}
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = self.table.append(value)
+        return code
+
+    def decode(self, code: int) -> str:
+        return self.table[code]
+
+    def lookup(self, value: str) -> int | None:
+        """Code of a value, or None if it was never encoded."""
+        if self._codes is None:
+            self._codes = {self.table[i]: i for i in range(len(self.table))}
+        return self._codes.get(value)
+
+    def __len__(self) -> int:
+        return len(self.table)
+
+
+class _FixedColumn:
+    """One fixed-width value per row, with buffered appends."""
+
+    def __init__(self, dtype: type, array: np.ndarray | None = None):
+        self.dtype = dtype
+        self._array = array if array is not None else np.empty(0, dtype=dtype)
+        self._pending: list[int] = []
+
+    def __len__(self) -> int:
+        return len(self._array) + len(self._pending)
+
+    def append(self, value: int) -> None:
+        self._pending.append(value)
+
+    def __getitem__(self, i: int) -> int:
+        if i >= len(self._array):
+            return self._pending[i - len(self._array)]
+        return int(self._array[i])
+
+    def values(self) -> np.ndarray:
+        """All values as one array (packs buffered appends)."""
+        if self._pending:
+            pending = np.asarray(self._pending, dtype=self.dtype)
+            self._array = np.concatenate([self._array, pending])
+            self._pending = []
+        return self._array
+
+
+# =============================================================================
+# Columnar Store
+# =============================================================================
+
+
+class ColumnarStore:
+    """Row-aligned chunk metadata and content in columnar form.
+
+    Replaces a list of per-chunk dicts with:
+    - uint8 codes for enum fields (doc_type, company_size, outcome)
+    - int64 columns for numeric fields
+    - dictionary-encoded int32 codes for repeated strings (doc_id, ...)
+    - offsets + blob for content and any extra metadata (as JSON)
+
+    Saved as .npy/.blob files that are memory-mapped on load, so startup
+    cost and resident memory do not grow with the corpus; dicts are only
+    materialised for rows that are actually read.
+    """
+
+    def __init__(self):
+        self._size = 0
+        self._enums = {name: _FixedColumn(np.uint8) for name in ENUM_COLUMNS}
+        self._ints = {name: _FixedColumn(np.int64) for name in INT_COLUMNS}
+        self._strings = {name: _FixedColumn(np.int32) for name in STRING_COLUMNS}
+        self._vocab = {name: _Dictionary() for name in (*STRING_COLUMNS, *LIST_COLUMNS)}
+        self._list_offsets = _FixedColumn(np.int64, np.zeros(1, dtype=np.int64))
+        self._list_codes = _FixedColumn(np.int32)
+        self._content = _StringTable()
+        self._extras = _StringTable()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, metadata: dict[str, Any], content: str) -> int:
+        """Append one chunk.
+
+        Args:
+            metadata: Chunk metadata (Chunk.to_dict())
+            content: Chunk text
+
+        Returns:
+            Row id of the appended chunk
+        """
+        for name, vocabulary in ENUM_COLUMNS.items():
+            self._enums[name].append(vocabulary.index(metadata.get(name)))
+
+        for name in INT_COLUMNS:
+            value = metadata.get(name)
+            self._ints[name].append(INT_NULL if value is None else value)
+
+        for name in STRING_COLUMNS:
+            value = metadata.get(name)
+            code = STRING_NULL if value is None else self._vocab[name].encode(value)
+            self._strings[name].append(code)
+
+        tags = metadata.get("tags") or []
+        for tag in tags:
+            self._list_codes.append(self._vocab["tags"].encode(tag))
+        self._list_offsets.append(self._list_offsets[self._size] + len(tags))
+
+        extras = {k: v for k, v in metadata.items() if k not in FIELD_ORDER}
+        self._extras.append(json.dumps(extras) if extras else "")
+        self._content.append(content)
+
+        self._size += 1
+        return self._size - 1
+
+    def metadata(self, row: int) -> dict[str, Any]:
+        """Materialise the metadata dict for one row."""
+        values: dict[str, Any] = {}
+
+        for name, vocabulary in ENUM_COLUMNS.items():
+            values[name] = vocabulary[self._enums[name][row]]
+
+        for name in INT_COLUMNS:
+            value = self._ints[name][row]
+            values[name] = None if value == INT_NULL else value
+
+        for name in STRING_COLUMNS:
+            code = self._strings[name][row]
+            values[name] = (
+                None if code == STRING_NULL else self._vocab[name].decode(code)
+            )
+
+        start, end = self._list_offsets[row], self._list_offsets[row + 1]
+        values["tags"] = [
+            self._vocab["tags"].decode(self._list_codes[i]) for i in range(start, end)
+        ]
+
+        data = {name: values[name] for name in FIELD_ORDER}
+        extras = self._extras[row]
+        if extras:
+            data.update(json.loads(extras))
+        return data
+
+    def content(self, row: int) -> str:
+        """Get the text of one row."""
+        return self._content[row]
+
+    # =========================================================================
+    # Filter Evaluation
+    # =========================================================================
+
+    def condition_mask(
+        self, condition: Condition, rows: np.ndarray | None = None
+    ) -> np.ndarray:
+        """Evaluate a filter condition as a boolean mask.
+
+        Enum and string columns evaluate the condition once per distinct
+        value and gather the result by code, so the per-row cost is a
+        single array lookup. Integer columns compare the int64 column
+        directly.
+
+        Args:
+            condition: Compiled filter condition
+            rows: Rows to evaluate (all rows if None)
+
+        Returns:
+            One bool per evaluated row
+        """
+        field = condition.field
+        negated = condition.op in NEGATED_OPS
+        positive = condition.positive
+
+        if field in ENUM_COLUMNS:
+            vocabulary = ENUM_COLUMNS[field]
+            allowed = np.array([condition.test(v) for v in vocabulary], dtype=bool)
+            return allowed[_take(self._enums[field].values(), rows)]
+
+        if field in INT_COLUMNS:
+            mask = _int_mask(_take(self._ints[field].values(), rows), positive)
+            return ~mask if negated else mask
+
+        if field in STRING_COLUMNS:
+            # Last slot is the null code (STRING_NULL = -1)
+            allowed = self._vocab_mask(field, positive)
+            mask = allowed[_take(self._strings[field].values(), rows)]
+            return ~mask if negated else mask
+
+        if field in LIST_COLUMNS:
+            mask = self._list_mask(positive, rows)
+            return ~mask if negated else mask
+
+        # Extra (non-schema) fields are stored as JSON: evaluated per row
+        selected = range(self._size) if rows is None else rows
+        return np.fromiter(
+            (condition.matches(self._extra(row, field)) for row in selected),
+            dtype=bool,
+            count=len(selected),
+        )
+
+    def _vocab_mask(self, field: str, condition: Condition) -> np.ndarray:
+        """Per-code match of a positive condition, plus a trailing null slot."""
+        vocabulary = self._vocab[field]
+        allowed = np.zeros(len(vocabulary) + 1, dtype=bool)
+        if condition.op in POSTING_OPS:
+            for value in condition.values:
+                if value is None:
+                    allowed[-1] = True
+                elif isinstance(value, str):
+                    code = vocabulary.lookup(value)
+                    if code is not None:
+                        allowed[code] = True
+        else:
+            for code in range(len(vocabulary)):
+                allowed[code] = condition.test(vocabulary.decode(code))
+        return allowed
+
+    def _list_mask(self, condition: Condition, rows: np.ndarray | None) -> np.ndarray:
+        """Rows with any list element matching a positive condition."""
+        element_hits = self._vocab_mask("tags", condition)[:-1][
+            self._list_codes.values()
+        ]
+        hits = np.concatenate([[0], np.cumsum(element_hits)])
+        offsets = self._list_offsets.values()
+        selected = np.arange(self._size) if rows is None else rows
+        starts, ends = offsets[selected], offsets[selected + 1]
+        mask = hits[ends] > hits[starts]
+        if condition.op in POSTING_OPS and None in condition.values:
+            mask |= starts == ends
+        return mask
+
+    def _extra(self, row: int, field: str) -> Any:
+        extras = self._extras[row]
+        return json.loads(extras).get(field) if extras else None
+
+    def iter_metadata(self) -> Iterator[dict[str, Any]]:
+        """Materialise metadata for every row (O(n), avoid on hot paths)."""
+        for row in range(self._size):
+            yield self.metadata(row)
+
+    def save(self, path: Path) -> None:
+        """Write all columns to a directory."""
+        path.mkdir(parents=True, exist_ok=True)
+
+        for name, column in self._enums.items():
+            save_array(path / f"{name}.npy", column.values())
+        for name, column in self._ints.items():
+            save_array(path / f"{name}.npy", column.values())
+        for name, column in self._strings.items():
+            save_array(path / f"{name}.npy", column.values())
+        for name, vocabulary in self._vocab.items():
+            vocabulary.table.save(path, f"{name}.vocab")
+
+        save_array(path / "tags.offsets.npy", self._list_offsets.values())
+        save_array(path / "tags.codes.npy", self._list_codes.values())
+        self._content.save(path, "content")
+        self._extras.save(path, "extras")
+
+        with atomic_path(path / "columns.json") as tmp:
+            tmp.write_text(
+                json.dumps({"schema_version": SCHEMA_VERSION, "rows": self._size})
+            )
+
+    @classmethod
+    def load(cls, path: Path, mmap: bool = True) -> "ColumnarStore":
+        """Open columns written by save().
+
+        Args:
+            path: Directory containing the columns
+            mmap: Memory-map columns instead of reading them into memory
+        """
+        manifest = json.loads((path / "columns.json").read_text())
+        if manifest["schema_version"] != SCHEMA_VERSION:
+            raise ValueError(
+                f"Unsupported column schema version: {manifest['schema_version']}"
+            )
+
+        store = cls()
+        store._size = manifest["rows"]
+
+        def fixed(name: str, dtype: type) -> _FixedColumn:
+            return _FixedColumn(dtype, load_array(path / f"{name}.npy", mmap))
+
+        store._enums = {name: fixed(name, np.uint8) for name in ENUM_COLUMNS}
+        store._ints = {name: fixed(name, np.int64) for name in INT_COLUMNS}
+        store._strings = {name: fixed(name, np.int32) for name in STRING_COLUMNS}
+        store._vocab = {
+            name: _Dictionary(_StringTable.load(path, f"{name}.vocab", mmap))
+            for name in store._vocab
+        }
+        store._list_offsets = fixed("tags.offsets", np.int64)
+        store._list_codes = fixed("tags.codes", np.int32)
+        store._content = _StringTable.load(path, "content", mmap)
+        store._extras = _StringTable.load(path, "extras", mmap)
+        return store
+
+
+def _take(values: np.ndarray, rows: np.ndarray | None) -> np.ndarray:
+    return values if rows is None else values[rows]
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _int_mask(values: np.ndarray, condition: Condition) -> np.ndarray:
+    """Match a positive condition against an int64 column (nulls = INT_NULL)."""
+    nulls = values == INT_NULL
+    if condition.op in POSTING_OPS:
+        mask = np.zeros(len(values), dtype=bool)
+        for value in condition.values:
+            if value is None:
+                mask |= nulls
+            elif _is_number(value):
+                mask |= values == value
+        return mask
+
+    if not _is_number(condition.value):
+        return np.zeros(len(values), dtype=bool)
+    return ~nulls & COMPARE[condition.op](values, condition.value)
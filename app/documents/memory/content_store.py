@@ -0,0 +1,96 @@
+"""Durable chunk content store backed by SQLite."""
+
+import sqlite3
+import threading
+from collections.abc import Iterable
+from pathlib import Path
+
+from app.core import get_logger
+
+logger = get_logger(__name__)
+
+# SQLite's default limit on host parameters per statement is 999 on old
+# builds; stay below it for IN (...) lookups and deletes
+MAX_PARAMS = 900
+
+
+class ContentStore:
+    """Full chunk text keyed by vector id, stored in a local SQLite file.
+
+    Used by vector stores whose backend keeps only a short preview of the
+    text (Pinecone metadata is size-limited). Content is written during
+    ingestion and read back in one query per search, so full text
+    survives restarts without keeping the corpus in memory.
+
+    A single connection is shared by all threads and serialised with a
+    lock; lookups are primary-key reads and take microseconds.
+    """
+
+    def __init__(self, path: Path):
+        """Open (or create) the store.
+
+        Args:
+            path: SQLite database file
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            # WAL lets other processes read while one ingests
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS content ("
+                "id TEXT PRIMARY KEY, text TEXT NOT NULL) WITHOUT ROWID"
+            )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM content").fetchone()[0]
+
+    def put_many(self, items: Iterable[tuple[str, str]]) -> None:
+        """Insert or replace (id, text) pairs in one transaction."""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO content (id, text) VALUES (?, ?)", items
+            )
+
+    def get_many(self, ids: list[str]) -> dict[str, str]:
+        """Look up texts by id (missing ids are left out)."""
+        found: dict[str, str] = {}
+        with self._lock:
+            for batch in _batches(ids):
+                rows = self._conn.execute(
+                    f"SELECT id, text FROM content WHERE id IN ({_marks(batch)})",
+                    batch,
+                )
+                found.update(rows.fetchall())
+        return found
+
+    def delete_many(self, ids: list[str]) -> None:
+        """Delete texts by id."""
+        with self._lock, self._conn:
+            for batch in _batches(ids):
+                self._conn.execute(
+                    f"DELETE FROM content WHERE id IN ({_marks(batch)})", batch
+                )
+
+    def clear(self) -> None:
+        """Delete all texts."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM content")
+        logger.info(f"Cleared content store {self.path}")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def _batches(ids: list[str]) -> Iterable[list[str]]:
+    for i in range(0, len(ids), MAX_PARAMS):
+        yield ids[i : i + MAX_PARAMS]
+
+
+def _marks(batch: list[str]) -> str:
+    return ",".join("?" * len(batch))
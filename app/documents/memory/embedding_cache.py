@@ -0,0 +1,329 @@
+"""Persistent content-addressed embedding cache for ingestion.
+
+Chunk embeddings depend only on the model and the chunk text, so they
+are cached on disk under (model, hash of text) and reused by every
+ingest. A re-ingest of an unchanged knowledge base then makes no
+embeddings calls at all.
+
+Layout, one directory per model under .index/embedding_cache/:
+
+    meta.json     model, dimension and row dtype
+    keys.bin      16-byte BLAKE2b digest of each text, one per row
+    vectors.bin   raw float32 or float16 rows, in the same order
+
+Both files are append-only. Rows are written before their keys, and a
+crash can leave a partial row or key at the end; load keeps only rows
+that have both, so a torn append is simply re-embedded next time.
+
+API workers share the directory. Appends hold an exclusive lock on its
+.lock file and first read the keys other processes appended, so every
+process numbers rows by their position in the files.
+"""
+
+import asyncio
+import fcntl
+import hashlib
+import json
+import os
+import re
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, fields
+from pathlib import Path
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from app.core import INDEX_PATH, get_logger, settings
+from app.documents.memory.batching import estimate_tokens
+from app.documents.memory.files import atomic_path
+
+logger = get_logger(__name__)
+
+CACHE_PATH = INDEX_PATH / "embedding_cache"
+EMBEDDING_MODEL = "text-embedding-3-small"
+
+KEY_BYTES = 16
+LOCK_FILE = ".lock"
+CACHE_DTYPES = ("float32", "float16")
+
+_caches: dict[tuple[Path, str], "EmbeddingCache"] = {}
+_caches_lock = threading.Lock()
+
+
+@dataclass
+class CacheStats:
+    """Embedding cache counters (texts, not requests)."""
+
+    hits: int = 0
+    misses: int = 0
+    tokens_saved: int = 0  # Estimated tokens not sent to the embeddings API
+
+    def __sub__(self, other: "CacheStats") -> "CacheStats":
+        return CacheStats(
+            *(getattr(self, f.name) - getattr(other, f.name) for f in fields(self))
+        )
+
+
+def text_key(text: str) -> bytes:
+    """Cache key of a text (the model is the cache directory)."""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=KEY_BYTES).digest()
+
+
+class EmbeddingCache:
+    """Embeddings of one model, keyed by text digest, stored on disk.
+
+    The digest -> row map is held in memory; rows are read from a
+    memory-mapped file, so only looked-up rows are paged in. Writes are
+    serialised with a thread lock (ingestion embeds batches on several
+    threads) and a file lock (workers share the files), and fsynced per
+    batch.
+    """
+
+    def __init__(self, path: Path, model: str, dtype: str | None = None):
+        """Open (or create) the cache of a model.
+
+        Args:
+            path: Cache root directory
+            model: Embedding model name (one subdirectory per model)
+            dtype: Row dtype for a new cache (default: EMBEDDING_CACHE_DTYPE);
+                an existing cache keeps the dtype it was created with
+        """
+        self.model = model
+        self.path = path / re.sub(r"[^\w.-]", "_", model)
+        self.dtype = np.dtype(dtype or settings.embedding_cache_dtype)
+        if self.dtype.name not in CACHE_DTYPES:
+            raise ValueError(f"Embedding cache dtype must be one of {CACHE_DTYPES}")
+        self.dim: int | None = None
+        self.stats = CacheStats()
+
+        self._lock = threading.Lock()
+        self._rows: dict[bytes, int] = {}
+        self._synced = 0  # Rows of the files already read into _rows
+        self._mapped: np.ndarray | None = None
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    @property
+    def _keys_file(self) -> Path:
+        return self.path / "keys.bin"
+
+    @property
+    def _vectors_file(self) -> Path:
+        return self.path / "vectors.bin"
+
+    def _load(self) -> None:
+        if not (self.path / "meta.json").exists():
+            return
+        with self._file_lock():
+            count = self._sync()
+        logger.info(f"Embedding cache {self.path}: {count} embeddings")
+
+    @contextmanager
+    def _file_lock(self) -> Iterator[None]:
+        """Exclusive lock on the cache files, shared by all processes."""
+        self.path.mkdir(parents=True, exist_ok=True)
+        with open(self.path / LOCK_FILE, "w") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _sync(self) -> int:
+        """Read keys appended since the last sync (hold the file lock).
+
+        Returns:
+            Number of rows in the files, i.e. the row of the next append
+        """
+        if self.dim is None:
+            meta_file = self.path / "meta.json"
+            if not meta_file.exists():
+                return 0
+            meta = json.loads(meta_file.read_text())
+            self.dim, self.dtype = meta["dim"], np.dtype(meta["dtype"])
+
+        row_bytes = self.dim * self.dtype.itemsize
+        key_bytes = _size(self._keys_file)
+        vector_bytes = _size(self._vectors_file)
+        count = min(key_bytes // KEY_BYTES, vector_bytes // row_bytes)
+
+        # Drop a torn append (crashed writer) so later appends stay aligned
+        if key_bytes != count * KEY_BYTES or vector_bytes != count * row_bytes:
+            logger.warning(f"Embedding cache {self.path}: dropping partial append")
+            for file, size in (
+                (self._keys_file, count * KEY_BYTES),
+                (self._vectors_file, count * row_bytes),
+            ):
+                if file.exists():
+                    os.truncate(file, size)
+
+        if count > self._synced:
+            with open(self._keys_file, "rb") as f:
+                f.seek(self._synced * KEY_BYTES)
+                keys = f.read((count - self._synced) * KEY_BYTES)
+            for i in range(count - self._synced):
+                key = keys[i * KEY_BYTES : (i + 1) * KEY_BYTES]
+                self._rows.setdefault(key, self._synced + i)
+            self._synced = count
+        return count
+
+    def _vectors(self, min_rows: int) -> np.ndarray:
+        """Memory map of the rows, re-mapped after appends."""
+        if self._mapped is None or len(self._mapped) < min_rows:
+            self._mapped = np.memmap(
+                self._vectors_file, dtype=self.dtype, mode="r"
+            ).reshape(-1, self.dim)
+        return self._mapped
+
+    def get_many(self, texts: list[str]) -> list[np.ndarray | None]:
+        """Cached float32 embeddings of texts (None where missing)."""
+        with self._lock:
+            rows = [self._rows.get(text_key(text)) for text in texts]
+            found = [row for row in rows if row is not None]
+            if not found:
+                return [None] * len(texts)
+            vectors = np.asarray(self._vectors(max(found) + 1)[found], np.float32)
+
+        hits = iter(vectors)
+        return [None if row is None else next(hits) for row in rows]
+
+    def put_many(self, texts: list[str], vectors: np.ndarray) -> None:
+        """Store embeddings of texts (texts already cached are skipped)."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        with self._lock, self._file_lock():
+            # Rows are numbered by file position: other workers may have
+            # appended since this process last read the files
+            start = self._sync()
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+                meta = {"model": self.model, "dim": self.dim, "dtype": self.dtype.name}
+                with atomic_path(self.path / "meta.json") as tmp:
+                    tmp.write_text(json.dumps(meta))
+            if vectors.shape[1] != self.dim:
+                raise ValueError(
+                    f"Embedding dimension {vectors.shape[1]} does not match "
+                    f"the cache ({self.dim})"
+                )
+
+            new: dict[bytes, int] = {}
+            for i, text in enumerate(texts):
+                key = text_key(text)
+                if key not in self._rows and key not in new:
+                    new[key] = i
+            if not new:
+                return
+
+            rows = vectors[list(new.values())].astype(self.dtype)
+            _append(self._vectors_file, rows.tobytes())
+            _append(self._keys_file, b"".join(new))
+            self._rows.update((key, start + i) for i, key in enumerate(new))
+            self._synced = start + len(new)
+
+    def record(self, texts: list[str], missing: list[str]) -> None:
+        """Count the outcome of one lookup."""
+        with self._lock:
+            self.stats.hits += len(texts) - len(missing)
+            self.stats.misses += len(missing)
+            self.stats.tokens_saved += sum(map(estimate_tokens, texts)) - sum(
+                map(estimate_tokens, missing)
+            )
+
+
+def _size(file: Path) -> int:
+    return file.stat().st_size if file.exists() else 0
+
+
+def _append(file: Path, data: bytes) -> None:
+    with open(file, "ab") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+# =============================================================================
+# Embeddings Wrapper
+# =============================================================================
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings client that consults an EmbeddingCache first.
+
+    Document embeddings are served from the cache and only the misses
+    are sent to the wrapped client (then cached). Query embeddings pass
+    straight through.
+    """
+
+    def __init__(self, embeddings: Embeddings, cache: EmbeddingCache):
+        self.embeddings = embeddings
+        self.cache = cache
+        self.model = cache.model
+
+    def _lookup(self, texts: list[str]) -> tuple[list, list[str]]:
+        vectors = self.cache.get_many(texts)
+        misses = [text for text, vector in zip(texts, vectors) if vector is None]
+        self.cache.record(texts, misses)
+        # Each distinct missing text is embedded once
+        return vectors, list(dict.fromkeys(misses))
+
+    def _fill(
+        self, texts: list[str], vectors: list, missing: list[str], embedded: list
+    ) -> list[list[float]]:
+        if missing:
+            self.cache.put_many(missing, np.asarray(embedded, dtype=np.float32))
+        by_text = dict(zip(missing, embedded))
+        return [
+            list(by_text[text]) if vector is None else vector.tolist()
+            for text, vector in zip(texts, vectors)
+        ]
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        vectors, missing = self._lookup(texts)
+        embedded = self.embeddings.embed_documents(missing) if missing else []
+        return self._fill(texts, vectors, missing, embedded)
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        vectors, missing = await asyncio.to_thread(self._lookup, texts)
+        embedded = await self.embeddings.aembed_documents(missing) if missing else []
+        return await asyncio.to_thread(self._fill, texts, vectors, missing, embedded)
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embeddings.embed_query(text)
+
+    async def aembed_query(self, text: str) -> list[float]:
+        return await self.embeddings.aembed_query(text)
+
+
+def shared_cache(model: str = EMBEDDING_MODEL) -> EmbeddingCache:
+    """The process-wide cache of a model under CACHE_PATH."""
+    with _caches_lock:
+        key = (CACHE_PATH, model)
+        if key not in _caches:
+            _caches[key] = EmbeddingCache(CACHE_PATH, model)
+        return _caches[key]
+
+
+def cached_embeddings(
+    embeddings: Embeddings, model: str = EMBEDDING_MODEL
+) -> Embeddings:
+    """Put the shared cache of a model in front of an embeddings client.
+
+    Returns the client unchanged if EMBEDDING_CACHE is off.
+    """
+    if not settings.embedding_cache:
+        return embeddings
+    return CachedEmbeddings(embeddings, shared_cache(model))
+
+
+def cache_stats() -> CacheStats:
+    """Counters summed over the caches opened by this process."""
+    total = CacheStats()
+    with _caches_lock:
+        for cache in _caches.values():
+            total.hits += cache.stats.hits
+            total.misses += cache.stats.misses
+            total.tokens_saved += cache.stats.tokens_saved
+    return total
@@ -1,18 +1,30 @@
-"""Vector store singleton."""
+"""Vector store and document registry singletons."""
 
 from app.core import settings
 from app.core.constants import INDEX_PATH
 from app.documents.memory.base import VectorStoreRepository
+from app.documents.memory.registry import DocumentRegistry
+from app.documents.memory.snapshots import VersionedVectorStore
 
 
 def _create_store() -> VectorStoreRepository:
     """Create the vector store based on config."""
     store_type = settings.vector_store_type.lower()
 
+    # Local stores serve immutable versions under INDEX_PATH (hot-swapped)
     if store_type == "faiss":
         from app.documents.memory.faiss_store import FAISSVectorStore
 
-        return FAISSVectorStore(index_path=INDEX_PATH)
+        return VersionedVectorStore(
+            lambda path: FAISSVectorStore(index_path=path), INDEX_PATH
+        )
+
+    if store_type == "faiss_sharded":
+        from app.documents.memory.sharded_store import ShardedFAISSVectorStore
+
+        return VersionedVectorStore(
+            lambda path: ShardedFAISSVectorStore(index_path=path), INDEX_PATH
+        )
 
     if store_type == "pinecone":
         from app.documents.memory.pinecone_store import PineconeVectorStore
@@ -23,3 +35,4 @@ def _create_store() -> VectorStoreRepository:
 
 
 vector_store = _create_store()
+document_registry = DocumentRegistry(INDEX_PATH / "registry.sqlite")
@@ -0,0 +1,334 @@
+"""FAISS index construction and search-time tuning."""
+
+import math
+from enum import Enum
+
+import faiss
+import numpy as np
+
+from app.core import get_logger
+
+logger = get_logger(__name__)
+
+
+class IndexType(str, Enum):
+    """Supported FAISS index layouts."""
+
+    AUTO = "auto"  # Pick based on corpus size
+    FLAT = "flat"  # Exact brute-force scan
+    IVF = "ivf"  # Inverted file with flat lists (needs training)
+    HNSW = "hnsw"  # Graph-based approximate search
+
+
+class Quantization(str, Enum):
+    """Vector encodings stored in the index."""
+
+    NONE = "none"  # float32 (4 bytes per dimension)
+    SQ8 = "sq8"  # 8-bit scalar quantization (4x smaller)
+    PQ = "pq"  # Product quantization, 1 byte per 4 dimensions (16x smaller)
+
+
+# =============================================================================
+# Index Configuration
+# =============================================================================
+
+# Auto-selection thresholds (number of vectors)
+AUTO_HNSW_MIN_VECTORS = 50_000  # Below this, a flat scan is fast enough
+AUTO_IVF_MIN_VECTORS = 1_000_000  # Above this, HNSW graph build/memory dominates
+
+# IVF training: FAISS needs ~39 points per centroid and ignores more than 256
+IVF_MIN_POINTS_PER_LIST = 39
+IVF_MAX_POINTS_PER_LIST = 256
+
+# HNSW graph construction quality (search quality is tuned via efSearch)
+HNSW_EF_CONSTRUCTION = 200
+
+# Product quantization: one 8-bit code (256 centroids) per 4 dimensions.
+# Below PQ_MIN_VECTORS the codebooks cannot be trained well, so smaller
+# corpora are stored unquantized.
+PQ_DIMS_PER_CODE = 4
+PQ_MIN_VECTORS = 256 * IVF_MIN_POINTS_PER_LIST
+
+# Training sample cap for quantizers without IVF lists
+QUANTIZER_MAX_TRAINING_VECTORS = 65_536
+
+
+def select_index_type(index_type: IndexType, num_vectors: int) -> IndexType:
+    """Resolve AUTO to a concrete index type for a corpus size.
+
+    Args:
+        index_type: Configured index type
+        num_vectors: Number of vectors the index will hold
+
+    Returns:
+        Concrete index type (never AUTO)
+    """
+    if index_type != IndexType.AUTO:
+        return index_type
+
+    if num_vectors < AUTO_HNSW_MIN_VECTORS:
+        return IndexType.FLAT
+    if num_vectors < AUTO_IVF_MIN_VECTORS:
+        return IndexType.HNSW
+    return IndexType.IVF
+
+
+def select_quantization(quantization: Quantization, num_vectors: int) -> Quantization:
+    """Resolve the quantization to use for a corpus size.
+
+    PQ falls back to unquantized vectors until there is enough data to
+    train its codebooks.
+    """
+    if quantization == Quantization.PQ and num_vectors < PQ_MIN_VECTORS:
+        return Quantization.NONE
+    return quantization
+
+
+def ivf_nlist(num_vectors: int) -> int:
+    """Number of IVF lists for a corpus size (~4 * sqrt(n), trainable)."""
+    nlist = int(4 * math.sqrt(num_vectors))
+    return max(1, min(nlist, num_vectors // IVF_MIN_POINTS_PER_LIST))
+
+
+def build_index(
+    index_type: IndexType,
+    dim: int,
+    num_vectors: int,
+    hnsw_m: int = 32,
+    quantization: Quantization = Quantization.NONE,
+) -> faiss.Index:
+    """Create an empty inner-product index addressed by explicit ids.
+
+    Flat and HNSW indexes are wrapped in an IDMap2 so vectors keep their
+    row id when others are removed; IVF indexes store ids natively.
+
+    Args:
+        index_type: Concrete index type
+        dim: Vector dimension
+        num_vectors: Expected corpus size (sizes IVF lists)
+        hnsw_m: HNSW graph degree
+        quantization: Encoding of the stored vectors
+
+    Returns:
+        Empty FAISS index (IVF and quantized indexes still need training)
+    """
+    if quantization == Quantization.SQ8:
+        encoding = "SQ8"
+    elif quantization == Quantization.PQ:
+        encoding = f"PQ{dim // PQ_DIMS_PER_CODE}"
+    else:
+        encoding = "Flat"
+
+    if index_type == IndexType.IVF:
+        description = f"IVF{ivf_nlist(num_vectors)},{encoding}"
+    elif index_type == IndexType.HNSW:
+        separator = "," if quantization == Quantization.NONE else "_"
+        description = f"IDMap2,HNSW{hnsw_m}{separator}{encoding}"
+    else:
+        description = f"IDMap2,{encoding}"
+
+    index = faiss.index_factory(dim, description, faiss.METRIC_INNER_PRODUCT)
+
+    if index_type == IndexType.HNSW:
+        _base_index(index).hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+    if quantization == Quantization.PQ:
+        # Polysemous codes are only used by Hamming-filtered search, and
+        # training them dominates build time
+        _codes_index(index).do_polysemous_training = False
+
+    return index
+
+
+def _base_index(index: faiss.Index) -> faiss.Index:
+    """Unwrap an IDMap to the index that stores the vectors."""
+    index = faiss.downcast_index(index)
+    if isinstance(index, faiss.IndexIDMap):
+        return faiss.downcast_index(index.index)
+    return index
+
+
+def index_type_of(index: faiss.Index) -> IndexType:
+    """Detect the layout of an existing index (e.g., after loading)."""
+    index = _base_index(index)
+    if isinstance(index, faiss.IndexHNSW):
+        return IndexType.HNSW
+    if isinstance(index, faiss.IndexIVF):
+        return IndexType.IVF
+    return IndexType.FLAT
+
+
+def _codes_index(index: faiss.Index) -> faiss.Index:
+    """Unwrap IDMap and HNSW wrappers to the index that encodes vectors."""
+    index = _base_index(index)
+    if isinstance(index, faiss.IndexHNSW):
+        return faiss.downcast_index(index.storage)
+    return index
+
+
+def quantization_of(index: faiss.Index) -> Quantization:
+    """Detect the vector encoding of an existing index."""
+    index = _codes_index(index)
+    if isinstance(index, (faiss.IndexScalarQuantizer, faiss.IndexIVFScalarQuantizer)):
+        return Quantization.SQ8
+    if isinstance(index, (faiss.IndexPQ, faiss.IndexIVFPQ)):
+        return Quantization.PQ
+    return Quantization.NONE
+
+
+def has_stable_ids(index: faiss.Index) -> bool:
+    """Whether vectors are addressed by explicit ids (vs. insertion order).
+
+    Indexes written before ids were introduced are positional and get
+    rebuilt on the next write.
+    """
+    wrapped = isinstance(faiss.downcast_index(index), faiss.IndexIDMap)
+    return wrapped or index_type_of(index) == IndexType.IVF
+
+
+def supports_removal(index: faiss.Index) -> bool:
+    """Whether vectors can be physically removed (HNSW graphs cannot)."""
+    return index_type_of(index) != IndexType.HNSW
+
+
+def needs_rebuild(
+    index: faiss.Index,
+    index_type: IndexType,
+    num_vectors: int,
+    quantization: Quantization = Quantization.NONE,
+) -> bool:
+    """Check whether an index should be rebuilt to hold num_vectors.
+
+    Rebuilds happen when the target layout or encoding changes (auto mode
+    crossing a threshold, PQ becoming trainable), when the index predates
+    explicit ids, when an index was never trained, or when the corpus has
+    outgrown the IVF list count it was trained with.
+    """
+    if index_type_of(index) != index_type:
+        return True
+    if quantization_of(index) != quantization:
+        return True
+    if not has_stable_ids(index):
+        return True
+    if not index.is_trained:
+        return True
+    if index_type == IndexType.IVF:
+        trained_nlist = faiss.extract_index_ivf(index).nlist
+        return ivf_nlist(num_vectors) >= 2 * trained_nlist
+    return False
+
+
+def train_index(index: faiss.Index, vectors: np.ndarray) -> None:
+    """Train an index on (a sample of) the given vectors if required."""
+    if index.is_trained:
+        return
+
+    if index_type_of(index) == IndexType.IVF:
+        nlist = faiss.extract_index_ivf(index).nlist
+        max_points = nlist * IVF_MAX_POINTS_PER_LIST
+        description = f"IVF index ({nlist} lists)"
+    else:
+        max_points = QUANTIZER_MAX_TRAINING_VECTORS
+        description = f"{quantization_of(index).value} quantizer"
+
+    if len(vectors) > max_points:
+        rng = np.random.default_rng(0)
+        sample = rng.choice(len(vectors), size=max_points, replace=False)
+        vectors = vectors[np.sort(sample)]
+
+    logger.info(f"Training {description} on {len(vectors)} vectors")
+    index.train(vectors)  # type: ignore[call-arg]
+
+
+def reconstruct_ids(index: faiss.Index, ids: np.ndarray) -> np.ndarray:
+    """Return the stored vectors for specific ids."""
+    if len(ids) == 0:
+        return np.empty((0, index.d), dtype=np.float32)
+    _ensure_direct_map(index)
+    return index.reconstruct_batch(ids)
+
+
+def _ensure_direct_map(index: faiss.Index) -> None:
+    """IVF indexes need an id -> list map before vectors can be read back.
+
+    A hashtable map (unlike the array map) also supports remove_ids.
+    """
+    if index_type_of(index) != IndexType.IVF:
+        return
+    ivf = faiss.extract_index_ivf(index)
+    if ivf.direct_map.type != faiss.DirectMap.Hashtable:
+        ivf.set_direct_map_type(faiss.DirectMap.Hashtable)
+
+
+def remove_ids(index: faiss.Index, ids: np.ndarray) -> int:
+    """Physically remove vectors by id (callers check supports_removal)."""
+    _ensure_direct_map(index)
+    return index.remove_ids(np.asarray(ids, dtype=np.int64))
+
+
+def search_params(
+    index: faiss.Index,
+    nprobe: int,
+    ef_search: int,
+    selector: faiss.IDSelector | None = None,
+) -> faiss.SearchParameters | None:
+    """Build per-query search parameters for the index layout.
+
+    Args:
+        index: Index being searched
+        nprobe: IVF lists probed per query
+        ef_search: HNSW candidate list size per query
+        selector: Optional ID selector restricting the searched vectors
+
+    Returns:
+        Search parameters, or None for unfiltered flat searches
+    """
+    kwargs = {"sel": selector} if selector is not None else {}
+
+    index_type = index_type_of(index)
+    if index_type == IndexType.IVF:
+        return faiss.SearchParametersIVF(nprobe=nprobe, **kwargs)
+    if index_type == IndexType.HNSW:
+        return faiss.SearchParametersHNSW(efSearch=ef_search, **kwargs)
+    return faiss.SearchParameters(**kwargs) if kwargs else None
+
+
+def truncate_vectors(vectors: np.ndarray, dim: int) -> np.ndarray:
+    """Keep the first dim components and renormalise to unit length.
+
+    text-embedding-3 models are trained so that leading dimensions carry
+    most of the signal (Matryoshka representations).
+    """
+    if vectors.shape[1] == dim:
+        return vectors
+    truncated = np.ascontiguousarray(vectors[:, :dim], dtype=np.float32)
+    norms = np.linalg.norm(truncated, axis=1, keepdims=True)
+    return truncated / np.maximum(norms, np.finfo(np.float32).tiny)
+
+
+def rerank_exact(
+    query_np: np.ndarray,
+    ids: np.ndarray,
+    vectors: np.ndarray,
+    top_k: int,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Re-score candidate ids with full-precision vectors.
+
+    Args:
+        query_np: Query matrix (one row per query)
+        ids: Candidate ids from a first-pass search (-1 = empty slot)
+        vectors: Full-precision vectors indexed by id (an array, possibly
+            memory-mapped, or a VectorStorage)
+        top_k: Results to keep per query
+
+    Returns:
+        (scores, ids) matrices of width top_k, best first
+    """
+    valid = ids != -1
+    candidates = vectors[np.where(valid, ids, 0).ravel()].reshape(*ids.shape, -1)
+    scores = np.einsum("qkd,qd->qk", candidates, query_np)
+    scores[~valid] = -np.inf
+
+    order = np.argsort(-scores, axis=1)[:, :top_k]
+    scores = np.take_along_axis(scores, order, axis=1)
+    ids = np.where(np.isinf(scores), -1, np.take_along_axis(ids, order, axis=1))
+    return scores, ids
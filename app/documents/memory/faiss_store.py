@@ -1,19 +1,79 @@
 """FAISS vector store implementation."""
 
+import asyncio
 import json
+from collections.abc import Iterator
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Any
 
 import faiss
 import numpy as np
+from langchain_core.embeddings import Embeddings
 from langchain_openai import OpenAIEmbeddings
 
 from app.core import get_logger, settings
+from app.documents.filters import select_rows
 from app.documents.memory.base import VectorStoreRepository
-from app.documents.schemas import Chunk, SearchQuery, SearchResponse, SearchResult
+from app.documents.memory.batching import ScheduledEmbeddings
+from app.documents.memory.bm25 import (
+    BM25Index,
+    CorpusStats,
+    reciprocal_rank_fusion,
+)
+from app.documents.memory.columnar import ColumnarStore
+from app.documents.memory.embedding_cache import EMBEDDING_MODEL, cached_embeddings
+from app.documents.memory.faiss_index import (
+    IndexType,
+    Quantization,
+    build_index,
+    has_stable_ids,
+    index_type_of,
+    needs_rebuild,
+    quantization_of,
+    reconstruct_ids,
+    remove_ids,
+    rerank_exact,
+    search_params,
+    select_index_type,
+    select_quantization,
+    supports_removal,
+    train_index,
+    truncate_vectors,
+)
+from app.documents.memory.files import atomic_path, load_array, save_array
+from app.documents.memory.metadata_index import MetadataIndex
+from app.documents.memory.mmr import mmr_depth, mmr_select, relevance_of
+from app.documents.memory.query_embeddings import (
+    aembed_queries,
+    lexical_positions,
+    submit_query_embeddings,
+    wait_query_embeddings,
+)
+from app.documents.memory.vectors import VectorStorage
+from app.documents.memory.wal import (
+    WAL_FILE,
+    WalOp,
+    WalRecord,
+    WriteAheadLog,
+    read_records,
+)
+from app.documents.schemas import (
+    Chunk,
+    SearchMode,
+    SearchQuery,
+    SearchResponse,
+    SearchResult,
+)
 
 logger = get_logger(__name__)
 
+# Snapshot state (last write-ahead log record included in the snapshot)
+SNAPSHOT_FILE = "snapshot.json"
+
+# Filters matching at most this many chunks are scored exactly instead of
+# searching the index with an ID selector
+EXACT_SCAN_MAX_CANDIDATES = 20_000
+
 
 class FAISSVectorStore(VectorStoreRepository):
     """FAISS-based vector store implementation.
@@ -23,34 +83,97 @@ class FAISSVectorStore(VectorStoreRepository):
 
     Supports:
     - Semantic search via embeddings
-    - Metadata filtering (post-retrieval)
-    - Persistence to disk
+    - Flat, IVF and HNSW index layouts (auto-selected by corpus size)
+    - SQ8/PQ quantized vectors with exact re-ranking
+    - Truncated (Matryoshka) first-pass vectors with full-dim re-ranking
+    - Metadata filtering (pre-retrieval via an inverted metadata index)
+    - Lexical (BM25) and hybrid search, with BM25 as the fallback when
+      the embeddings API is slow or down
+    - Incremental upsert/delete by doc_id
+    - Persistence to disk (full snapshots plus a write-ahead log)
 
-    Note: FAISS doesn't support native metadata filtering,
-    so we filter post-retrieval. For production with large datasets,
-    consider Pinecone which filters pre-retrieval.
+    Note: FAISS doesn't store metadata, so filters are resolved against
+    a local inverted index and pushed into the search as an ID selector.
     """
 
     def __init__(
         self,
         embedding_dim: int = 1536,  # OpenAI text-embedding-3-small
         index_path: Path | None = None,
+        index_type: IndexType | str | None = None,
+        nprobe: int | None = None,
+        ef_search: int | None = None,
+        mmap: bool | None = None,
+        quantization: Quantization | str | None = None,
+        rerank_factor: int | None = None,
+        truncate_dim: int | None = None,
+        embeddings: Embeddings | None = None,
+        wal: bool | None = None,
     ):
         self.embedding_dim = embedding_dim
         self.index_path = index_path
 
-        # Initialize embeddings
-        self.embeddings = OpenAIEmbeddings(
-            api_key=settings.openai_api_key,
-            model="text-embedding-3-small",
+        # Memory-map the index file on load (read-only, shared page cache)
+        self.mmap = settings.faiss_mmap if mmap is None else mmap
+        self._index_mapped = False
+
+        # Index layout and search-time knobs (default to config)
+        self.index_type = IndexType((index_type or settings.faiss_index_type).lower())
+        self.nprobe = nprobe or settings.faiss_nprobe
+        self.ef_search = ef_search or settings.faiss_ef_search
+
+        # Compact vector encoding; quantized candidates are re-ranked
+        # against full-precision vectors (rerank_factor * top_k of them)
+        self.quantization = Quantization(
+            (quantization or settings.faiss_quantization).lower()
+        )
+        self.rerank_factor = (
+            settings.faiss_rerank_factor if rerank_factor is None else rerank_factor
+        )
+
+        # Index the first truncate_dim dimensions only (0 = full vectors)
+        truncate_dim = (
+            settings.faiss_truncate_dim if truncate_dim is None else truncate_dim
         )
+        if not 0 <= truncate_dim <= embedding_dim:
+            raise ValueError(f"truncate_dim must be between 0 and {embedding_dim}")
+        self.index_dim = truncate_dim or embedding_dim
 
-        # Inner product index (= cosine similarity for normalized vectors)
-        self.index = faiss.IndexFlatIP(embedding_dim)
+        # Initialize embeddings (shards of a sharded store share one client)
+        self.embeddings = embeddings or cached_embeddings(
+            ScheduledEmbeddings(
+                OpenAIEmbeddings(api_key=settings.openai_api_key, model=EMBEDDING_MODEL)
+            )
+        )
+
+        # Inner product index (= cosine similarity for normalized vectors).
+        # Starts flat; add_chunks migrates to the configured layout.
+        self.index = build_index(IndexType.FLAT, self.index_dim, 0)
+
+        # Metadata and content storage (FAISS doesn't store metadata
+        # natively). Row i holds the chunk stored under FAISS id i; rows
+        # are append-only, so a chunk keeps its id until it is deleted.
+        self.chunk_store = ColumnarStore()
+        self.metadata_index = MetadataIndex()
+        self.lexical_index = BM25Index()
 
-        # Metadata storage (FAISS doesn't store metadata natively)
-        self.metadata_store: list[dict[str, Any]] = []
-        self.content_store: list[str] = []
+        # Tombstones for deleted rows (their vectors are removed from the
+        # index where the layout allows it)
+        self._deleted = np.zeros(0, dtype=bool)
+        self._num_deleted = 0
+        self._live_bitmap: np.ndarray | None = None
+
+        # Full-precision vectors by row (only kept for quantized or
+        # truncated stores)
+        self.full_vectors: VectorStorage | None = self._new_full_vectors()
+
+        # Write-ahead log: writes are appended to index_path/wal.log and
+        # folded into a full snapshot by compact(). Only writers attach
+        # it (see attach_wal()); a store that just loads a path replays
+        # the log without touching it.
+        self.wal_enabled = settings.faiss_wal if wal is None else wal
+        self.wal: WriteAheadLog | None = None
+        self.wal_seq = 0  # Last log record applied to this store
 
         # Load existing index if path provided
         if index_path and index_path.exists():
@@ -58,8 +181,8 @@ class FAISSVectorStore(VectorStoreRepository):
 
     @property
     def count(self) -> int:
-        """Number of vectors in the index."""
-        return self.index.ntotal
+        """Number of live (non-deleted) chunks in the store."""
+        return len(self.chunk_store) - self._num_deleted
 
     def add_chunks(self, chunks: list[Chunk]) -> int:
         """Add chunks to the vector store.
@@ -81,151 +204,846 @@ class FAISSVectorStore(VectorStoreRepository):
         embeddings = self.embeddings.embed_documents(texts)
         embeddings_np = np.array(embeddings, dtype=np.float32)
 
-        # Add to FAISS index
-        self.index.add(embeddings_np)  # type: ignore[call-arg]
+        return self.add_embedded_chunks(chunks, embeddings_np)
 
-        # Store metadata and content
-        for chunk in chunks:
-            self.metadata_store.append(chunk.to_dict())
-            self.content_store.append(chunk.content)
+    def add_embedded_chunks(self, chunks: list[Chunk], embeddings: np.ndarray) -> int:
+        """Add chunks whose embeddings were computed by the caller.
+
+        Args:
+            chunks: List of chunks to add
+            embeddings: One float32 row per chunk
+
+        Returns:
+            Number of chunks added
+        """
+        if not chunks:
+            return 0
+        embeddings_np = np.asarray(embeddings, dtype=np.float32)
+        metadatas = [chunk.to_dict() for chunk in chunks]
+        contents = [chunk.content for chunk in chunks]
+
+        self._insert_rows(metadatas, contents, embeddings_np)
+        if self.wal is not None:
+            self.wal_seq = self.wal.append_add(metadatas, contents, embeddings_np)
 
         logger.info(f"Added {len(chunks)} chunks. Total: {self.count}")
         return len(chunks)
 
+    def _insert_rows(
+        self, metadatas: list[dict], contents: list[str], vectors: np.ndarray
+    ) -> None:
+        """Append rows under the next row ids (not logged)."""
+        # Add to FAISS index (rebuilding into a new layout if needed)
+        first_row = len(self.chunk_store)
+        row_ids = np.arange(first_row, first_row + len(vectors), dtype=np.int64)
+        self._add_vectors(vectors, row_ids)
+        if self.full_vectors is not None:
+            self.full_vectors.append(vectors)
+
+        # Store metadata and content
+        for metadata, content in zip(metadatas, contents):
+            self.chunk_store.append(metadata, content)
+            self.metadata_index.add(metadata)
+            self.lexical_index.add(content)
+        self._deleted = np.concatenate([self._deleted, np.zeros(len(vectors), bool)])
+        self._live_bitmap = None
+
+    def _add_vectors(self, vectors: np.ndarray, ids: np.ndarray) -> None:
+        """Add vectors, migrating or training the index when required."""
+        self._ensure_writable()
+
+        total = self.count + len(vectors)
+        target = select_index_type(self.index_type, total)
+        quantization = select_quantization(self.quantization, total)
+
+        if (
+            needs_rebuild(self.index, target, total, quantization)
+            or self.index.d != self.index_dim
+        ):
+            self._rebuild(target, quantization, vectors, ids)
+        else:
+            vectors = truncate_vectors(vectors, self.index_dim)
+            self.index.add_with_ids(vectors, ids)  # type: ignore[call-arg]
+
+    def _rebuild(
+        self,
+        index_type: IndexType,
+        quantization: Quantization,
+        new_vectors: np.ndarray | None = None,
+        new_ids: np.ndarray | None = None,
+    ) -> None:
+        """Rebuild the index from the live rows (plus any new vectors).
+
+        Tombstoned vectors left behind in HNSW graphs are dropped here.
+        """
+        live_ids = self._live_ids()
+        vectors = self._stored_vectors(live_ids)
+        if vectors.shape[1] < self.index_dim:
+            raise ValueError("Full vectors are required to widen a truncated index")
+        vectors = truncate_vectors(vectors, self.index_dim)
+        if new_vectors is not None and new_ids is not None:
+            new_vectors = truncate_vectors(new_vectors, self.index_dim)
+            vectors = np.vstack([vectors, new_vectors])
+            live_ids = np.concatenate([live_ids, new_ids])
+
+        logger.info(
+            f"Building {index_type.value} index ({quantization.value}) "
+            f"for {len(live_ids)} vectors..."
+        )
+        index = build_index(
+            index_type,
+            self.index_dim,
+            len(live_ids),
+            hnsw_m=settings.faiss_hnsw_m,
+            quantization=quantization,
+        )
+        train_index(index, vectors)
+        index.add_with_ids(vectors, live_ids)  # type: ignore[call-arg]
+        self.index = index
+        self._index_mapped = False
+
+    def _ensure_writable(self) -> None:
+        """Prepare the index for mutation.
+
+        - A memory-mapped index is copied into the heap first: FAISS
+          aborts the process when a read-only mapped index is resized.
+        - Indexes saved before explicit ids are rebuilt with row ids.
+        """
+        if self._index_mapped:
+            logger.info("Copying memory-mapped index into memory for writing")
+            self.index = faiss.deserialize_index(faiss.serialize_index(self.index))
+            self._index_mapped = False
+
+        if not has_stable_ids(self.index):
+            self._rebuild(self.active_index_type, quantization_of(self.index))
+
+    def _new_full_vectors(self) -> VectorStorage | None:
+        if self.quantization == Quantization.NONE and not self._truncated:
+            return None
+        return VectorStorage(self.embedding_dim)
+
+    @property
+    def _truncated(self) -> bool:
+        return self.index_dim < self.embedding_dim
+
+    def _stored_vectors(self, ids: np.ndarray) -> np.ndarray:
+        """Vectors for row ids, full precision when available.
+
+        Without full vectors these are read back from the index, so they
+        may have only index_dim dimensions.
+        """
+        if self.full_vectors is not None:
+            return self.full_vectors.get(ids)
+        return reconstruct_ids(self.index, ids)
+
+    def _live_ids(self) -> np.ndarray:
+        """Row ids that have not been deleted."""
+        return np.flatnonzero(~self._deleted)
+
+    def _remove_rows(self, rows: np.ndarray) -> None:
+        """Delete rows and log the delete."""
+        if len(rows) == 0:
+            return
+        self._delete_rows(rows)
+        if self.wal is not None:
+            self.wal_seq = self.wal.append_delete(rows)
+
+    def _delete_rows(self, rows: np.ndarray) -> None:
+        """Tombstone rows and remove their vectors where supported.
+
+        Not logged: writers go through _remove_rows().
+        """
+        if len(rows) == 0:
+            return
+
+        self._ensure_writable()
+        if supports_removal(self.index):
+            remove_ids(self.index, rows)
+
+        for row in rows:
+            self.lexical_index.remove(row, self.chunk_store.content(row))
+        self._deleted[rows] = True
+        self._num_deleted += len(rows)
+        self._live_bitmap = None
+
+    def _document_rows(self, doc_id: str) -> np.ndarray:
+        """Live row ids holding chunks of a document."""
+        rows = self.metadata_index.match({"doc_id": doc_id})
+        return rows[~self._deleted[rows]]
+
+    def upsert_document(self, doc_id: str, chunks: list[Chunk]) -> int:
+        """Replace all chunks of a document.
+
+        Documents whose chunks (content and metadata) are unchanged are
+        skipped without calling the embeddings API.
+
+        Args:
+            doc_id: Document to replace
+            chunks: New chunks for the document
+
+        Returns:
+            Number of chunks written (0 if unchanged)
+        """
+        old_rows = self._document_rows(doc_id)
+        if self._is_unchanged(old_rows, chunks):
+            logger.debug(f"Document {doc_id} unchanged, skipping")
+            return 0
+
+        # Add before deleting so the document never disappears from search
+        added = self.add_chunks(chunks)
+        self._remove_rows(old_rows)
+        logger.info(f"Upserted {doc_id}: {len(old_rows)} -> {added} chunks")
+        return added
+
+    def _is_unchanged(self, rows: np.ndarray, chunks: list[Chunk]) -> bool:
+        """Check whether stored rows already hold exactly these chunks."""
+        if len(rows) != len(chunks):
+            return False
+
+        stored = {
+            self.chunk_store.metadata(row)["chunk_index"]: (
+                self.chunk_store.metadata(row),
+                self.chunk_store.content(row),
+            )
+            for row in rows
+        }
+        new = {chunk.chunk_index: (chunk.to_dict(), chunk.content) for chunk in chunks}
+        return stored == new
+
+    def delete_document(self, doc_id: str) -> int:
+        """Delete all chunks of a document.
+
+        Args:
+            doc_id: Document to delete
+
+        Returns:
+            Number of chunks deleted
+        """
+        rows = self._document_rows(doc_id)
+        self._remove_rows(rows)
+        if len(rows):
+            logger.info(f"Deleted {doc_id} ({len(rows)} chunks)")
+        return len(rows)
+
+    async def aadd_chunks(self, chunks: list[Chunk]) -> int:
+        """Add chunks, embedding asynchronously.
+
+        Index updates run in a worker thread.
+        """
+        if not chunks:
+            return 0
+
+        logger.info(f"Generating embeddings for {len(chunks)} chunks...")
+        embeddings = await self.embeddings.aembed_documents([c.content for c in chunks])
+        embeddings_np = np.array(embeddings, dtype=np.float32)
+
+        return await asyncio.to_thread(self.add_embedded_chunks, chunks, embeddings_np)
+
+    async def acount(self) -> int:
+        """Number of live chunks (in memory, no I/O)."""
+        return self.count
+
+    @contextmanager
+    def transaction(self) -> Iterator[VectorStoreRepository]:
+        """Apply writes in place and persist them to index_path.
+
+        With the write-ahead log the writes are already durable; the log
+        is compacted into a snapshot once it outgrows
+        FAISS_WAL_COMPACT_BYTES.
+        """
+        if self.index_path and self.wal is None:
+            self.attach_wal(self.index_path)
+        yield self
+        self.flush()
+        if self.log_bytes > settings.faiss_wal_compact_bytes:
+            self.compact()
+
+    # =========================================================================
+    # Write-Ahead Log
+    # =========================================================================
+
+    def attach_wal(self, path: Path) -> None:
+        """Log further writes to path/wal.log.
+
+        Call after load(): records already in the log must have been
+        replayed so new records continue its sequence. Does nothing if
+        the store was created without a write-ahead log.
+        """
+        if not self.wal_enabled:
+            return
+        self.wal = WriteAheadLog(path / WAL_FILE, last_seq=self.wal_seq)
+
+    @property
+    def log_bytes(self) -> int:
+        """Bytes of writes logged since the last snapshot."""
+        return self.wal.size if self.wal is not None else 0
+
+    def flush(self) -> None:
+        """Persist writes to index_path.
+
+        Logged writes are already on disk, so only stores without a
+        write-ahead log are saved (in full).
+        """
+        if self.index_path and self.wal is None:
+            self.save(self.index_path)
+
+    def compact(self) -> None:
+        """Fold the write-ahead log into a full snapshot at index_path."""
+        if not self.index_path:
+            return
+        logger.info(f"Compacting write-ahead log ({self.log_bytes} bytes)")
+        self.save(self.index_path)
+
+    def _replay_wal(self, file: Path) -> None:
+        """Apply logged writes that are newer than the loaded snapshot."""
+        replayed = 0
+        for record in read_records(file, after_seq=self.wal_seq):
+            self._apply(record)
+            self.wal_seq = record.seq
+            replayed += 1
+
+        if replayed:
+            logger.info(f"Replayed {replayed} write-ahead log records from {file}")
+
+    def _apply(self, record: WalRecord) -> None:
+        if record.op == WalOp.ADD:
+            self._insert_rows(record.metadatas, record.contents, record.array)
+        elif record.op == WalOp.DELETE:
+            self._delete_rows(record.array)
+        elif record.op == WalOp.CLEAR:
+            self._reset()
+
+    @property
+    def active_index_type(self) -> IndexType:
+        """Layout of the current index (resolved, never AUTO)."""
+        return index_type_of(self.index)
+
     def search(self, query: SearchQuery) -> SearchResponse:
         """Search the vector store.
 
+        Filters are resolved against the metadata index first and pushed
+        down into the search, so filtered queries still return top_k
+        results when enough chunks match.
+
         Args:
-            query: Search query with optional filters
+            query: Search query with optional filters and mode
 
         Returns:
             Search results with scores and metadata
         """
+        return self.search_many([query])[0]
+
+    def search_many(self, queries: list[SearchQuery]) -> list[SearchResponse]:
+        """Search several queries at once.
+
+        All queries are embedded in one embeddings call, and unfiltered
+        queries are answered by a single matrix search. Lexical rankings
+        are computed while the embeddings call is in flight; if it fails
+        or misses SEARCH_EMBEDDING_TIMEOUT, every query is answered
+        lexically.
+
+        Args:
+            queries: Search queries, each with its own filters and top_k
+
+        Returns:
+            One response per query, in order
+        """
+        if not queries:
+            return []
+        if self.count == 0:
+            return [self._empty_response(query) for query in queries]
+
+        pending = submit_query_embeddings(self.embeddings, queries)
+        lexical = self.lexical_hits(queries, lexical_positions(queries))
+        query_np = wait_query_embeddings(pending, queries)
+
+        return self.search_embedded(queries, query_np, lexical)
+
+    async def asearch(self, query: SearchQuery) -> SearchResponse:
+        """Search with an async embeddings call.
+
+        The FAISS search is CPU-bound and runs in a worker thread (FAISS
+        releases the GIL), so the event loop keeps serving other requests.
+        """
+        return (await self.asearch_many([query]))[0]
+
+    async def asearch_many(self, queries: list[SearchQuery]) -> list[SearchResponse]:
+        """Async variant of search_many (one async embeddings call)."""
+        if not queries:
+            return []
         if self.count == 0:
-            return SearchResponse(
-                results=[],
-                total_searched=0,
-                query=query.query,
+            return [self._empty_response(query) for query in queries]
+
+        lexical, query_np = await asyncio.gather(
+            asyncio.to_thread(self.lexical_hits, queries, lexical_positions(queries)),
+            aembed_queries(self.embeddings, queries),
+        )
+
+        return await asyncio.to_thread(self.search_embedded, queries, query_np, lexical)
+
+    def search_embedded(
+        self,
+        queries: list[SearchQuery],
+        query_np: np.ndarray | None,
+        lexical: dict[int, tuple[np.ndarray, np.ndarray]] | None = None,
+        corpus: dict[int, CorpusStats] | None = None,
+    ) -> list[SearchResponse]:
+        """Search queries whose embeddings were computed by the caller.
+
+        Args:
+            queries: Search queries, each with its own filters and top_k
+            query_np: Query embeddings, one float32 row per query (rows of
+                lexical queries are ignored). None answers every query
+                lexically.
+            lexical: Lexical hits already computed, by query position
+            corpus: BM25 statistics to score lexical queries with, by query
+                position (default: this store's own)
+
+        Returns:
+            One response per query, in order
+        """
+        modes = [
+            query.mode if query_np is not None else SearchMode.LEXICAL
+            for query in queries
+        ]
+        if self.count == 0:
+            return [
+                self._empty_response(query, mode) for query, mode in zip(queries, modes)
+            ]
+
+        positions = [i for i, mode in enumerate(modes) if mode != SearchMode.DENSE]
+        lexical = dict(lexical or {})
+        lexical.update(
+            self.lexical_hits(
+                queries, [i for i in positions if i not in lexical], corpus
             )
+        )
 
-        # Generate query embedding
-        query_embedding = self.embeddings.embed_query(query.query)
-        query_np = np.array([query_embedding], dtype=np.float32)
+        hits: dict[int, tuple[np.ndarray, np.ndarray]] = {}
+        dense = [i for i, mode in enumerate(modes) if mode != SearchMode.LEXICAL]
+        if dense and query_np is not None:
+            hits.update(self._dense_hits(queries, query_np, dense))
 
-        # Search with extra results for filtering
-        # Fetch more than top_k to account for filtered results
-        fetch_k = min(query.top_k * 3, self.count)
-        scores, indices = self.index.search(query_np, fetch_k)  # type: ignore[call-arg]
+        vectors: dict[int, np.ndarray] = {}
+        for i, (query, mode) in enumerate(zip(queries, modes)):
+            if mode == SearchMode.LEXICAL:
+                hits[i] = lexical[i]
+            elif mode == SearchMode.HYBRID:
+                hits[i] = _fuse(hits[i], lexical[i], _fetch_k(query))
 
-        # Process results
-        results: list[SearchResult] = []
-        for i, idx in enumerate(indices[0]):
-            if idx == -1:  # FAISS returns -1 for empty slots
-                continue
+            if query.mmr_lambda is not None:
+                hits[i], vectors[i] = self._diversify(query, mode, *hits[i])
+            else:
+                scores, rows = hits[i]
+                hits[i] = (scores[: query.top_k], rows[: query.top_k])
 
-            metadata = self.metadata_store[idx]
-            content = self.content_store[idx]
+        return [
+            self._build_response(query, *hits[i], mode=modes[i], vectors=vectors.get(i))
+            for i, query in enumerate(queries)
+        ]
 
-            # Apply metadata filters if provided
-            if query.filters and not self._matches_filters(metadata, query.filters):
-                continue
+    def _diversify(
+        self, query: SearchQuery, mode: SearchMode, scores: np.ndarray, rows: np.ndarray
+    ) -> tuple[tuple[np.ndarray, np.ndarray], np.ndarray]:
+        """MMR over ranked candidates, using their stored vectors.
+
+        No embeddings call is made: candidate vectors come from the full
+        vectors (or the index), and are returned for the results.
+        """
+        found = rows != -1
+        scores, rows = scores[found], rows[found]
+        if len(rows) == 0:
+            return (scores, rows), np.empty((0, self.embedding_dim), np.float32)
+
+        vectors = self._stored_vectors(rows)
+        picked = mmr_select(
+            relevance_of(scores, mode), vectors, query.top_k, query.mmr_lambda
+        )
+        return (scores[picked], rows[picked]), vectors[picked]
+
+    def _dense_hits(
+        self, queries: list[SearchQuery], query_np: np.ndarray, positions: list[int]
+    ) -> dict[int, tuple[np.ndarray, np.ndarray]]:
+        """Embedding similarity rankings for the queries at positions."""
+        hits: dict[int, tuple[np.ndarray, np.ndarray]] = {}
+
+        # Unfiltered queries share one search at the largest depth
+        unfiltered = [i for i in positions if not queries[i].filters]
+        if unfiltered:
+            k = max(_fetch_k(queries[i]) for i in unfiltered)
+            scores, indices = self._search_index(
+                query_np[unfiltered], k, self._live_selector()
+            )
+            for row, i in enumerate(unfiltered):
+                fetch_k = _fetch_k(queries[i])
+                hits[i] = (scores[row][:fetch_k], indices[row][:fetch_k])
+
+        # Filtered queries each search their own candidate rows
+        for i in positions:
+            if queries[i].filters:
+                hits[i] = self._search_candidates(
+                    query_np[i : i + 1],
+                    self._candidate_rows(queries[i]),
+                    _fetch_k(queries[i]),
+                )
+
+        return hits
+
+    def lexical_hits(
+        self,
+        queries: list[SearchQuery],
+        positions: list[int],
+        corpus: dict[int, CorpusStats] | None = None,
+    ) -> dict[int, tuple[np.ndarray, np.ndarray]]:
+        """BM25 rankings for the queries at positions (no network calls).
 
-            # Inner product with normalized vectors = cosine similarity (0-1)
-            score = float(scores[0][i])
+        Args:
+            queries: Search queries
+            positions: Positions of the queries to answer lexically
+            corpus: BM25 statistics to score with, by query position
+
+        Returns:
+            (scores, row ids) per query position, best first
+        """
+        hits: dict[int, tuple[np.ndarray, np.ndarray]] = {}
+        for i in positions:
+            query = queries[i]
+            if query.filters:
+                exclude = np.ones(len(self.chunk_store), dtype=bool)
+                exclude[self._candidate_rows(query)] = False
+            else:
+                exclude = self._deleted if self._num_deleted else None
+            hits[i] = self.lexical_index.search(
+                query.query, _fetch_k(query), exclude, (corpus or {}).get(i)
+            )
+        return hits
+
+    def _candidate_rows(self, query: SearchQuery) -> np.ndarray:
+        """Live rows passing a query's filters."""
+        rows = select_rows(
+            query.compiled_filters, self.chunk_store, self.metadata_index
+        )
+        return rows[~self._deleted[rows]]
+
+    def _build_response(
+        self,
+        query: SearchQuery,
+        scores: np.ndarray,
+        indices: np.ndarray,
+        mode: SearchMode = SearchMode.DENSE,
+        vectors: np.ndarray | None = None,
+    ) -> SearchResponse:
+        """Materialise search hits (and candidate vectors) into a response."""
+        results: list[SearchResult] = []
+        for i, (score, idx) in enumerate(zip(scores, indices)):
+            if idx == -1:  # FAISS returns -1 for empty slots
+                continue
 
+            # Dense: inner product with normalized vectors = cosine similarity
             results.append(
                 SearchResult(
-                    content=content,
-                    score=round(score, 4),
-                    metadata=metadata,
+                    content=self.chunk_store.content(idx),
+                    score=round(float(score), 4),
+                    metadata=self.chunk_store.metadata(idx),
+                    embedding=vectors[i].tolist() if vectors is not None else None,
                 )
             )
 
-            if len(results) >= query.top_k:
-                break
-
         return SearchResponse(
             results=results,
             total_searched=self.count,
             query=query.query,
+            mode=mode,
         )
 
-    def _matches_filters(
-        self, metadata: dict[str, Any], filters: dict[str, Any]
-    ) -> bool:
-        """Check if metadata matches all filters.
+    def _empty_response(
+        self, query: SearchQuery, mode: SearchMode | None = None
+    ) -> SearchResponse:
+        """Response for a query against an empty store."""
+        return SearchResponse(
+            results=[], total_searched=0, query=query.query, mode=mode or query.mode
+        )
 
-        Supports:
-        - Exact match for strings/numbers
-        - List membership for tags
+    def _search_index(
+        self,
+        query_np: np.ndarray,
+        top_k: int,
+        selector: faiss.IDSelector | None = None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Search the FAISS index, optionally restricted by an ID selector.
+
+        Quantized or truncated indexes fetch rerank_factor * top_k
+        candidates, which are re-scored against the full-precision vectors.
+
+        Returns (scores, ids) matrices with one row per query.
         """
-        for key, value in filters.items():
-            if key not in metadata:
-                return False
+        k = min(top_k, self.count)
+        full_vectors = self.full_vectors if self._reranks() else None
+        fetch_k = k if full_vectors is None else min(k * self.rerank_factor, self.count)
 
-            meta_value = metadata[key]
+        params = search_params(self.index, self.nprobe, self.ef_search, selector)
+        scores, ids = self.index.search(  # type: ignore[call-arg]
+            truncate_vectors(query_np, self.index.d), fetch_k, params=params
+        )
 
-            # Handle list membership (e.g., tags)
-            if isinstance(meta_value, list):
-                if value not in meta_value:
-                    return False
-            # Handle exact match
-            elif meta_value != value:
-                return False
+        if full_vectors is not None:
+            return rerank_exact(query_np, ids, full_vectors, k)
+        return scores, ids
 
-        return True
+    def _reranks(self) -> bool:
+        """Whether first-pass results are re-scored with full vectors."""
+        return (
+            self.rerank_factor > 0
+            and self.full_vectors is not None
+            and (
+                quantization_of(self.index) != Quantization.NONE
+                or self.index.d < self.embedding_dim
+            )
+        )
+
+    def _live_selector(self) -> faiss.IDSelector | None:
+        """Selector excluding tombstoned vectors still present in the index."""
+        if self._num_deleted == 0 or supports_removal(self.index):
+            return None
+
+        # The bitmap is cached on the store, so it outlives the search
+        if self._live_bitmap is None:
+            self._live_bitmap = np.packbits(~self._deleted, bitorder="little")
+        bitmap = self._live_bitmap
+        return faiss.IDSelectorBitmap(len(bitmap) * 8, faiss.swig_ptr(bitmap))
+
+    def _search_candidates(
+        self,
+        query_np: np.ndarray,
+        candidate_ids: np.ndarray,
+        top_k: int,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Search only the rows that passed the metadata filters.
+
+        Query planning:
+        - Small candidate sets are scored exactly (one matrix-vector
+          product), which is cheaper than walking the index and avoids
+          ANN recall loss on very selective filters.
+        - Larger sets are searched through the index with a bitmap
+          ID selector.
+        """
+        if len(candidate_ids) == 0:
+            return np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64)
+
+        if len(candidate_ids) <= EXACT_SCAN_MAX_CANDIDATES:
+            vectors = self._stored_vectors(candidate_ids)
+            scores = vectors @ truncate_vectors(query_np, vectors.shape[1])[0]
+            k = min(top_k, len(candidate_ids))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return scores[top], candidate_ids[top]
+
+        # Keep the bitmap referenced until the search returns
+        bitmap = self.metadata_index.to_bitmap(candidate_ids)
+        selector = faiss.IDSelectorBitmap(len(bitmap) * 8, faiss.swig_ptr(bitmap))
+        scores, indices = self._search_index(
+            query_np, min(top_k, len(candidate_ids)), selector
+        )
+        return scores[0], indices[0]
 
     def save(self, path: Path) -> None:
-        """Save index and metadata to disk."""
+        """Save a full snapshot: index, metadata columns and filter index.
+
+        The snapshot supersedes any write-ahead log in the same
+        directory, which is emptied afterwards.
+        """
         path.mkdir(parents=True, exist_ok=True)
 
         # Save FAISS index
-        faiss.write_index(self.index, str(path / "index.faiss"))
-
-        # Save metadata and content
-        with open(path / "metadata.json", "w") as f:
-            json.dump(
-                {
-                    "metadata": self.metadata_store,
-                    "content": self.content_store,
-                },
-                f,
-            )
+        with atomic_path(path / "index.faiss") as tmp:
+            faiss.write_index(self.index, str(tmp))
+
+        # Save metadata columns and filter index
+        self.chunk_store.save(path / "columns")
+        self.metadata_index.save(path / "filters")
+        self.lexical_index.save(path / "lexical")
+        save_array(path / "deleted.npy", self._deleted)
+        if self.full_vectors is not None:
+            self.full_vectors.save(path / "vectors.npy")
+
+        # Written last: records up to wal_seq are now in the snapshot, so
+        # a crash before the log is emptied cannot replay them twice
+        with atomic_path(path / SNAPSHOT_FILE) as tmp:
+            tmp.write_text(json.dumps({"wal_seq": self.wal_seq}))
+
+        if self.wal is not None and self.wal.path == path / WAL_FILE:
+            self.wal.reset()
+        else:
+            (path / WAL_FILE).unlink(missing_ok=True)
 
         logger.info(f"Saved vector store to {path} ({self.count} vectors)")
 
     def load(self, path: Path) -> None:
-        """Load index and metadata from disk."""
-        index_file = path / "index.faiss"
-        metadata_file = path / "metadata.json"
+        """Load the snapshot at path and replay its write-ahead log.
+
+        Metadata columns and filter postings are memory-mapped. With
+        mmap enabled the FAISS index is mapped read-only as well, so
+        worker processes share one copy through the page cache and load
+        time does not depend on index size. Indexes saved in the legacy
+        metadata.json format are converted on load.
 
-        if not index_file.exists() or not metadata_file.exists():
+        Any attached log is detached; see attach_wal().
+        """
+        self.wal = None
+        snapshot_found = self._load_snapshot(path)
+        wal_file = path / WAL_FILE
+        if not snapshot_found and not wal_file.exists():
             logger.warning(f"No existing index found at {path}")
             return
 
-        # Load FAISS index
-        self.index = faiss.read_index(str(index_file))
+        self._replay_wal(wal_file)
+        logger.info(
+            f"Loaded vector store from {path} "
+            f"({self.count} vectors, {self.active_index_type.value} index)"
+        )
+
+    def _load_snapshot(self, path: Path) -> bool:
+        """Load a full snapshot (returns False if there is none)."""
+        index_file = path / "index.faiss"
+        columns_dir = path / "columns"
+        legacy_file = path / "metadata.json"
+
+        if not index_file.exists() or not (
+            columns_dir.exists() or legacy_file.exists()
+        ):
+            return False
+
+        # Load FAISS index (layout is stored in the index file)
+        if self.mmap:
+            flags = faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY
+            self.index = faiss.read_index(str(index_file), flags)
+        else:
+            self.index = faiss.read_index(str(index_file))
+        self._index_mapped = self.mmap
 
         # Load metadata and content
-        with open(metadata_file) as f:
+        if columns_dir.exists():
+            self.chunk_store = ColumnarStore.load(columns_dir)
+        else:
+            self.chunk_store = self._load_legacy_metadata(legacy_file)
+
+        # Load the metadata index (rebuilt for indexes saved without one)
+        filters_dir = path / "filters"
+        self.metadata_index = MetadataIndex()
+        if filters_dir.exists():
+            self.metadata_index.load(filters_dir)
+        else:
+            for metadata in self.chunk_store.iter_metadata():
+                self.metadata_index.add(metadata)
+
+        # Load tombstones (kept in memory: deletes write to them)
+        deleted_file = path / "deleted.npy"
+        if deleted_file.exists():
+            self._deleted = load_array(deleted_file, mmap=False)
+        else:
+            self._deleted = np.zeros(len(self.chunk_store), dtype=bool)
+        self._num_deleted = int(self._deleted.sum())
+        self._live_bitmap = None
+
+        # Load the BM25 index (rebuilt for indexes saved without one)
+        lexical_dir = path / "lexical"
+        self.lexical_index = BM25Index()
+        if lexical_dir.exists():
+            self.lexical_index.load(lexical_dir)
+        else:
+            self._rebuild_lexical_index()
+
+        # Load full-precision vectors (always memory-mapped)
+        vectors_file = path / "vectors.npy"
+        if vectors_file.exists():
+            self.full_vectors = VectorStorage.load(vectors_file)
+        elif self.full_vectors is not None:
+            self.full_vectors = self._recover_full_vectors()
+
+        # Snapshots saved before the write-ahead log contain no records
+        snapshot_file = path / SNAPSHOT_FILE
+        self.wal_seq = 0
+        if snapshot_file.exists():
+            self.wal_seq = json.loads(snapshot_file.read_text())["wal_seq"]
+        return True
+
+    def _rebuild_lexical_index(self) -> None:
+        logger.info(f"Building BM25 index for {len(self.chunk_store)} chunks...")
+        for row in range(len(self.chunk_store)):
+            self.lexical_index.add(self.chunk_store.content(row))
+        for row in np.flatnonzero(self._deleted):
+            self.lexical_index.remove(row, self.chunk_store.content(row))
+
+    def _recover_full_vectors(self) -> VectorStorage | None:
+        """Rebuild full vectors from the index (store saved without them)."""
+        if self.index.d < self.embedding_dim:
+            logger.warning("Full vectors missing for a truncated index")
+            return None
+        if quantization_of(self.index) != Quantization.NONE:
+            logger.warning("Full vectors missing; re-ranking with decoded vectors")
+
+        live_ids = self._live_ids()
+        vectors = np.zeros((len(self.chunk_store), self.embedding_dim), np.float32)
+        vectors[live_ids] = reconstruct_ids(self.index, live_ids)
+
+        storage = VectorStorage(self.embedding_dim)
+        storage.append(vectors)
+        return storage
+
+    def _load_legacy_metadata(self, file: Path) -> ColumnarStore:
+        """Convert a metadata.json file into columnar storage."""
+        with open(file) as f:
             data = json.load(f)
-            self.metadata_store = data["metadata"]
-            self.content_store = data["content"]
 
-        logger.info(f"Loaded vector store from {path} ({self.count} vectors)")
+        store = ColumnarStore()
+        for metadata, content in zip(data["metadata"], data["content"]):
+            store.append(metadata, content)
+        return store
 
     def clear(self) -> None:
         """Clear all data from the store."""
-        self.index = faiss.IndexFlatIP(self.embedding_dim)
-        self.metadata_store = []
-        self.content_store = []
+        self._reset()
+        if self.wal is not None:
+            self.wal_seq = self.wal.append_clear()
         logger.info("Cleared vector store")
 
+    def _reset(self) -> None:
+        self.index = build_index(IndexType.FLAT, self.index_dim, 0)
+        self._index_mapped = False
+        self.chunk_store = ColumnarStore()
+        self.metadata_index.clear()
+        self.lexical_index.clear()
+        self._deleted = np.zeros(0, dtype=bool)
+        self._num_deleted = 0
+        self._live_bitmap = None
+        self.full_vectors = self._new_full_vectors()
+
     def get_all_metadata(self) -> list[dict]:
         """Get metadata for all stored chunks.
 
         Warning:
-            O(n) operation. For production, use a document registry instead.
+            O(n) operation that materialises every row. For production,
+            use a document registry instead.
             See VectorStoreRepository.get_all_metadata for details.
         """
-        return self.metadata_store
+        return [self.chunk_store.metadata(row) for row in self._live_ids()]
+
+
+def _fetch_k(query: SearchQuery) -> int:
+    """Depth of each ranking (hybrid and MMR queries use deeper lists)."""
+    if query.mode == SearchMode.HYBRID:
+        return max(mmr_depth(query), settings.hybrid_fetch_k)
+    return mmr_depth(query)
+
+
+def _fuse(
+    dense: tuple[np.ndarray, np.ndarray],
+    lexical: tuple[np.ndarray, np.ndarray],
+    top_k: int,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Reciprocal rank fusion of dense and lexical (scores, rows) rankings."""
+    dense_rows = [int(row) for row in dense[1] if row != -1]
+    fused = reciprocal_rank_fusion([dense_rows, lexical[1].tolist()])[:top_k]
+    rows = np.array([row for row, _ in fused], dtype=np.int64)
+    scores = np.array([score for _, score in fused], dtype=np.float32)
+    return scores, rows
@@ -0,0 +1,34 @@
+"""File helpers for on-disk index artifacts."""
+
+import os
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+
+
+@contextmanager
+def atomic_path(path: Path) -> Iterator[Path]:
+    """Yield a temporary path that replaces `path` on success.
+
+    Writers never truncate a file in place, so readers that memory-map
+    the previous version keep a valid mapping until they reload.
+    """
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    try:
+        yield tmp_path
+        os.replace(tmp_path, path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+def save_array(file: Path, array: np.ndarray) -> None:
+    """Atomically write an array as .npy."""
+    with atomic_path(file) as tmp, open(tmp, "wb") as f:
+        np.save(f, array)
+
+
+def load_array(file: Path, mmap: bool = True) -> np.ndarray:
+    """Read an .npy file, memory-mapped read-only by default."""
+    return np.load(file, mmap_mode="r" if mmap else None)
@@ -0,0 +1,184 @@
+"""Inverted metadata index for pre-filtering vector search."""
+
+import json
+from functools import reduce
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from app.core import get_logger
+from app.documents.memory.files import atomic_path, load_array, save_array
+
+logger = get_logger(__name__)
+
+# Fields that are unique per chunk and never useful as filters
+UNINDEXED_FIELDS = {"chunk_index", "total_chunks"}
+
+
+def _value_key(value: Any) -> str:
+    """Canonical key for a metadata value (keeps 5 and "5" distinct).
+
+    Integral floats share the key of the int (50000.0 and 50000 match),
+    as they compare equal on the column path.
+    """
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return json.dumps(value, sort_keys=True)
+
+
+class MetadataIndex:
+    """Inverted index from metadata field/value to vector ids.
+
+    Each (field, value) pair maps to a sorted posting list of row ids.
+    List-valued fields (e.g. tags) index each element, so a filter on
+    a single tag matches by membership.
+
+    Filters are resolved to the set of matching ids before the vector
+    search runs, and handed to FAISS as a bitmap ID selector.
+    """
+
+    def __init__(self):
+        self.size = 0
+        # Posting lists stay numpy arrays after load until appended to
+        self._postings: dict[str, dict[str, list[int] | np.ndarray]] = {}
+        # Frozen numpy views of the posting lists, rebuilt after adds
+        self._arrays: dict[tuple[str, str], np.ndarray] = {}
+
+    def add(self, metadata: dict[str, Any]) -> int:
+        """Index the metadata of the next row.
+
+        Args:
+            metadata: Chunk metadata
+
+        Returns:
+            Row id assigned to the metadata
+        """
+        row_id = self.size
+        for field, value in metadata.items():
+            if field in UNINDEXED_FIELDS:
+                continue
+            values = value if isinstance(value, list) else [value]
+            field_postings = self._postings.setdefault(field, {})
+            for item in values:
+                key = _value_key(item)
+                posting = field_postings.setdefault(key, [])
+                if isinstance(posting, np.ndarray):
+                    posting = field_postings[key] = posting.tolist()
+                posting.append(row_id)
+
+        self.size += 1
+        self._arrays.clear()
+        return row_id
+
+    def _posting(self, field: str, value: Any) -> np.ndarray:
+        """Get the posting list for a field/value pair."""
+        return self._posting_by_key(field, _value_key(value))
+
+    def _posting_by_key(self, field: str, key: str) -> np.ndarray:
+        """Get the posting list for a field and canonical value key."""
+        cached = self._arrays.get((field, key))
+        if cached is None:
+            ids = self._postings.get(field, {}).get(key, [])
+            cached = np.asarray(ids, dtype=np.int64)
+            self._arrays[(field, key)] = cached
+        return cached
+
+    def match(self, filters: dict[str, Any]) -> np.ndarray:
+        """Resolve filters (AND of exact matches) to matching row ids.
+
+        Args:
+            filters: Field/value pairs that must all match
+
+        Returns:
+            Sorted array of matching row ids
+        """
+        postings = sorted(
+            (self._posting(field, value) for field, value in filters.items()),
+            key=len,
+        )
+        if not postings:
+            return np.arange(self.size, dtype=np.int64)
+
+        return reduce(
+            lambda a, b: np.intersect1d(a, b, assume_unique=True),
+            postings,
+        )
+
+    def is_indexed(self, field: str) -> bool:
+        """Whether posting lists are kept for a field."""
+        return field not in UNINDEXED_FIELDS
+
+    def match_any(self, field: str, values: tuple) -> np.ndarray:
+        """Row ids whose field equals (or, for lists, contains) any value.
+
+        Args:
+            field: Indexed metadata field
+            values: Accepted values
+
+        Returns:
+            Sorted array of matching row ids
+        """
+        postings = [self._posting(field, value) for value in values]
+        if len(postings) == 1:
+            return postings[0]
+        if not postings:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate(postings))
+
+    def to_bitmap(self, ids: np.ndarray) -> np.ndarray:
+        """Pack row ids into a little-endian bitmap (faiss.IDSelectorBitmap)."""
+        mask = np.zeros(self.size, dtype=bool)
+        mask[ids] = True
+        return np.packbits(mask, bitorder="little")
+
+    def save(self, path: Path) -> None:
+        """Persist posting lists as flat .npy arrays in a directory."""
+        path.mkdir(parents=True, exist_ok=True)
+
+        keys: list[list[str]] = []
+        offsets = [0]
+        for field, values in self._postings.items():
+            for key in values:
+                keys.append([field, key])
+                offsets.append(offsets[-1] + len(values[key]))
+        ids = [self._posting_by_key(field, key) for field, key in keys]
+
+        save_array(
+            path / "ids.npy",
+            np.concatenate(ids) if ids else np.empty(0, dtype=np.int64),
+        )
+        save_array(path / "offsets.npy", np.asarray(offsets, dtype=np.int64))
+        with atomic_path(path / "keys.json") as tmp:
+            tmp.write_text(json.dumps({"size": self.size, "keys": keys}))
+
+    def load(self, path: Path, mmap: bool = True) -> None:
+        """Load posting lists saved with save().
+
+        Args:
+            path: Directory written by save()
+            mmap: Memory-map the posting arrays instead of reading them
+        """
+        manifest = json.loads((path / "keys.json").read_text())
+        offsets = load_array(path / "offsets.npy", mmap=False)
+        ids = load_array(path / "ids.npy", mmap=mmap)
+
+        self.size = manifest["size"]
+        self._postings = {}
+        self._arrays = {}
+        for i, (field, key) in enumerate(manifest["keys"]):
+            posting = ids[offsets[i] : offsets[i + 1]]
+            # Indexes saved before float keys were normalised may hold
+            # both 5 and 5.0
+            key = _value_key(json.loads(key))
+            field_postings = self._postings.setdefault(field, {})
+            if key in field_postings:
+                posting = np.union1d(field_postings[key], posting)
+            field_postings[key] = posting
+            self._arrays[(field, key)] = posting
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        self.size = 0
+        self._postings = {}
+        self._arrays = {}
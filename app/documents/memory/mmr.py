@@ -0,0 +1,84 @@
+"""Maximal Marginal Relevance (MMR) re-ranking for diverse results."""
+
+import numpy as np
+
+from app.core import settings
+from app.documents.schemas import SearchMode, SearchQuery, SearchResult
+
+
+def mmr_depth(query: SearchQuery) -> int:
+    """Candidates to fetch for a query (top_k unless it asks for MMR)."""
+    if query.mmr_lambda is None:
+        return query.top_k
+    return max(query.top_k, query.fetch_k or settings.mmr_fetch_k)
+
+
+def mmr_select(
+    relevance: np.ndarray, vectors: np.ndarray, top_k: int, lambda_mult: float
+) -> np.ndarray:
+    """Greedily pick a relevant but diverse subset of candidates.
+
+    Each step takes the candidate maximising
+    lambda * relevance - (1 - lambda) * max similarity to those already
+    picked. Pairwise similarities come from one matrix product, and each
+    step is a vectorised update of the running maximum, so the cost is
+    O(n^2 * d) once plus O(n) per pick.
+
+    Args:
+        relevance: Relevance of each candidate to the query (higher is better)
+        vectors: Candidate embeddings, one row per candidate
+        top_k: Candidates to pick
+        lambda_mult: 1 ranks by relevance only, 0 by diversity only
+
+    Returns:
+        Indices of the picked candidates, in pick order
+    """
+    count = min(top_k, len(relevance))
+    if count == 0:
+        return np.empty(0, dtype=np.int64)
+
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    unit = vectors / np.maximum(norms, 1e-12)
+    similarity = unit @ unit.T
+
+    picked = np.empty(count, dtype=np.int64)
+    available = np.ones(len(relevance), dtype=bool)
+    max_similarity = np.full(len(relevance), -np.inf, dtype=np.float32)
+    for step in range(count):
+        penalty = np.where(np.isfinite(max_similarity), max_similarity, 0.0)
+        score = lambda_mult * relevance - (1 - lambda_mult) * penalty
+        score[~available] = -np.inf
+        best = int(np.argmax(score))
+        picked[step] = best
+        available[best] = False
+        max_similarity = np.maximum(max_similarity, similarity[best])
+    return picked
+
+
+def relevance_of(scores: np.ndarray, mode: SearchMode) -> np.ndarray:
+    """Scores on a similarity-like scale for MMR.
+
+    Dense scores already are cosine similarities; BM25 and fused scores
+    are scaled so the best candidate has relevance 1.
+    """
+    scores = np.asarray(scores, dtype=np.float32)
+    if mode == SearchMode.DENSE or len(scores) == 0 or scores.max() <= 0:
+        return scores
+    return scores / scores.max()
+
+
+def diversify(
+    results: list[SearchResult], query: SearchQuery, mode: SearchMode
+) -> list[SearchResult]:
+    """Apply MMR to results that carry their embeddings.
+
+    Results without an embedding cannot be compared and are dropped.
+    """
+    candidates = [result for result in results if result.embedding is not None]
+    if query.mmr_lambda is None or not candidates:
+        return results[: query.top_k]
+
+    vectors = np.array([result.embedding for result in candidates], np.float32)
+    relevance = relevance_of(np.array([r.score for r in candidates]), mode)
+    picked = mmr_select(relevance, vectors, query.top_k, query.mmr_lambda)
+    return [candidates[i] for i in picked]
@@ -1,17 +1,58 @@
 """Pinecone vector store implementation."""
 
+import asyncio
+import datetime
+import re
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Any
 
+from langchain_core.embeddings import Embeddings
 from langchain_openai import OpenAIEmbeddings
-from pinecone import Pinecone
-
-from app.core import get_logger, settings
+from pinecone import AsyncIndex, Pinecone
+
+from app.core import INDEX_PATH, get_logger, settings
+from app.documents.filters import (
+    RANGE_OPS,
+    Condition,
+    FilterNode,
+    parse_filters,
+    rewrite,
+    to_pinecone,
+)
 from app.documents.memory.base import VectorStoreRepository
-from app.documents.schemas import Chunk, SearchQuery, SearchResponse, SearchResult
+from app.documents.memory.batching import (
+    ScheduledEmbeddings,
+    arun_pipeline,
+    run_pipeline,
+)
+from app.documents.memory.content_store import ContentStore
+from app.documents.memory.embedding_cache import EMBEDDING_MODEL, cached_embeddings
+from app.documents.memory.mmr import diversify, mmr_depth
+from app.documents.memory.query_embeddings import aembed_query_texts, embed_query_texts
+from app.documents.schemas import (
+    Chunk,
+    SearchMode,
+    SearchQuery,
+    SearchResponse,
+    SearchResult,
+)
 
 logger = get_logger(__name__)
 
+# Max vectors per upsert/delete request
+BATCH_SIZE = 100
+
+# Max concurrent queries issued by search_many
+MAX_CONCURRENT_QUERIES = 8
+
+# Local full-text sidecar (Pinecone metadata only holds a preview)
+CONTENT_STORE_PATH = INDEX_PATH / "pinecone_content.sqlite"
+
+# Pinecone range operators only accept numbers: dates are also stored as a
+# YYYYMMDD integer, and range filters on "date" are rewritten to use it
+DATE_NUMBER_FIELD = "date_number"
+
 
 class PineconeVectorStore(VectorStoreRepository):
     """Pinecone-based vector store implementation.
@@ -19,29 +60,41 @@ class PineconeVectorStore(VectorStoreRepository):
     Managed vector database with:
     - Native metadata filtering (pre-retrieval)
     - Automatic scaling
-    - No local persistence needed
+    - Native async API (asearch/aadd_chunks/acount)
+    - Pipelined bulk ingestion (batched embeddings, parallel upserts)
+    - Full chunk text in a local SQLite sidecar (see ContentStore)
 
     Requires:
     - PINECONE_API_KEY in environment
     - PINECONE_INDEX_NAME (default: deal-intelligence)
+
+    There is no lexical index: lexical and hybrid queries are rejected.
     """
 
-    def __init__(self):
+    search_modes = frozenset({SearchMode.DENSE})
+
+    def __init__(
+        self,
+        content_path: Path = CONTENT_STORE_PATH,
+        embeddings: Embeddings | None = None,
+    ):
         if not settings.pinecone_api_key:
             raise ValueError("PINECONE_API_KEY not configured")
 
         # Initialize Pinecone client
         self.pc = Pinecone(api_key=settings.pinecone_api_key)
         self.index = self.pc.Index(settings.pinecone_index_name)
+        self._async_index: AsyncIndex | None = None
 
         # Initialize embeddings
-        self.embeddings = OpenAIEmbeddings(
-            api_key=settings.openai_api_key,
-            model="text-embedding-3-small",
+        self.embeddings = embeddings or cached_embeddings(
+            ScheduledEmbeddings(
+                OpenAIEmbeddings(api_key=settings.openai_api_key, model=EMBEDDING_MODEL)
+            )
         )
 
-        # Local content cache (Pinecone doesn't store full text by default)
-        self._content_cache: dict[str, str] = {}
+        # Full chunk text by vector id (metadata only keeps a preview)
+        self.content_store = ContentStore(content_path)
 
         # Embedding dimension for zero-vector queries
         self.embedding_dim = 1536  # text-embedding-3-small dimension
@@ -59,50 +112,165 @@ class PineconeVectorStore(VectorStoreRepository):
     def add_chunks(self, chunks: list[Chunk]) -> int:
         """Add chunks to Pinecone.
 
+        Chunks are embedded in token-budgeted batches with several
+        requests in flight, and each batch is upserted (100 vectors per
+        request, in parallel) as soon as its embeddings arrive.
+
+        Args:
+            chunks: List of chunks to add
+
+        Returns:
+            Number of chunks added
+        """
+        added = run_pipeline(
+            chunks,
+            embed=self.embeddings.embed_documents,
+            write=self._upsert,
+            write_batch_size=BATCH_SIZE,
+            model=getattr(self.embeddings, "model", None),
+        )
+        if added:
+            logger.info(f"Added {added} chunks to Pinecone")
+        return added
+
+    async def aadd_chunks(self, chunks: list[Chunk]) -> int:
+        """Add chunks with async embedding and upsert calls.
+
         Args:
             chunks: List of chunks to add
 
         Returns:
             Number of chunks added
         """
-        if not chunks:
+        added = await arun_pipeline(
+            chunks,
+            embed=self.embeddings.aembed_documents,
+            write=self._aupsert,
+            write_batch_size=BATCH_SIZE,
+            model=getattr(self.embeddings, "model", None),
+        )
+        if added:
+            logger.info(f"Added {added} chunks to Pinecone")
+        return added
+
+    def _upsert(self, chunks: list[Chunk], embeddings: list[list[float]]) -> int:
+        """Upsert one batch (at most BATCH_SIZE vectors).
+
+        Content is stored first, so a vector is never searchable without
+        its full text.
+        """
+        self._store_content(chunks)
+        vectors = [self._to_vector(c, e) for c, e in zip(chunks, embeddings)]
+        self.index.upsert(vectors=vectors)
+        return len(vectors)
+
+    async def _aupsert(self, chunks: list[Chunk], embeddings: list[list[float]]) -> int:
+        """Async variant of _upsert."""
+        await asyncio.to_thread(self._store_content, chunks)
+        vectors = [self._to_vector(c, e) for c, e in zip(chunks, embeddings)]
+        await self._aindex().upsert(vectors=vectors, show_progress=False)
+        return len(vectors)
+
+    def _store_content(self, chunks: list[Chunk]) -> None:
+        self.content_store.put_many((c.chunk_id, c.content) for c in chunks)
+
+    def _to_vector(self, chunk: Chunk, embedding: list[float]) -> dict[str, Any]:
+        """Build the Pinecone record for a chunk."""
+        # Create unique ID ("{doc_id}#{chunk_index}", see _chunk_ids)
+        vector_id = chunk.chunk_id
+
+        # Prepare metadata (Pinecone has limits on metadata size)
+        raw_metadata = chunk.to_dict()
+        # Filter out None values - Pinecone doesn't accept nulls. Empty
+        # lists go too: filters treat them as missing ($exists: false)
+        metadata = {k: v for k, v in raw_metadata.items() if v is not None and v != []}
+        # Truncate content for metadata (Pinecone limit ~40KB per vector)
+        metadata["content_preview"] = chunk.content[:500]
+        if "date" in metadata:
+            metadata[DATE_NUMBER_FIELD] = _date_number(metadata["date"])
+
+        return {
+            "id": vector_id,
+            "values": embedding,
+            "metadata": metadata,
+        }
+
+    def _aindex(self) -> AsyncIndex:
+        """Async data-plane client, created on first use.
+
+        Created lazily so its HTTP session binds to the running event loop.
+        """
+        if self._async_index is None:
+            self._async_index = self.pc.IndexAsyncio(host=self.index.host)
+        return self._async_index
+
+    async def acount(self) -> int:
+        """Number of vectors in the index."""
+        try:
+            stats = await self._aindex().describe_index_stats()
+            return stats.total_vector_count
+        except Exception as e:
+            logger.warning(f"Failed to get index stats: {e}")
             return 0
 
-        # Prepare vectors for upsert
-        vectors = []
-        for i, chunk in enumerate(chunks):
-            # Generate embedding
-            embedding = self.embeddings.embed_query(chunk.content)
-
-            # Create unique ID
-            vector_id = f"{chunk.metadata.doc_id}_{chunk.chunk_index}"
-
-            # Store content in cache
-            self._content_cache[vector_id] = chunk.content
-
-            # Prepare metadata (Pinecone has limits on metadata size)
-            raw_metadata = chunk.to_dict()
-            # Filter out None values - Pinecone doesn't accept nulls
-            metadata = {k: v for k, v in raw_metadata.items() if v is not None}
-            # Truncate content for metadata (Pinecone limit ~40KB per vector)
-            metadata["content_preview"] = chunk.content[:500]
-
-            vectors.append(
-                {
-                    "id": vector_id,
-                    "values": embedding,
-                    "metadata": metadata,
-                }
-            )
+    def upsert_document(self, doc_id: str, chunks: list[Chunk]) -> int:
+        """Replace all chunks of a document.
+
+        New chunks are upserted first (overwriting ids that still exist),
+        then ids left over from a longer previous version are deleted.
+
+        Args:
+            doc_id: Document to replace
+            chunks: New chunks for the document
+
+        Returns:
+            Number of chunks written
+        """
+        old_ids = set(self._chunk_ids(doc_id))
+        added = self.add_chunks(chunks)
+
+        stale_ids = old_ids - {chunk.chunk_id for chunk in chunks}
+        self._delete_ids(sorted(stale_ids))
+        return added
+
+    def delete_document(self, doc_id: str) -> int:
+        """Delete all chunks of a document via an id-prefix listing.
+
+        Args:
+            doc_id: Document to delete
+
+        Returns:
+            Number of chunks deleted
+        """
+        ids = self._chunk_ids(doc_id)
+        self._delete_ids(ids)
+        if ids:
+            logger.info(f"Deleted {doc_id} ({len(ids)} chunks) from Pinecone")
+        return len(ids)
+
+    def _chunk_ids(self, doc_id: str) -> list[str]:
+        """List the vector ids of a document.
+
+        Ids are "{doc_id}#{chunk_index}", so the "{doc_id}#" prefix never
+        matches another document (e.g., deal_1 vs. deal_10). Indexes built
+        before that used "{doc_id}_{chunk_index}"; those ids are listed too
+        (so upserts and deletes remove them), checked one by one because
+        "{doc_id}_" also prefixes other documents (deal_1_2_0 of deal_1_2).
+        """
+        ids: list[str] = []
+        for page in self.index.list(prefix=f"{doc_id}#"):
+            ids.extend(item.id for item in page.vectors)
 
-        # Upsert in batches (Pinecone limit: 100 vectors per upsert)
-        batch_size = 100
-        for i in range(0, len(vectors), batch_size):
-            batch = vectors[i : i + batch_size]
-            self.index.upsert(vectors=batch)
+        legacy = re.compile(rf"{re.escape(doc_id)}_\d+")
+        for page in self.index.list(prefix=f"{doc_id}_"):
+            ids.extend(item.id for item in page.vectors if legacy.fullmatch(item.id))
+        return ids
 
-        logger.info(f"Added {len(chunks)} chunks to Pinecone")
-        return len(chunks)
+    def _delete_ids(self, ids: list[str]) -> None:
+        """Delete vectors (and their stored content) by id."""
+        for i in range(0, len(ids), BATCH_SIZE):
+            self.index.delete(ids=ids[i : i + BATCH_SIZE])
+        self.content_store.delete_many(ids)
 
     def search(self, query: SearchQuery) -> SearchResponse:
         """Search Pinecone with optional metadata filters.
@@ -113,59 +281,156 @@ class PineconeVectorStore(VectorStoreRepository):
         Returns:
             Search results with scores and metadata
         """
+        self.check_modes([query])
+
         # Generate query embedding
-        query_embedding = self.embeddings.embed_query(query.query)
+        (query_embedding,) = embed_query_texts(self.embeddings, [query.query])
+
+        return self._query(query, query_embedding, self.count)
+
+    def search_many(self, queries: list[SearchQuery]) -> list[SearchResponse]:
+        """Search several queries at once.
+
+        Queries are embedded in one embeddings call and sent to Pinecone
+        concurrently (Pinecone has no multi-vector query).
+
+        Args:
+            queries: Search queries, each with its own filters and top_k
+
+        Returns:
+            One response per query, in order
+        """
+        if not queries:
+            return []
+        self.check_modes(queries)
+
+        embeddings = embed_query_texts(self.embeddings, [q.query for q in queries])
+        total = self.count
+
+        workers = min(MAX_CONCURRENT_QUERIES, len(queries))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(
+                executor.map(
+                    lambda args: self._query(*args, total),
+                    zip(queries, embeddings),
+                )
+            )
+
+    async def asearch(self, query: SearchQuery) -> SearchResponse:
+        """Search with async embedding and query calls.
+
+        Args:
+            query: Search query with optional filters
+
+        Returns:
+            Search results with scores and metadata
+        """
+        self.check_modes([query])
+        (query_embedding,), total = await asyncio.gather(
+            aembed_query_texts(self.embeddings, [query.query]), self.acount()
+        )
+        return await self._aquery(query, query_embedding, total)
+
+    async def asearch_many(self, queries: list[SearchQuery]) -> list[SearchResponse]:
+        """Async variant of search_many (all queries in flight at once)."""
+        if not queries:
+            return []
+        self.check_modes(queries)
 
+        embeddings, total = await asyncio.gather(
+            aembed_query_texts(self.embeddings, [q.query for q in queries]),
+            self.acount(),
+        )
+        return list(
+            await asyncio.gather(
+                *(
+                    self._aquery(query, embedding, total)
+                    for query, embedding in zip(queries, embeddings)
+                )
+            )
+        )
+
+    def _query(
+        self, query: SearchQuery, query_embedding: list[float], total: int
+    ) -> SearchResponse:
+        """Run one embedded query against the index."""
+        response = self.index.query(**self._query_args(query, query_embedding))
+        return self._to_response(query, response, total)
+
+    async def _aquery(
+        self, query: SearchQuery, query_embedding: list[float], total: int
+    ) -> SearchResponse:
+        """Async variant of _query."""
+        response = await self._aindex().query(
+            **self._query_args(query, query_embedding)
+        )
+        return self._to_response(query, response, total)
+
+    def _query_args(
+        self, query: SearchQuery, query_embedding: list[float]
+    ) -> dict[str, Any]:
         # Build filter if provided
         pinecone_filter = None
         if query.filters:
-            pinecone_filter = self._build_pinecone_filter(query.filters)
+            pinecone_filter = self._build_pinecone_filter(
+                query.compiled_filters or parse_filters(query.filters)
+            )
 
-        # Search
-        response = self.index.query(
-            vector=query_embedding,
-            top_k=query.top_k,
-            include_metadata=True,
-            filter=pinecone_filter,
-        )
+        # MMR re-ranks a deeper candidate list using the returned vectors
+        return {
+            "vector": query_embedding,
+            "top_k": mmr_depth(query),
+            "include_metadata": True,
+            "include_values": query.mmr_lambda is not None,
+            "filter": pinecone_filter,
+        }
+
+    def _to_response(
+        self, query: SearchQuery, response: Any, total: int
+    ) -> SearchResponse:
+        """Convert a Pinecone query response into a SearchResponse.
+
+        Full texts for all matches are read from the content store in one
+        local lookup.
+        """
+        contents = self.content_store.get_many([m.id for m in response.matches])
+        missing = len(response.matches) - len(contents)
+        if missing:
+            logger.warning(
+                f"{missing} results have no stored content, using previews "
+                "(re-ingest to restore full text)"
+            )
 
         # Convert to SearchResults
         results = []
         for match in response.matches:
             metadata = match.metadata or {}
-
-            # Get full content from cache or use preview
-            content = self._content_cache.get(
-                match.id, metadata.get("content_preview", "")
-            )
+            content = contents.get(match.id, metadata.get("content_preview", ""))
 
             results.append(
                 SearchResult(
                     content=content,
                     score=round(match.score, 4),
                     metadata=metadata,
+                    embedding=match.values or None,
                 )
             )
 
         return SearchResponse(
-            results=results,
-            total_searched=self.count,
+            results=diversify(results, query, SearchMode.DENSE),
+            total_searched=total,
             query=query.query,
         )
 
-    def _build_pinecone_filter(self, filters: dict[str, Any]) -> dict:
-        """Convert our filter format to Pinecone filter format."""
-        # Simple exact match filters
-        pinecone_filter = {}
-        for key, value in filters.items():
-            pinecone_filter[key] = {"$eq": value}
-        return pinecone_filter
+    def _build_pinecone_filter(self, filters: FilterNode) -> dict:
+        """Translate a compiled filter to Pinecone's native operators."""
+        return to_pinecone(rewrite(filters, _numeric_dates))
 
     def clear(self) -> None:
         """Clear all vectors from the index."""
         try:
             self.index.delete(delete_all=True)
-            self._content_cache.clear()
+            self.content_store.clear()
             logger.info("Cleared Pinecone index")
         except Exception as e:
             logger.error(f"Failed to clear Pinecone index: {e}")
@@ -205,3 +470,18 @@ class PineconeVectorStore(VectorStoreRepository):
             metadata_list.append(metadata)
 
         return metadata_list
+
+
+def _date_number(value: str) -> int:
+    """ISO date as a YYYYMMDD integer."""
+    return int(datetime.date.fromisoformat(value).strftime("%Y%m%d"))
+
+
+def _numeric_dates(condition: Condition) -> Condition:
+    """Point range conditions on "date" at its numeric copy."""
+    if condition.field != "date" or condition.op not in RANGE_OPS:
+        return condition
+    try:
+        return Condition(DATE_NUMBER_FIELD, condition.op, _date_number(condition.value))
+    except (TypeError, ValueError):
+        return condition
@@ -0,0 +1,235 @@
+"""In-process LRU cache of query embeddings, with an optional disk tier.
+
+The dashboard and the agents repeat the same queries ("healthcare
+deals"), and embedding a query is an API round-trip of hundreds of
+milliseconds. Embeddings are cached under (model, normalised query
+text) so a repeated query goes straight to the index scan.
+
+Entries expire after QUERY_CACHE_TTL seconds. With QUERY_CACHE_DISK on,
+misses in memory are looked up in .index/query_cache.sqlite (and new
+embeddings written there), so workers of one host share their queries.
+"""
+
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass, replace
+from pathlib import Path
+
+import numpy as np
+
+from app.core import INDEX_PATH, get_logger, settings
+
+logger = get_logger(__name__)
+
+DISK_PATH = INDEX_PATH / "query_cache.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS query_embeddings (
+    key        BLOB PRIMARY KEY,
+    vector     BLOB NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS query_embeddings_expiry
+    ON query_embeddings (expires_at);
+"""
+
+WHITESPACE = re.compile(r"\s+")
+
+
+@dataclass
+class QueryCacheStats:
+    """Query embedding cache counters (queries, not requests)."""
+
+    hits: int = 0
+    misses: int = 0
+    disk_hits: int = 0  # Hits served by the disk tier (included in hits)
+    size: int = 0  # Entries in memory
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "disk_hits": self.disk_hits,
+            "size": self.size,
+            "hit_rate": round(self.hit_rate, 4),
+        }
+
+
+def normalize_query(text: str) -> str:
+    """Cache form of a query: NFKC, case-folded, single-spaced."""
+    return WHITESPACE.sub(" ", unicodedata.normalize("NFKC", text)).strip().casefold()
+
+
+def query_key(model: str, text: str) -> bytes:
+    """Cache key of a query embedded by a model."""
+    data = f"{model}\0{normalize_query(text)}".encode("utf-8")
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+class QueryEmbeddingCache:
+    """Bounded LRU of query embeddings with a TTL.
+
+    Thread-safe; lookups and inserts take a lock around an OrderedDict.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl: float,
+        disk_path: Path | None = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        """Create an empty cache.
+
+        Args:
+            max_entries: Entries kept in memory (least recently used evicted)
+            ttl: Seconds an embedding stays valid
+            disk_path: SQLite file shared by workers (None: memory only)
+            clock: Wall-clock time source (the disk tier spans processes)
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.disk_path = disk_path
+        self.stats = QueryCacheStats()
+
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[bytes, tuple[np.ndarray, float]] = OrderedDict()
+        self._conn: sqlite3.Connection | None = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _disk(self) -> sqlite3.Connection | None:
+        if self.disk_path is None:
+            return None
+        if self._conn is None:
+            self.disk_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(
+                self.disk_path, check_same_thread=False, isolation_level=None
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def _remember(self, key: bytes, vector: np.ndarray, expires_at: float) -> None:
+        self._entries[key] = (vector, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _from_disk(self, keys: list[bytes], now: float) -> dict[bytes, tuple]:
+        conn = self._disk()
+        if conn is None or not keys:
+            return {}
+        try:
+            rows = conn.execute(
+                "SELECT key, vector, expires_at FROM query_embeddings "
+                f"WHERE expires_at > ? AND key IN ({','.join('?' * len(keys))})",
+                [now, *keys],
+            ).fetchall()
+        except sqlite3.Error as e:
+            logger.warning(f"Query cache {self.disk_path} unreadable ({e})")
+            return {}
+        return {
+            key: (np.frombuffer(vector, dtype=np.float32), expires_at)
+            for key, vector, expires_at in rows
+        }
+
+    def get_many(self, model: str, texts: list[str]) -> list[np.ndarray | None]:
+        """Cached embeddings of queries (None where missing or expired)."""
+        keys = [query_key(model, text) for text in texts]
+        now = self._clock()
+        with self._lock:
+            found: dict[bytes, np.ndarray] = {}
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is not None and entry[1] > now:
+                    self._entries.move_to_end(key)
+                    found[key] = entry[0]
+                elif entry is not None:
+                    del self._entries[key]
+
+            from_disk = self._from_disk([k for k in keys if k not in found], now)
+            for key, (vector, expires_at) in from_disk.items():
+                self._remember(key, vector, expires_at)
+                found[key] = vector
+
+            vectors = [found.get(key) for key in keys]
+            hits = sum(vector is not None for vector in vectors)
+            self.stats.hits += hits
+            self.stats.misses += len(keys) - hits
+            self.stats.disk_hits += sum(key in from_disk for key in keys)
+            self.stats.size = len(self._entries)
+        return vectors
+
+    def put_many(self, model: str, texts: list[str], vectors: np.ndarray) -> None:
+        """Cache embeddings of queries for the next TTL seconds."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        expires_at = self._clock() + self.ttl
+        keys = [query_key(model, text) for text in texts]
+        with self._lock:
+            for key, vector in zip(keys, vectors):
+                self._remember(key, vector, expires_at)
+            self.stats.size = len(self._entries)
+
+            conn = self._disk()
+            if conn is None:
+                return
+            try:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO query_embeddings VALUES (?, ?, ?)",
+                    [(k, v.tobytes(), expires_at) for k, v in zip(keys, vectors)],
+                )
+                conn.execute(
+                    "DELETE FROM query_embeddings WHERE expires_at <= ?",
+                    [self._clock()],
+                )
+            except sqlite3.Error as e:
+                logger.warning(f"Query cache {self.disk_path} not writable ({e})")
+
+    def clear(self) -> None:
+        """Drop the in-memory entries and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.stats = QueryCacheStats()
+
+
+_cache: QueryEmbeddingCache | None = None
+_cache_lock = threading.Lock()
+
+
+def query_cache() -> QueryEmbeddingCache | None:
+    """The process-wide query embedding cache (None if QUERY_CACHE_SIZE is 0)."""
+    global _cache
+    if settings.query_cache_size <= 0:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = QueryEmbeddingCache(
+                settings.query_cache_size,
+                settings.query_cache_ttl,
+                DISK_PATH if settings.query_cache_disk else None,
+            )
+        return _cache
+
+
+def query_cache_stats() -> QueryCacheStats:
+    """Counters of the process-wide query embedding cache."""
+    cache = query_cache()
+    if cache is None:
+        return QueryCacheStats()
+    with cache._lock:
+        return replace(cache.stats)
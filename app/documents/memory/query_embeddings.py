@@ -0,0 +1,217 @@
+"""Query embedding with a deadline, for searches that can fall back to BM25.
+
+Embeddings of repeated queries are served from the query cache
+(query_cache.py) without an embeddings call, and concurrent searches
+for the same queries share one embeddings call (single flight).
+"""
+
+import asyncio
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from app.core import get_logger, settings
+from app.core.singleflight import SingleFlight
+from app.documents.memory.batching import ScheduledEmbeddings
+from app.documents.memory.embedding_cache import CachedEmbeddings
+from app.documents.memory.query_cache import normalize_query, query_cache
+from app.documents.schemas import SearchMode, SearchQuery
+
+logger = get_logger(__name__)
+
+# Embeddings calls run here so the caller can search lexically meanwhile
+# and stop waiting once the deadline passes
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="query-embed")
+
+_flights = SingleFlight("query_embedding")
+
+
+def dense_positions(queries: list[SearchQuery]) -> list[int]:
+    """Positions of the queries that need an embedding (dense or hybrid)."""
+    return [i for i, q in enumerate(queries) if q.mode != SearchMode.LEXICAL]
+
+
+def lexical_positions(queries: list[SearchQuery]) -> list[int]:
+    """Positions of the queries that need a BM25 ranking (lexical or hybrid)."""
+    return [i for i, q in enumerate(queries) if q.mode != SearchMode.DENSE]
+
+
+def _model_of(embeddings: Embeddings) -> str:
+    return getattr(embeddings, "model", None) or type(embeddings).__qualname__
+
+
+def _flight_key(embeddings: Embeddings, texts: list[str]) -> tuple:
+    return _model_of(embeddings), tuple(map(normalize_query, texts))
+
+
+def _query_client(embeddings: Embeddings) -> Embeddings:
+    """The client under the ingestion wrappers.
+
+    Query batches use embed_documents, which the wrappers would send
+    through the persistent chunk cache and the ingestion rate budget;
+    queries are cached by the query cache alone.
+    """
+    while isinstance(embeddings, CachedEmbeddings | ScheduledEmbeddings):
+        embeddings = embeddings.embeddings
+    return embeddings
+
+
+def _call(embeddings: Embeddings, texts: list[str]) -> list[list[float]]:
+    embeddings = _query_client(embeddings)
+    if len(texts) == 1:
+        return [embeddings.embed_query(texts[0])]
+    return embeddings.embed_documents(texts)
+
+
+async def _acall(embeddings: Embeddings, texts: list[str]) -> list[list[float]]:
+    embeddings = _query_client(embeddings)
+    if len(texts) == 1:
+        return [await embeddings.aembed_query(texts[0])]
+    return await embeddings.aembed_documents(texts)
+
+
+def _embed(embeddings: Embeddings, texts: list[str]) -> list[list[float]]:
+    key = _flight_key(embeddings, texts)
+    return _flights.do(key, lambda: _call(embeddings, texts))
+
+
+async def _aembed(embeddings: Embeddings, texts: list[str]) -> list[list[float]]:
+    key = _flight_key(embeddings, texts)
+    return await _flights.ado(key, lambda: _acall(embeddings, texts))
+
+
+def _lookup(
+    embeddings: Embeddings, texts: list[str]
+) -> tuple[list[np.ndarray | None], list[str]]:
+    """Cached embeddings of texts, and the distinct texts still to embed."""
+    cache = query_cache()
+    if cache is None:
+        return [None] * len(texts), list(dict.fromkeys(texts))
+    found = cache.get_many(_model_of(embeddings), texts)
+    missing = [text for text, vector in zip(texts, found) if vector is None]
+    return found, list(dict.fromkeys(missing))
+
+
+def _merge(
+    embeddings: Embeddings,
+    texts: list[str],
+    found: list[np.ndarray | None],
+    missing: list[str],
+    embedded: list[list[float]],
+) -> list[list[float]]:
+    """Cache the new embeddings and return one embedding per text."""
+    cache = query_cache()
+    if cache is not None and missing:
+        cache.put_many(_model_of(embeddings), missing, np.asarray(embedded))
+    by_text = dict(zip(missing, embedded))
+    return [
+        list(by_text[text]) if vector is None else vector.tolist()
+        for text, vector in zip(texts, found)
+    ]
+
+
+def _embed_missing(
+    embeddings: Embeddings,
+    texts: list[str],
+    found: list[np.ndarray | None],
+    missing: list[str],
+) -> list[list[float]]:
+    embedded = _embed(embeddings, missing) if missing else []
+    return _merge(embeddings, texts, found, missing, embedded)
+
+
+def embed_query_texts(embeddings: Embeddings, texts: list[str]) -> list[list[float]]:
+    """Embed query texts, skipping the embeddings call for cached ones."""
+    return _embed_missing(embeddings, texts, *_lookup(embeddings, texts))
+
+
+async def aembed_query_texts(
+    embeddings: Embeddings, texts: list[str]
+) -> list[list[float]]:
+    """Async variant of embed_query_texts()."""
+    found, missing = _lookup(embeddings, texts)
+    embedded = await _aembed(embeddings, missing) if missing else []
+    return _merge(embeddings, texts, found, missing, embedded)
+
+
+def _align(
+    queries: list[SearchQuery], vectors: list[list[float]] | None
+) -> np.ndarray | None:
+    """One row per query (zeros for lexical queries), or None."""
+    if vectors is None:
+        return None
+    embedded = np.array(vectors, dtype=np.float32)
+    query_np = np.zeros((len(queries), embedded.shape[1]), dtype=np.float32)
+    query_np[dense_positions(queries)] = embedded
+    return query_np
+
+
+def submit_query_embeddings(
+    embeddings: Embeddings, queries: list[SearchQuery]
+) -> Future | None:
+    """Start embedding the dense and hybrid queries in the background.
+
+    Cached queries are looked up right away; if all of them are cached
+    the returned future is already done.
+
+    Returns:
+        Future for wait_query_embeddings(), or None if no query needs one
+    """
+    texts = [queries[i].query for i in dense_positions(queries)]
+    if not texts:
+        return None
+    found, missing = _lookup(embeddings, texts)
+    if missing:
+        return _executor.submit(_embed_missing, embeddings, texts, found, missing)
+    future: Future = Future()
+    future.set_result(_merge(embeddings, texts, found, [], []))
+    return future
+
+
+def wait_query_embeddings(
+    future: Future | None, queries: list[SearchQuery], timeout: float | None = None
+) -> np.ndarray | None:
+    """Wait for submit_query_embeddings().
+
+    Args:
+        future: Future returned by submit_query_embeddings()
+        queries: The submitted queries
+        timeout: Seconds to wait (default: SEARCH_EMBEDDING_TIMEOUT)
+
+    Returns:
+        One float32 row per query, or None (answer lexically) if no query
+        needed an embedding or the call failed or was late
+    """
+    if future is None:
+        return None
+    timeout = settings.search_embedding_timeout if timeout is None else timeout
+    try:
+        return _align(queries, future.result(timeout=timeout))
+    except FutureTimeoutError:
+        logger.warning(f"Query embedding took over {timeout}s; using lexical search")
+    except Exception as e:
+        logger.warning(f"Query embedding failed ({e}); using lexical search")
+    return None
+
+
+async def aembed_queries(
+    embeddings: Embeddings, queries: list[SearchQuery], timeout: float | None = None
+) -> np.ndarray | None:
+    """Async variant of submit_query_embeddings() + wait_query_embeddings()."""
+    texts = [queries[i].query for i in dense_positions(queries)]
+    if not texts:
+        return None
+    found, missing = _lookup(embeddings, texts)
+    timeout = settings.search_embedding_timeout if timeout is None else timeout
+    try:
+        async with asyncio.timeout(timeout):
+            embedded = await _aembed(embeddings, missing) if missing else []
+    except TimeoutError:
+        logger.warning(f"Query embedding took over {timeout}s; using lexical search")
+        return None
+    except Exception as e:
+        logger.warning(f"Query embedding failed ({e}); using lexical search")
+        return None
+    return _align(queries, _merge(embeddings, texts, found, missing, embedded))
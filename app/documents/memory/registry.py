@@ -0,0 +1,227 @@
+"""SQLite registry of indexed documents."""
+
+import datetime
+import hashlib
+import json
+import sqlite3
+import threading
+from collections.abc import Iterator
+from contextlib import closing, contextmanager
+from pathlib import Path
+
+from app.core import get_logger
+from app.documents.schemas import Chunk, DocumentRecord, DocumentSort, SortOrder
+
+logger = get_logger(__name__)
+
+# Columns GET /documents can filter on (all indexed)
+FILTER_COLUMNS = ("doc_type", "industry", "outcome")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    doc_id TEXT PRIMARY KEY,
+    doc_type TEXT NOT NULL,
+    industry TEXT,
+    outcome TEXT,
+    date TEXT,
+    source_file TEXT NOT NULL,
+    chunk_count INTEGER NOT NULL,
+    content_hash TEXT NOT NULL,
+    indexed_at TEXT NOT NULL,
+    metadata TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS documents_doc_type ON documents (doc_type);
+CREATE INDEX IF NOT EXISTS documents_industry ON documents (industry);
+CREATE INDEX IF NOT EXISTS documents_outcome ON documents (outcome);
+CREATE INDEX IF NOT EXISTS documents_date ON documents (date);
+"""
+
+COLUMNS = (
+    "doc_id, doc_type, industry, outcome, date, source_file, "
+    "chunk_count, content_hash, indexed_at, metadata"
+)
+
+
+def document_hash(chunks: list[Chunk]) -> str:
+    """Hash of a document's chunks (content and metadata, in chunk order)."""
+    digest = hashlib.sha256()
+    for chunk in sorted(chunks, key=lambda c: c.chunk_index):
+        digest.update(json.dumps(chunk.to_dict(), sort_keys=True).encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(chunk.content.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class DocumentRegistry:
+    """One row per indexed document: metadata, chunk count and content hash.
+
+    Maintained during ingestion, so listing documents and detecting
+    unchanged or removed documents never has to scan the vector store.
+
+    Writes share one connection (serialised with a lock); reads open a
+    short-lived read-only connection, so they are not blocked by a long
+    ingestion transaction (SQLite WAL mode) and never create the file.
+    """
+
+    def __init__(self, path: Path):
+        """Open the registry.
+
+        Args:
+            path: SQLite database file (created on the first write)
+        """
+        self.path = path
+        self._lock = threading.RLock()
+        self._conn: sqlite3.Connection | None = None
+
+    def _writer(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(
+                self.path, check_same_thread=False, isolation_level=None
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    @contextmanager
+    def _reader(self) -> Iterator[sqlite3.Connection | None]:
+        if not self.path.exists():
+            yield None
+            return
+        uri = f"file:{self.path}?mode=ro"
+        with closing(sqlite3.connect(uri, uri=True)) as conn:
+            yield conn
+
+    # =========================================================================
+    # Writes
+    # =========================================================================
+
+    @contextmanager
+    def transaction(self) -> Iterator["DocumentRegistry"]:
+        """Group writes; they are committed together when the block exits.
+
+        Nest the vector store transaction inside this one, so the
+        registry only commits after the index writes succeeded.
+        """
+        with self._lock:
+            conn = self._writer()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def upsert(
+        self, doc_id: str, chunks: list[Chunk], content_hash: str | None = None
+    ) -> None:
+        """Record (or replace) a document from its chunks.
+
+        Args:
+            doc_id: Document id
+            chunks: All chunks of the document
+            content_hash: Precomputed document_hash(chunks)
+        """
+        metadata = chunks[0].metadata.to_dict()
+        row = (
+            doc_id,
+            metadata["doc_type"],
+            metadata.get("industry"),
+            metadata.get("outcome"),
+            metadata.get("date"),
+            metadata["source_file"],
+            len(chunks),
+            content_hash or document_hash(chunks),
+            datetime.datetime.now(datetime.UTC).isoformat(),
+            json.dumps(metadata),
+        )
+        with self._lock:
+            self._writer().execute(
+                f"INSERT OR REPLACE INTO documents ({COLUMNS}) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                row,
+            )
+
+    def delete(self, doc_id: str) -> None:
+        with self._lock:
+            self._writer().execute("DELETE FROM documents WHERE doc_id = ?", (doc_id,))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._writer().execute("DELETE FROM documents")
+        logger.info("Cleared document registry")
+
+    # =========================================================================
+    # Reads
+    # =========================================================================
+
+    def hashes(self) -> dict[str, str]:
+        """Content hash of every registered document, by doc_id."""
+        with self._reader() as conn:
+            if conn is None:
+                return {}
+            rows = conn.execute("SELECT doc_id, content_hash FROM documents")
+            return dict(rows.fetchall())
+
+    def totals(self) -> tuple[int, int]:
+        """Number of documents and of chunks across them."""
+        with self._reader() as conn:
+            if conn is None:
+                return 0, 0
+            row = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(chunk_count), 0) FROM documents"
+            ).fetchone()
+            return row[0], row[1]
+
+    def list_documents(
+        self,
+        filters: dict[str, str] | None = None,
+        sort: DocumentSort = DocumentSort.DOC_ID,
+        order: SortOrder = SortOrder.ASC,
+        limit: int = 50,
+        offset: int = 0,
+    ) -> tuple[list[DocumentRecord], int]:
+        """Page through documents.
+
+        Args:
+            filters: Exact matches on doc_type, industry or outcome
+            sort: Field to sort by (ties broken by doc_id)
+            order: Sort direction
+            limit: Page size
+            offset: Documents to skip
+
+        Returns:
+            The page of documents and the number matching the filters
+        """
+        filters = {k: v for k, v in (filters or {}).items() if v is not None}
+        unknown = filters.keys() - set(FILTER_COLUMNS)
+        if unknown:
+            raise ValueError(f"Cannot filter documents by {sorted(unknown)}")
+
+        where = " AND ".join(f"{column} = ?" for column in filters) or "1"
+        params = list(filters.values())
+        direction = "DESC" if order == SortOrder.DESC else "ASC"
+
+        with self._reader() as conn:
+            if conn is None:
+                return [], 0
+            total = conn.execute(
+                f"SELECT COUNT(*) FROM documents WHERE {where}", params
+            ).fetchone()[0]
+            rows = conn.execute(
+                f"SELECT {COLUMNS} FROM documents WHERE {where} "
+                f"ORDER BY {DocumentSort(sort).value} {direction}, doc_id "
+                "LIMIT ? OFFSET ?",
+                [*params, limit, offset],
+            ).fetchall()
+
+        return [self._to_record(row) for row in rows], total
+
+    @staticmethod
+    def _to_record(row: tuple) -> DocumentRecord:
+        fields = dict(zip([c.strip() for c in COLUMNS.split(",")], row))
+        fields["metadata"] = json.loads(fields["metadata"])
+        return DocumentRecord(**fields)
@@ -0,0 +1,436 @@
+"""Sharded FAISS vector store with parallel fan-out search."""
+
+import asyncio
+import json
+import zlib
+from collections import defaultdict
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_openai import OpenAIEmbeddings
+
+from app.core import get_logger, settings
+from app.documents.memory.base import VectorStoreRepository
+from app.documents.memory.batching import ScheduledEmbeddings
+from app.documents.memory.bm25 import CorpusStats, reciprocal_rank_fusion
+from app.documents.memory.embedding_cache import EMBEDDING_MODEL, cached_embeddings
+from app.documents.memory.faiss_store import FAISSVectorStore
+from app.documents.memory.files import atomic_path
+from app.documents.memory.mmr import diversify
+from app.documents.memory.query_embeddings import (
+    aembed_queries,
+    submit_query_embeddings,
+    wait_query_embeddings,
+)
+from app.documents.schemas import Chunk, SearchMode, SearchQuery, SearchResponse
+
+logger = get_logger(__name__)
+
+MANIFEST_FILE = "shards.json"
+
+
+def shard_of(doc_id: str, num_shards: int) -> int:
+    """Shard that holds a document (stable across processes and restarts)."""
+    return zlib.crc32(doc_id.encode("utf-8")) % num_shards
+
+
+class ShardedFAISSVectorStore(VectorStoreRepository):
+    """FAISS store partitioned across N shard indexes.
+
+    Chunks are assigned to shards by a hash of their doc_id, so all chunks
+    of a document live in one shard and upserts/deletes touch one shard.
+    Searches embed the query once, fan out to every shard on a thread
+    pool (FAISS releases the GIL while searching) and merge the per-shard
+    top-k by score.
+
+    Each shard is a full FAISSVectorStore, so index layout, quantization,
+    metadata filters and memory-mapping settings apply per shard. Filters
+    are evaluated inside every shard before its top-k is taken, so the
+    merged result equals a filtered search over the whole corpus.
+    """
+
+    def __init__(
+        self,
+        num_shards: int | None = None,
+        embedding_dim: int = 1536,  # OpenAI text-embedding-3-small
+        index_path: Path | None = None,
+        embeddings: Embeddings | None = None,
+        **shard_options,
+    ):
+        self.num_shards = num_shards or settings.faiss_num_shards
+        self.embedding_dim = embedding_dim
+        self.index_path = index_path
+        self._shard_options = shard_options
+
+        # One embeddings client shared by all shards
+        self.embeddings = embeddings or cached_embeddings(
+            ScheduledEmbeddings(
+                OpenAIEmbeddings(api_key=settings.openai_api_key, model=EMBEDDING_MODEL)
+            )
+        )
+
+        self.shards = self._create_shards(self.num_shards)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.num_shards, thread_name_prefix="faiss-shard"
+        )
+
+        # Load existing shards if path provided (read-only: the write-ahead
+        # logs are only attached by writers, see attach_wal())
+        if index_path and (index_path / MANIFEST_FILE).exists():
+            self.load(index_path)
+
+    def _create_shards(self, num_shards: int) -> list[FAISSVectorStore]:
+        return [
+            FAISSVectorStore(
+                embedding_dim=self.embedding_dim,
+                embeddings=self.embeddings,
+                **self._shard_options,
+            )
+            for _ in range(num_shards)
+        ]
+
+    def _shard(self, doc_id: str) -> FAISSVectorStore:
+        return self.shards[shard_of(doc_id, self.num_shards)]
+
+    @property
+    def count(self) -> int:
+        """Number of live chunks across all shards."""
+        return sum(shard.count for shard in self.shards)
+
+    def add_chunks(self, chunks: list[Chunk]) -> int:
+        """Embed chunks once and add them to their shards in parallel.
+
+        Args:
+            chunks: List of chunks to add
+
+        Returns:
+            Number of chunks added
+        """
+        if not chunks:
+            return 0
+
+        logger.info(f"Generating embeddings for {len(chunks)} chunks...")
+        embeddings = self.embeddings.embed_documents([c.content for c in chunks])
+
+        return self.add_embedded_chunks(chunks, np.array(embeddings, np.float32))
+
+    async def aadd_chunks(self, chunks: list[Chunk]) -> int:
+        """Add chunks with an async embeddings call (writes in a thread)."""
+        if not chunks:
+            return 0
+
+        logger.info(f"Generating embeddings for {len(chunks)} chunks...")
+        embeddings = await self.embeddings.aembed_documents([c.content for c in chunks])
+        embeddings_np = np.array(embeddings, dtype=np.float32)
+
+        return await asyncio.to_thread(self.add_embedded_chunks, chunks, embeddings_np)
+
+    def add_embedded_chunks(
+        self, chunks: list[Chunk], embeddings_np: np.ndarray
+    ) -> int:
+        """Route chunks embedded by the caller to their shards, in parallel."""
+        # Group chunk positions by shard
+        positions: dict[int, list[int]] = defaultdict(list)
+        for i, chunk in enumerate(chunks):
+            positions[shard_of(chunk.metadata.doc_id, self.num_shards)].append(i)
+
+        def add_to_shard(shard_id: int) -> int:
+            rows = positions[shard_id]
+            return self.shards[shard_id].add_embedded_chunks(
+                [chunks[i] for i in rows], embeddings_np[rows]
+            )
+
+        added = sum(self._executor.map(add_to_shard, positions))
+        logger.info(f"Added {added} chunks across {len(positions)} shards")
+        return added
+
+    @contextmanager
+    def transaction(self) -> Iterator[VectorStoreRepository]:
+        """Apply writes in place and persist them to index_path."""
+        if self.index_path and any(shard.wal is None for shard in self.shards):
+            self.attach_wal(self.index_path)
+        yield self
+        self.flush()
+        if self.log_bytes > settings.faiss_wal_compact_bytes:
+            self.compact()
+
+    def attach_wal(self, path: Path) -> None:
+        """Log writes of each shard to path/shard_NN/wal.log.
+
+        Only the writer of path calls this; it writes the manifest and the
+        logs into path, so readers must not.
+        """
+        if not all(shard.wal_enabled for shard in self.shards):
+            return
+        # The manifest makes a store that only has logs loadable
+        if not (path / MANIFEST_FILE).exists():
+            self._write_manifest(path)
+        for shard_id, shard in enumerate(self.shards):
+            shard.attach_wal(self._shard_dir(path, shard_id))
+
+    @property
+    def log_bytes(self) -> int:
+        """Bytes of writes logged since the last snapshot (all shards)."""
+        return sum(shard.log_bytes for shard in self.shards)
+
+    def flush(self) -> None:
+        """Persist writes to index_path (full save without a log)."""
+        if self.index_path and any(shard.wal is None for shard in self.shards):
+            self.save(self.index_path)
+
+    def compact(self) -> None:
+        """Fold every shard's write-ahead log into a full snapshot."""
+        if self.index_path:
+            self.save(self.index_path)
+
+    def upsert_document(self, doc_id: str, chunks: list[Chunk]) -> int:
+        """Replace all chunks of a document (in its shard only).
+
+        Args:
+            doc_id: Document to replace
+            chunks: New chunks for the document
+
+        Returns:
+            Number of chunks written (0 if unchanged)
+        """
+        return self._shard(doc_id).upsert_document(doc_id, chunks)
+
+    def delete_document(self, doc_id: str) -> int:
+        """Delete all chunks of a document.
+
+        Args:
+            doc_id: Document to delete
+
+        Returns:
+            Number of chunks deleted
+        """
+        return self._shard(doc_id).delete_document(doc_id)
+
+    def search(self, query: SearchQuery) -> SearchResponse:
+        """Search all shards in parallel and merge their top-k.
+
+        Args:
+            query: Search query with optional filters
+
+        Returns:
+            Search results with scores and metadata
+        """
+        return self.search_many([query])[0]
+
+    def search_many(self, queries: list[SearchQuery]) -> list[SearchResponse]:
+        """Search several queries across all shards.
+
+        Queries are embedded in one call; each shard answers the whole
+        batch, and results are merged per query. If the embeddings call
+        fails or misses SEARCH_EMBEDDING_TIMEOUT, the shards answer
+        lexically (BM25).
+
+        Args:
+            queries: Search queries, each with its own filters and top_k
+
+        Returns:
+            One response per query, in order
+        """
+        if not queries:
+            return []
+        if self.count == 0:
+            return self._empty_responses(queries)
+
+        pending = submit_query_embeddings(self.embeddings, queries)
+        return self._search_embedded(queries, wait_query_embeddings(pending, queries))
+
+    async def asearch(self, query: SearchQuery) -> SearchResponse:
+        """Search with an async embeddings call (shards searched in threads)."""
+        return (await self.asearch_many([query]))[0]
+
+    async def asearch_many(self, queries: list[SearchQuery]) -> list[SearchResponse]:
+        """Async variant of search_many."""
+        if not queries:
+            return []
+        if self.count == 0:
+            return self._empty_responses(queries)
+
+        query_np = await aembed_queries(self.embeddings, queries)
+        return await asyncio.to_thread(self._search_embedded, queries, query_np)
+
+    async def acount(self) -> int:
+        """Number of live chunks (in memory, no I/O)."""
+        return self.count
+
+    def _search_embedded(
+        self, queries: list[SearchQuery], query_np: np.ndarray | None
+    ) -> list[SearchResponse]:
+        """Fan embedded queries out to all shards and merge per query.
+
+        Hybrid queries are sent as a dense and a lexical query, each merged
+        across shards, and fused afterwards so fusion sees global ranks.
+        Shards score lexical queries with BM25 statistics summed over all
+        shards, so their scores are comparable and merge like a single
+        index's.
+        MMR queries are diversified within each shard and again over the
+        merged candidates. query_np None answers every query lexically.
+        """
+        parts: list[list[int]] = []
+        shard_queries: list[SearchQuery] = []
+        for query in queries:
+            split = [query]
+            if query.mode == SearchMode.HYBRID and query_np is not None:
+                depth = max(query.top_k, settings.hybrid_fetch_k)
+                # MMR with lambda 1 keeps relevance order but returns the
+                # candidate vectors needed to diversify the fused list
+                mmr_lambda = None if query.mmr_lambda is None else 1.0
+                split = [
+                    query.model_copy(
+                        update={"mode": mode, "top_k": depth, "mmr_lambda": mmr_lambda}
+                    )
+                    for mode in (SearchMode.DENSE, SearchMode.LEXICAL)
+                ]
+            start = len(shard_queries)
+            parts.append(list(range(start, start + len(split))))
+            shard_queries.extend(split)
+
+        shard_np = None
+        if query_np is not None:
+            shard_np = query_np[[i for i, part in enumerate(parts) for _ in part]]
+        corpus = {
+            i: sum(
+                (shard.lexical_index.stats(query.query) for shard in self.shards),
+                CorpusStats(),
+            )
+            for i, query in enumerate(shard_queries)
+            if query_np is None or query.mode != SearchMode.DENSE
+        }
+        shard_responses = list(
+            self._executor.map(
+                lambda shard: shard.search_embedded(
+                    shard_queries, shard_np, corpus=corpus
+                ),
+                self.shards,
+            )
+        )
+
+        total = self.count
+        merged = [
+            self._merge(query, [responses[i] for responses in shard_responses], total)
+            for i, query in enumerate(shard_queries)
+        ]
+        return [
+            merged[part[0]]
+            if len(part) == 1
+            else self._fuse(query, [merged[i] for i in part], total)
+            for query, part in zip(queries, parts)
+        ]
+
+    def _empty_responses(self, queries: list[SearchQuery]) -> list[SearchResponse]:
+        return [
+            SearchResponse(results=[], total_searched=0, query=query.query)
+            for query in queries
+        ]
+
+    def _merge(
+        self, query: SearchQuery, responses: list[SearchResponse], total: int
+    ) -> SearchResponse:
+        """Merge per-shard top-k lists into the global top-k."""
+        results = [result for response in responses for result in response.results]
+        results.sort(key=lambda result: result.score, reverse=True)
+        mode = responses[0].mode if responses else query.mode
+        return SearchResponse(
+            results=diversify(results, query, mode),
+            total_searched=total,
+            query=query.query,
+            mode=mode,
+        )
+
+    def _fuse(
+        self, query: SearchQuery, rankings: list[SearchResponse], total: int
+    ) -> SearchResponse:
+        """Reciprocal rank fusion of merged dense and lexical rankings."""
+        results = {}
+        keys: list[list[tuple]] = []
+        for response in rankings:
+            keys.append([])
+            for result in response.results:
+                key = (result.doc_id, result.metadata.get("chunk_index"))
+                results.setdefault(key, result)
+                keys[-1].append(key)
+
+        fused = [
+            results[key].model_copy(update={"score": round(score, 4)})
+            for key, score in reciprocal_rank_fusion(keys)
+        ]
+        return SearchResponse(
+            results=diversify(fused, query, SearchMode.HYBRID),
+            total_searched=total,
+            query=query.query,
+            mode=SearchMode.HYBRID,
+        )
+
+    def clear(self) -> None:
+        """Clear all shards."""
+        for shard in self.shards:
+            shard.clear()
+        logger.info("Cleared sharded vector store")
+
+    def save(self, path: Path) -> None:
+        """Save every shard plus a manifest recording the shard count."""
+        path.mkdir(parents=True, exist_ok=True)
+
+        list(
+            self._executor.map(
+                lambda item: item[1].save(self._shard_dir(path, item[0])),
+                enumerate(self.shards),
+            )
+        )
+        self._write_manifest(path)
+
+        logger.info(f"Saved {self.num_shards} shards to {path} ({self.count} vectors)")
+
+    def load(self, path: Path) -> None:
+        """Load shards from disk.
+
+        The shard count stored on disk wins over configuration: chunks
+        are placed by hash, so changing it requires re-ingesting.
+        """
+        manifest_file = path / MANIFEST_FILE
+        if not manifest_file.exists():
+            logger.warning(f"No existing sharded index found at {path}")
+            return
+
+        num_shards = json.loads(manifest_file.read_text())["num_shards"]
+        if num_shards != self.num_shards:
+            logger.warning(
+                f"Index has {num_shards} shards (configured: {self.num_shards}); "
+                "re-ingest to change the shard count"
+            )
+            self.num_shards = num_shards
+            self.shards = self._create_shards(num_shards)
+            self._executor.shutdown()
+            self._executor = ThreadPoolExecutor(
+                max_workers=num_shards, thread_name_prefix="faiss-shard"
+            )
+
+        list(
+            self._executor.map(
+                lambda item: item[1].load(self._shard_dir(path, item[0])),
+                enumerate(self.shards),
+            )
+        )
+
+        logger.info(f"Loaded {num_shards} shards from {path} ({self.count} vectors)")
+
+    @staticmethod
+    def _shard_dir(path: Path, shard_id: int) -> Path:
+        return path / f"shard_{shard_id:02d}"
+
+    def _write_manifest(self, path: Path) -> None:
+        path.mkdir(parents=True, exist_ok=True)
+        with atomic_path(path / MANIFEST_FILE) as tmp:
+            tmp.write_text(json.dumps({"num_shards": self.num_shards}))
+
+    def get_all_metadata(self) -> list[dict]:
+        """Get metadata for all stored chunks (O(n), see base class)."""
+        return [meta for shard in self.shards for meta in shard.get_all_metadata()]
@@ -0,0 +1,394 @@
+"""Versioned index snapshots with atomic publishing and hot reload."""
+
+import fcntl
+import os
+import re
+import shutil
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+from app.core import get_logger, settings
+from app.documents.memory.base import VectorStoreRepository
+from app.documents.memory.files import atomic_path
+from app.documents.memory.wal import WAL_FILE
+from app.documents.schemas import Chunk, SearchQuery, SearchResponse
+
+logger = get_logger(__name__)
+
+POINTER_FILE = "CURRENT"
+VERSIONS_DIR = "versions"
+LOCK_FILE = ".lock"
+RETIRED_MARKER = "RETIRED"
+
+# Files that mark a pre-versioning index saved directly in the root
+LEGACY_MARKERS = ("index.faiss", "shards.json")
+
+# Index artifacts cloned from such a root. The root also holds SQLite
+# sidecars and the embedding cache, which must not become part of a version.
+LEGACY_ARTIFACTS = frozenset(
+    {
+        "index.faiss",
+        "snapshot.json",
+        WAL_FILE,
+        "columns",
+        "filters",
+        "lexical",
+        "deleted.npy",
+        "vectors.npy",
+        "metadata.json",
+        "shards.json",
+    }
+)
+LEGACY_SHARD_DIR = re.compile(r"shard_\d+")
+
+
+# =============================================================================
+# Snapshot Directory
+# =============================================================================
+
+
+class SnapshotManager:
+    """Immutable index versions under one root directory.
+
+    Layout:
+        root/
+        ├── CURRENT          # Name of the published version
+        ├── .lock            # Serialises writers across processes
+        └── versions/
+            ├── v<ns>/       # One complete saved store per version
+            └── ...
+
+    Versions are never modified after they are published. Publishing
+    replaces CURRENT atomically, so readers see either the old or the new
+    version, never a mix.
+
+    A new version starts as a clone of its base: snapshot files are
+    hard-linked (they are only ever replaced by rename, never rewritten)
+    and write-ahead logs are copied, so small updates cost O(delta) I/O.
+    """
+
+    def __init__(self, root: Path):
+        self.root = root
+        self.versions_dir = root / VERSIONS_DIR
+        self.pointer = root / POINTER_FILE
+
+    def current(self) -> str | None:
+        """Name of the published version (None if nothing was published)."""
+        try:
+            return self.pointer.read_text().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def path_of(self, version: str | None) -> Path | None:
+        """Directory of a version.
+
+        With no published version, an index saved directly in the root
+        (before versioning) is used if present.
+        """
+        if version is not None:
+            return self.versions_dir / version
+        if any((self.root / marker).exists() for marker in LEGACY_MARKERS):
+            return self.root
+        return None
+
+    def pointer_stamp(self) -> tuple[int, int] | None:
+        """Cheap change detector for CURRENT (inode, mtime)."""
+        try:
+            stat = self.pointer.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns
+
+    def create_version(self, base: Path | None = None) -> tuple[str, Path]:
+        """Create the directory for a new version.
+
+        Args:
+            base: Version directory to clone (None for an empty version)
+
+        Returns:
+            Name and directory of the new version
+        """
+        name = f"v{time.time_ns()}"
+        path = self.versions_dir / name
+        path.mkdir(parents=True)
+        if base is not None:
+            self._clone(base, path)
+        return name, path
+
+    def _clone(self, source: Path, target: Path) -> None:
+        for item in source.iterdir():
+            if item.name.startswith(".") or item.name == RETIRED_MARKER:
+                continue
+            # A legacy index lives in the root next to the versions, the
+            # SQLite sidecars and the embedding cache: only its index
+            # artifacts are cloned
+            if source == self.root and not (
+                item.name in LEGACY_ARTIFACTS or LEGACY_SHARD_DIR.fullmatch(item.name)
+            ):
+                continue
+
+            dest = target / item.name
+            if item.is_dir():
+                dest.mkdir()
+                self._clone(item, dest)
+            elif item.name == WAL_FILE:
+                shutil.copyfile(item, dest)
+            else:
+                try:
+                    os.link(item, dest)
+                except OSError:
+                    shutil.copyfile(item, dest)
+
+    def publish(self, version: str) -> None:
+        """Atomically point CURRENT at a version and retire the previous one."""
+        previous = self.current()
+
+        with atomic_path(self.pointer) as tmp:
+            tmp.write_text(version)
+
+        if previous and previous != version:
+            (self.versions_dir / previous / RETIRED_MARKER).touch()
+        logger.info(f"Published index version {version}")
+
+    def discard(self, version: str) -> None:
+        """Delete an unpublished version."""
+        shutil.rmtree(self.versions_dir / version, ignore_errors=True)
+
+    def collect_garbage(self, grace_seconds: float) -> list[str]:
+        """Delete versions superseded more than grace_seconds ago.
+
+        The grace period lets workers finish loading (and serving from)
+        the previous version. Unpublished versions older than the grace
+        period are left-overs from crashed writers and are removed too.
+
+        Returns:
+            Names of deleted versions
+        """
+        if not self.versions_dir.exists():
+            return []
+
+        current = self.current()
+        cutoff = time.time() - grace_seconds
+        deleted = []
+        for path in self.versions_dir.iterdir():
+            if path.name == current:
+                continue
+            marker = path / RETIRED_MARKER
+            stamp = marker if marker.exists() else path
+            if stamp.stat().st_mtime <= cutoff:
+                shutil.rmtree(path, ignore_errors=True)
+                deleted.append(path.name)
+
+        if deleted:
+            logger.info(f"Deleted {len(deleted)} old index versions")
+        return deleted
+
+    @contextmanager
+    def lock(self) -> Iterator[None]:
+        """Exclusive writer lock, shared by all processes using this root."""
+        self.root.mkdir(parents=True, exist_ok=True)
+        with open(self.root / LOCK_FILE, "w") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+# =============================================================================
+# Versioned Store
+# =============================================================================
+
+
+class VersionedVectorStore(VectorStoreRepository):
+    """Serve a published index version; write by publishing new ones.
+
+    Reads go to the store loaded from the current version. Writes happen
+    in a transaction() on a private clone that is published atomically as
+    a new version, so searches never see a partial index. Writes append
+    to the clone's write-ahead log; once the log outgrows
+    FAISS_WAL_COMPACT_BYTES a background thread publishes a compacted
+    version.
+
+    Every process polls the version pointer (see poll()) and loads new
+    versions in a background thread. The swap is a single reference
+    assignment, so in-flight searches finish on the store they started
+    with.
+    """
+
+    def __init__(
+        self,
+        store_factory: Callable[[Path | None], VectorStoreRepository],
+        root: Path,
+        gc_grace_seconds: float | None = None,
+    ):
+        """Load the published version.
+
+        Args:
+            store_factory: Creates a store loaded from a version directory
+                (or an empty store for None)
+            root: Directory holding the versions
+            gc_grace_seconds: Keep superseded versions this long
+        """
+        self._factory = store_factory
+        self.snapshots = SnapshotManager(root)
+        self.gc_grace_seconds = (
+            settings.index_gc_grace_seconds
+            if gc_grace_seconds is None
+            else gc_grace_seconds
+        )
+
+        self._write_lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._reload_thread: threading.Thread | None = None
+        self._compaction_thread: threading.Thread | None = None
+
+        self._pointer_stamp = self.snapshots.pointer_stamp()
+        self.version = self.snapshots.current()
+        self._store = self._factory(self.snapshots.path_of(self.version))
+
+    @property
+    def store(self) -> VectorStoreRepository:
+        """Store for the currently loaded version."""
+        return self._store
+
+    # =========================================================================
+    # Hot Reload
+    # =========================================================================
+
+    def refresh(self) -> bool:
+        """Load the published version if it differs from the loaded one.
+
+        Returns:
+            True if a new version was swapped in
+        """
+        with self._reload_lock:
+            self._pointer_stamp = self.snapshots.pointer_stamp()
+            version = self.snapshots.current()
+            if version == self.version:
+                return False
+
+            store = self._factory(self.snapshots.path_of(version))
+            self._store, self.version = store, version
+
+        logger.info(f"Serving index version {version}")
+        return True
+
+    def poll(self) -> None:
+        """Start a background refresh if the version pointer changed.
+
+        Cheap enough to call on every request (one stat call); loading
+        happens off the request path.
+        """
+        if self.snapshots.pointer_stamp() == self._pointer_stamp:
+            return
+        if self._reload_thread is not None and self._reload_thread.is_alive():
+            return
+
+        self._reload_thread = threading.Thread(
+            target=self.refresh, name="index-reload", daemon=True
+        )
+        self._reload_thread.start()
+
+    # =========================================================================
+    # Writes
+    # =========================================================================
+
+    @contextmanager
+    def transaction(self) -> Iterator[VectorStoreRepository]:
+        """Apply writes to a clone of the current version and publish it.
+
+        The clone is published, swapped in for this process and picked up
+        by other processes on their next poll. If the block raises, the
+        new version is discarded.
+        """
+        with self._write_lock, self.snapshots.lock():
+            base = self.snapshots.path_of(self.snapshots.current())
+            name, path = self.snapshots.create_version(base)
+
+            try:
+                store = self._factory(path)
+                store.attach_wal(path)
+                yield store
+                store.flush()
+            except BaseException:
+                self.snapshots.discard(name)
+                raise
+
+            self.snapshots.publish(name)
+            self.refresh()
+            self.snapshots.collect_garbage(self.gc_grace_seconds)
+
+        if store.log_bytes > settings.faiss_wal_compact_bytes:
+            self._start_compaction()
+
+    def compact(self) -> None:
+        """Publish a version with the write-ahead log folded into a snapshot."""
+        with self.transaction() as store:
+            store.compact()
+
+    def _start_compaction(self) -> None:
+        if self._compaction_thread is not None and self._compaction_thread.is_alive():
+            return
+
+        self._compaction_thread = threading.Thread(
+            target=self.compact, name="index-compaction", daemon=True
+        )
+        self._compaction_thread.start()
+
+    def add_chunks(self, chunks: list[Chunk]) -> int:
+        """Add chunks by publishing a new version."""
+        with self.transaction() as store:
+            return store.add_chunks(chunks)
+
+    def upsert_document(self, doc_id: str, chunks: list[Chunk]) -> int:
+        """Replace a document by publishing a new version."""
+        with self.transaction() as store:
+            return store.upsert_document(doc_id, chunks)
+
+    def delete_document(self, doc_id: str) -> int:
+        """Delete a document by publishing a new version."""
+        with self.transaction() as store:
+            return store.delete_document(doc_id)
+
+    def clear(self) -> None:
+        """Publish an empty version."""
+        with self.transaction() as store:
+            store.clear()
+
+    def save(self, path: Path) -> None:
+        """No-op: versions are saved when a transaction commits."""
+        logger.debug("Versioned store saves on transaction commit")
+
+    def load(self, path: Path) -> None:
+        """Reload the published version (path is the versions root)."""
+        self.refresh()
+
+    # =========================================================================
+    # Reads (delegated to the current version)
+    # =========================================================================
+
+    @property
+    def count(self) -> int:
+        return self._store.count
+
+    def search(self, query: SearchQuery) -> SearchResponse:
+        return self._store.search(query)
+
+    def search_many(self, queries: list[SearchQuery]) -> list[SearchResponse]:
+        return self._store.search_many(queries)
+
+    async def acount(self) -> int:
+        return await self._store.acount()
+
+    async def asearch(self, query: SearchQuery) -> SearchResponse:
+        return await self._store.asearch(query)
+
+    async def asearch_many(self, queries: list[SearchQuery]) -> list[SearchResponse]:
+        return await self._store.asearch_many(queries)
+
+    def get_all_metadata(self) -> list[dict]:
+        return self._store.get_all_metadata()
@@ -0,0 +1,89 @@
+"""Full-precision vector storage kept beside a quantized index."""
+
+from pathlib import Path
+
+import numpy as np
+from numpy.lib.format import open_memmap
+
+from app.documents.memory.files import atomic_path, load_array
+
+# Rows copied per slice when saving (bounds the heap used by a save)
+SAVE_SLICE_ROWS = 65_536
+
+
+class VectorStorage:
+    """float32 vectors, one row per chunk, memory-mapped on load.
+
+    Quantized indexes only hold lossy codes; these vectors are used to
+    re-rank their candidates exactly and to rebuild the index without
+    compounding quantization error. Reads touch only the requested rows,
+    so the file stays on disk rather than in resident memory.
+
+    Rows appended since the last save (new chunks, WAL replay) are kept
+    in a separate in-memory buffer; the saved rows are never copied into
+    the heap, and the file is only rewritten by save().
+    """
+
+    def __init__(self, dim: int, array: np.ndarray | None = None):
+        self.dim = dim
+        self._stored = (
+            array if array is not None else np.empty((0, dim), dtype=np.float32)
+        )
+        self._batches: list[np.ndarray] = []
+        self._pending = np.empty((0, dim), dtype=np.float32)
+
+    def __len__(self) -> int:
+        return len(self._stored) + len(self._pending) + sum(map(len, self._batches))
+
+    @property
+    def stored(self) -> np.ndarray:
+        """Rows as of the last save or load (memory-mapped after load)."""
+        return self._stored
+
+    def append(self, vectors: np.ndarray) -> None:
+        """Append a (n, dim) batch of vectors."""
+        self._batches.append(np.asarray(vectors, dtype=np.float32))
+
+    def _appended(self) -> np.ndarray:
+        """Rows appended since the last save (packs buffered batches)."""
+        if self._batches:
+            self._pending = np.concatenate([self._pending, *self._batches])
+            self._batches = []
+        return self._pending
+
+    def get(self, ids: np.ndarray) -> np.ndarray:
+        """Vectors for specific row ids (any shape of integer array)."""
+        ids = np.asarray(ids)
+        appended = self._appended()
+        if not len(appended):
+            return self._stored[ids]
+
+        offset = len(self._stored)
+        flat = ids.ravel()
+        out = np.empty((len(flat), self.dim), dtype=np.float32)
+        on_disk = flat < offset
+        out[on_disk] = self._stored[flat[on_disk]]
+        out[~on_disk] = appended[flat[~on_disk] - offset]
+        return out.reshape(*ids.shape, self.dim)
+
+    __getitem__ = get
+
+    def save(self, file: Path) -> None:
+        """Write all rows as .npy, slice by slice, then map the new file."""
+        appended = self._appended()
+        count = len(self._stored) + len(appended)
+        with atomic_path(file) as tmp:
+            out = open_memmap(tmp, mode="w+", dtype=np.float32, shape=(count, self.dim))
+            for part, start in ((self._stored, 0), (appended, len(self._stored))):
+                for lo in range(0, len(part), SAVE_SLICE_ROWS):
+                    hi = min(lo + SAVE_SLICE_ROWS, len(part))
+                    out[start + lo : start + hi] = part[lo:hi]
+            out.flush()
+            del out
+        self._stored = load_array(file)
+        self._pending = np.empty((0, self.dim), dtype=np.float32)
+
+    @classmethod
+    def load(cls, file: Path, mmap: bool = True) -> "VectorStorage":
+        array = load_array(file, mmap)
+        return cls(array.shape[1], array)
@@ -0,0 +1,208 @@
+"""Append-only write-ahead log for FAISS store mutations."""
+
+import json
+import os
+import struct
+import zlib
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+from enum import Enum
+from pathlib import Path
+
+import numpy as np
+
+from app.core import get_logger
+
+logger = get_logger(__name__)
+
+WAL_FILE = "wal.log"
+
+# Record frame: sequence number, payload length, CRC32 of the payload
+FRAME = struct.Struct("<QII")
+# Payload prefix: length of the JSON header that precedes the array bytes
+HEADER_LENGTH = struct.Struct("<I")
+
+
+class WalOp(str, Enum):
+    """Logged mutation types."""
+
+    ADD = "add"  # Rows appended: metadata, content and vectors
+    DELETE = "delete"  # Rows tombstoned by row id
+    CLEAR = "clear"  # All rows dropped
+
+
+@dataclass
+class WalRecord:
+    """One logged mutation."""
+
+    seq: int
+    op: WalOp
+    metadatas: list[dict] = field(default_factory=list)
+    contents: list[str] = field(default_factory=list)
+    array: np.ndarray | None = None  # Vectors (ADD) or row ids (DELETE)
+
+
+# =============================================================================
+# Encoding
+# =============================================================================
+
+
+def _encode(record: WalRecord) -> bytes:
+    header: dict = {"op": record.op.value}
+    array_bytes = b""
+    if record.op == WalOp.ADD:
+        header["metadatas"] = record.metadatas
+        header["contents"] = record.contents
+    if record.array is not None:
+        header["dtype"] = record.array.dtype.str
+        header["shape"] = list(record.array.shape)
+        array_bytes = np.ascontiguousarray(record.array).tobytes()
+
+    header_bytes = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    payload = HEADER_LENGTH.pack(len(header_bytes)) + header_bytes + array_bytes
+    return FRAME.pack(record.seq, len(payload), zlib.crc32(payload)) + payload
+
+
+def _decode(seq: int, payload: bytes) -> WalRecord:
+    (header_length,) = HEADER_LENGTH.unpack_from(payload)
+    start = HEADER_LENGTH.size
+    header = json.loads(payload[start : start + header_length])
+
+    array = None
+    if "shape" in header:
+        array = np.frombuffer(
+            payload, dtype=np.dtype(header["dtype"]), offset=start + header_length
+        ).reshape(header["shape"])
+
+    return WalRecord(
+        seq=seq,
+        op=WalOp(header["op"]),
+        metadatas=header.get("metadatas", []),
+        contents=header.get("contents", []),
+        array=array,
+    )
+
+
+def _scan(path: Path) -> Iterator[tuple[int, WalRecord]]:
+    """Yield (end offset, record) for each intact record in order.
+
+    Stops at the first truncated or corrupt frame: a crash while
+    appending can only damage the tail of the log.
+    """
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return
+
+    with f:
+        offset = 0
+        while frame := f.read(FRAME.size):
+            if len(frame) < FRAME.size:
+                break
+            seq, length, crc = FRAME.unpack(frame)
+            payload = f.read(length)
+            if len(payload) < length or zlib.crc32(payload) != crc:
+                break
+            offset += FRAME.size + length
+            yield offset, _decode(seq, payload)
+
+
+def read_records(path: Path, after_seq: int = 0) -> Iterator[WalRecord]:
+    """Read intact records with a sequence number above after_seq."""
+    for _, record in _scan(path):
+        if record.seq > after_seq:
+            yield record
+
+
+# =============================================================================
+# Log
+# =============================================================================
+
+
+class WriteAheadLog:
+    """Append-only log of store mutations, fsynced per record.
+
+    Records are numbered with increasing sequence numbers. A snapshot
+    records the last sequence number it contains, so replaying a log over
+    a snapshot skips records that are already applied.
+
+    Only the writer of a store opens its log. Readers replay it with
+    read_records(), which stops at a damaged frame and leaves the file
+    as it is; the writer drops the damaged tail before appending. The
+    file itself is opened lazily on the first append.
+    """
+
+    def __init__(self, path: Path, last_seq: int = 0):
+        """Open a log, dropping a torn tail left by a crash.
+
+        Args:
+            path: Log file (created on first append)
+            last_seq: Last sequence number already in the snapshot
+        """
+        self.path = path
+        self.last_seq = last_seq
+        self._size = 0
+        self._file = None
+
+        for end, record in _scan(path):
+            self._size = end
+            self.last_seq = max(self.last_seq, record.seq)
+
+        if path.exists() and path.stat().st_size > self._size:
+            logger.warning(f"Truncating damaged tail of write-ahead log {path}")
+            with open(path, "r+b") as f:
+                f.truncate(self._size)
+
+    @property
+    def size(self) -> int:
+        """Bytes currently in the log."""
+        return self._size
+
+    def append_add(
+        self, metadatas: list[dict], contents: list[str], vectors: np.ndarray
+    ) -> int:
+        """Log appended rows.
+
+        Returns:
+            Sequence number of the record
+        """
+        return self._append(
+            WalRecord(0, WalOp.ADD, metadatas, contents, vectors.astype(np.float32))
+        )
+
+    def append_delete(self, rows: np.ndarray) -> int:
+        """Log tombstoned row ids."""
+        return self._append(WalRecord(0, WalOp.DELETE, array=rows.astype(np.int64)))
+
+    def append_clear(self) -> int:
+        """Log that all rows were dropped."""
+        return self._append(WalRecord(0, WalOp.CLEAR))
+
+    def _append(self, record: WalRecord) -> int:
+        record.seq = self.last_seq + 1
+        data = _encode(record)
+
+        if self._file is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.path, "ab")
+        self._file.write(data)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+        self.last_seq = record.seq
+        self._size += len(data)
+        return record.seq
+
+    def reset(self) -> None:
+        """Empty the log after a snapshot (sequence numbers continue)."""
+        self.close()
+        if self.path.exists():
+            with open(self.path, "r+b") as f:
+                f.truncate(0)
+                os.fsync(f.fileno())
+        self._size = 0
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -12,7 +12,10 @@ from app.core.schemas import (
     TaskInput,
     ToolCall,
 )
+from app.core.singleflight import SingleFlight
 from app.documents.memory import VectorStoreRepository
+from app.documents.memory.query_cache import normalize_query
+from app.documents.rewrite_cache import prompt_version, rewrite_cache, rewrite_key
 from app.documents.schemas import (
     RetrievalObservation,
     RetrievalResult,
@@ -36,6 +39,9 @@ DEFAULT_TOP_K = 5
 MAX_TOP_K = 10
 MIN_TOP_K = 1
 
+# Concurrent rewrites of the same query (any agent instance) share one call
+_rewrite_flights = SingleFlight("query_rewrite")
+
 
 # =============================================================================
 # Query Rewriting Prompts
@@ -66,6 +72,9 @@ Context: {context}
 
 Rewritten query:"""
 
+# Cached rewrites of other prompt versions are never used
+QUERY_REWRITE_VERSION = prompt_version(QUERY_REWRITE_SYSTEM, QUERY_REWRITE_USER)
+
 
 class RetrieverAgent(BaseAgent):
     """Agent responsible for knowledge retrieval via RAG.
@@ -138,9 +147,12 @@ class RetrieverAgent(BaseAgent):
         # Extract filters from context if provided
         filters = context.get("filters")
         top_k = context.get("top_k", DEFAULT_TOP_K)
+        mmr_lambda = context.get("mmr_lambda")
 
         # Perform retrieval
-        observation = self.retrieve(query, filters=filters, top_k=top_k)
+        observation = self.retrieve(
+            query, filters=filters, top_k=top_k, mmr_lambda=mmr_lambda
+        )
 
         # Return as a structured decision
         return AgentDecision(
@@ -155,6 +167,7 @@ class RetrieverAgent(BaseAgent):
                     "query": observation.rewritten_query,
                     "top_k": top_k,
                     "filters": filters,
+                    "mmr_lambda": mmr_lambda,
                 },
             ),
             message=None,
@@ -165,6 +178,7 @@ class RetrieverAgent(BaseAgent):
         query: str,
         filters: dict | None = None,
         top_k: int = DEFAULT_TOP_K,
+        mmr_lambda: float | None = None,
     ) -> RetrievalObservation:
         """Perform retrieval with query rewriting and context management.
 
@@ -172,6 +186,8 @@ class RetrieverAgent(BaseAgent):
             query: User's search query
             filters: Optional metadata filters
             top_k: Maximum number of results
+            mmr_lambda: Diversify results with MMR (1 = relevance only,
+                0 = diversity only); None keeps the plain ranking
 
         Returns:
             Structured retrieval observation
@@ -180,14 +196,18 @@ class RetrieverAgent(BaseAgent):
         top_k = max(MIN_TOP_K, min(MAX_TOP_K, top_k))
 
         # Step 1: Rewrite query for better retrieval
-        rewritten_query = self._rewrite_query(query, filters)
-        logger.info(f"Query rewritten: '{query}' -> '{rewritten_query}'")
+        rewritten_query, rewrite_cache_hit = self._rewrite(query, filters)
+        logger.info(
+            f"Query rewritten{' (cached)' if rewrite_cache_hit else ''}: "
+            f"'{query}' -> '{rewritten_query}'"
+        )
 
         # Step 2: Search vector store
         search_query = SearchQuery(
             query=rewritten_query,
             top_k=top_k,
             filters=filters,
+            mmr_lambda=mmr_lambda,
         )
         search_response = self.vector_store.search(search_query)
 
@@ -219,6 +239,7 @@ class RetrieverAgent(BaseAgent):
             total_results=len(retrieval_results),
             total_tokens=total_tokens,
             filters_applied=filters,
+            rewrite_cache_hit=rewrite_cache_hit,
         )
 
     def _rewrite_query(self, query: str, context: dict | None = None) -> str:
@@ -233,20 +254,43 @@ class RetrieverAgent(BaseAgent):
         Returns:
             Rewritten query optimized for retrieval
         """
+        return self._rewrite(query, context)[0]
+
+    def _rewrite(self, query: str, context: dict | None = None) -> tuple[str, bool]:
+        """_rewrite_query() through the rewrite cache.
+
+        Only successful rewrites are cached; a failed LLM call is retried
+        on the next retrieval.
+
+        Returns:
+            (rewritten query, whether it came from the cache)
+        """
         # Skip rewriting for very short queries or if it looks like
         # it's already a well-formed search query
         if len(query.split()) <= 2:
-            return query
+            return query, False
+
+        cache = rewrite_cache(QUERY_REWRITE_VERSION)
+        cache_key = rewrite_key(
+            str(self.llm.model_name), QUERY_REWRITE_VERSION, query, context
+        )
+        cached = cache.get(cache_key) if cache is not None else None
+        if cached is not None:
+            return cached, True
 
         try:
             context_str = str(context) if context else "None"
             user_prompt = QUERY_REWRITE_USER.format(query=query, context=context_str)
 
-            response = self.llm.invoke(
-                [
-                    {"role": "system", "content": QUERY_REWRITE_SYSTEM},
-                    {"role": "user", "content": user_prompt},
-                ]
+            key = (self.llm.model_name, normalize_query(query), context_str)
+            response = _rewrite_flights.do(
+                key,
+                lambda: self.llm.invoke(
+                    [
+                        {"role": "system", "content": QUERY_REWRITE_SYSTEM},
+                        {"role": "user", "content": user_prompt},
+                    ]
+                ),
             )
 
             content = response.content
@@ -254,13 +298,15 @@ class RetrieverAgent(BaseAgent):
 
             # Sanity check: rewritten query shouldn't be empty or too long
             if not rewritten or len(rewritten) > 500:
-                return query
+                return query, False
 
-            return rewritten
+            if cache is not None:
+                cache.put(cache_key, rewritten)
+            return rewritten, False
 
         except Exception as e:
             logger.warning(f"Query rewrite failed, using original: {e}")
-            return query
+            return query, False
 
     def _select_within_token_limit(
         self, results: list[SearchResult]
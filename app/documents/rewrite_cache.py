@@ -0,0 +1,199 @@
+"""Two-tier cache of LLM query rewrites for the retriever agent.
+
+Rewrites run at temperature 0, so the same query and filters always
+give the same rewrite and caching it is safe. Each rewrite skipped
+saves an LLM round-trip (0.5-2s) per retrieval.
+
+Entries are keyed on (model, prompt version, normalised query, filters)
+and held in an in-memory LRU, backed by .index/rewrite_cache.sqlite so
+they survive restarts and are shared by the workers of one host. The
+prompt version is a hash of the rewrite prompts: editing them changes
+the version. During a rolling deploy workers of both versions share the
+file, so entries of other versions are only deleted once they are older
+than REWRITE_CACHE_TTL.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass, replace
+from pathlib import Path
+
+from app.core import INDEX_PATH, get_logger, settings
+from app.documents.memory.query_cache import normalize_query
+
+logger = get_logger(__name__)
+
+DISK_PATH = INDEX_PATH / "rewrite_cache.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rewrites (
+    key            BLOB PRIMARY KEY,
+    prompt_version TEXT NOT NULL,
+    rewritten      TEXT NOT NULL,
+    created_at     REAL NOT NULL DEFAULT 0
+);
+"""
+
+
+@dataclass
+class RewriteCacheStats:
+    """Query rewrite cache counters."""
+
+    hits: int = 0
+    misses: int = 0
+    disk_hits: int = 0  # Hits served by the persistent tier (included in hits)
+
+
+def prompt_version(*prompts: str) -> str:
+    """Version of the rewrite prompts (changes whenever any of them does)."""
+    return hashlib.sha256("\0".join(prompts).encode("utf-8")).hexdigest()[:16]
+
+
+def rewrite_key(model: str, version: str, query: str, filters: dict | None) -> bytes:
+    """Cache key of the rewrite of a query with its filters."""
+    data = json.dumps(
+        [model, version, normalize_query(query), filters],
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.blake2b(data.encode("utf-8"), digest_size=16).digest()
+
+
+class RewriteCache:
+    """In-memory LRU of rewrites over an optional SQLite store."""
+
+    def __init__(
+        self,
+        max_entries: int,
+        version: str,
+        path: Path | None = None,
+        ttl: float | None = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        """Create the cache.
+
+        Args:
+            max_entries: Rewrites kept in memory (least recently used evicted)
+            version: Prompt version
+            path: SQLite file (None: memory only)
+            ttl: Seconds persisted entries of other versions are kept
+                (default: REWRITE_CACHE_TTL)
+            clock: Wall-clock time source (the file spans processes)
+        """
+        self.max_entries = max_entries
+        self.version = version
+        self.path = path
+        self.ttl = settings.rewrite_cache_ttl if ttl is None else ttl
+        self.stats = RewriteCacheStats()
+
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[bytes, str] = OrderedDict()
+        self._conn: sqlite3.Connection | None = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _disk(self) -> sqlite3.Connection | None:
+        if self.path is None:
+            return None
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(
+                self.path, check_same_thread=False, isolation_level=None
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(rewrites)")}
+            if "created_at" not in columns:  # File written before ages were kept
+                try:
+                    conn.execute(
+                        "ALTER TABLE rewrites "
+                        "ADD COLUMN created_at REAL NOT NULL DEFAULT 0"
+                    )
+                except sqlite3.OperationalError:
+                    pass  # Added by another worker meanwhile
+            # Other versions may still be served by workers of a rolling
+            # deploy, so only their old entries go
+            stale = conn.execute(
+                "DELETE FROM rewrites WHERE prompt_version != ? AND created_at < ?",
+                [self.version, self._clock() - self.ttl],
+            ).rowcount
+            if stale:
+                logger.info(f"Dropped {stale} cached rewrites of old prompts")
+            self._conn = conn
+        return self._conn
+
+    def _remember(self, key: bytes, rewritten: str) -> None:
+        self._entries[key] = rewritten
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, key: bytes) -> str | None:
+        """Cached rewrite, or None."""
+        with self._lock:
+            rewritten = self._entries.get(key)
+            if rewritten is not None:
+                self._entries.move_to_end(key)
+                self.stats.hits += 1
+                return rewritten
+
+            row = None
+            try:
+                conn = self._disk()
+                if conn is not None:
+                    row = conn.execute(
+                        "SELECT rewritten FROM rewrites WHERE key = ?", [key]
+                    ).fetchone()
+            except sqlite3.Error as e:
+                logger.warning(f"Rewrite cache {self.path} unreadable ({e})")
+            if row is None:
+                self.stats.misses += 1
+                return None
+            self._remember(key, row[0])
+            self.stats.hits += 1
+            self.stats.disk_hits += 1
+            return row[0]
+
+    def put(self, key: bytes, rewritten: str) -> None:
+        """Cache a rewrite."""
+        with self._lock:
+            self._remember(key, rewritten)
+            try:
+                conn = self._disk()
+                if conn is not None:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO rewrites VALUES (?, ?, ?, ?)",
+                        [key, self.version, rewritten, self._clock()],
+                    )
+            except sqlite3.Error as e:
+                logger.warning(f"Rewrite cache {self.path} not writable ({e})")
+
+    def snapshot(self) -> RewriteCacheStats:
+        """Copy of the counters."""
+        with self._lock:
+            return replace(self.stats)
+
+
+_caches: dict[str, RewriteCache] = {}
+_caches_lock = threading.Lock()
+
+
+def rewrite_cache(version: str) -> RewriteCache | None:
+    """The process-wide cache of a prompt version (None if caching is off)."""
+    if settings.rewrite_cache_size <= 0:
+        return None
+    with _caches_lock:
+        if version not in _caches:
+            _caches[version] = RewriteCache(
+                settings.rewrite_cache_size,
+                version,
+                DISK_PATH if settings.rewrite_cache_disk else None,
+            )
+        return _caches[version]
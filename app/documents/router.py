@@ -1,11 +1,29 @@
 """FastAPI router for document endpoints."""
 
-from fastapi import APIRouter, HTTPException
+from collections import defaultdict
+
+from fastapi import APIRouter, HTTPException, Query
 
 from app.core import INDEX_PATH, KNOWLEDGE_BASE_PATH, get_logger
 from app.documents.ingestion import IngestionPipeline
-from app.documents.memory import vector_store
-from app.documents.schemas import SearchQuery, SearchResponse
+from app.documents.memory import (
+    cache_stats,
+    document_hash,
+    document_registry,
+    vector_store,
+)
+from app.documents.schemas import (
+    BatchSearchRequest,
+    BatchSearchResponse,
+    Chunk,
+    DealOutcome,
+    DocType,
+    DocumentListResponse,
+    DocumentSort,
+    SearchQuery,
+    SearchResponse,
+    SortOrder,
+)
 
 logger = get_logger(__name__)
 
@@ -14,8 +32,19 @@ router = APIRouter()
 
 @router.post("/ingest")
 def ingest_documents():
-    """Ingest documents from the knowledge base into the vector store."""
-    vector_store.clear()
+    """Sync the knowledge base into the vector store.
+
+    Documents whose content hash matches the document registry are
+    skipped; the rest are upserted one at a time. Documents removed from
+    the knowledge base are deleted from the store. The result is
+    published as a new index version that all workers hot-swap to, and
+    the registry is committed after it.
+
+    Near-duplicate chunks are collapsed before embedding; the response
+    reports the embeddings and bytes that saved across the knowledge base.
+    Chunk texts embedded before are served from the embedding cache.
+    """
+    cache_before = cache_stats()
 
     # Run ingestion pipeline
     pipeline = IngestionPipeline(KNOWLEDGE_BASE_PATH)
@@ -27,52 +56,121 @@ def ingest_documents():
             detail=f"No documents found in {KNOWLEDGE_BASE_PATH}",
         )
 
-    # Add chunks to vector store
-    added = vector_store.add_chunks(chunks)
-    vector_store.save(INDEX_PATH)
+    # Group chunks by document
+    documents: dict[str, list[Chunk]] = defaultdict(list)
+    for chunk in chunks:
+        documents[chunk.metadata.doc_id].append(chunk)
+
+    # Writes go to a new index version, published when the inner block
+    # exits (searches keep using the current version until then); the
+    # registry commits only after the index was published
+    hashes = document_registry.hashes()
+    with (
+        document_registry.transaction() as registry,
+        vector_store.transaction() as store,
+    ):
+        # Documents that were indexed before but no longer exist on disk.
+        # Stores indexed before the registry existed are scanned once.
+        indexed_doc_ids = set(hashes) or {
+            meta["doc_id"] for meta in store.get_all_metadata()
+        }
+        removed_doc_ids = indexed_doc_ids - documents.keys()
+
+        added = updated = 0
+        for doc_id, doc_chunks in documents.items():
+            content_hash = document_hash(doc_chunks)
+            if hashes.get(doc_id) == content_hash:
+                continue
+
+            written = store.upsert_document(doc_id, doc_chunks)
+            registry.upsert(doc_id, doc_chunks, content_hash)
+            if written:
+                added += written
+                updated += 1
+
+        for doc_id in removed_doc_ids:
+            store.delete_document(doc_id)
+            registry.delete(doc_id)
 
-    logger.info(f"Ingested {added} chunks from {KNOWLEDGE_BASE_PATH}")
+        bytes_saved = pipeline.dedup_report.bytes_saved(store.embedding_dim)
+
+    cache = cache_stats() - cache_before
+    logger.info(
+        f"Ingested {added} chunks from {KNOWLEDGE_BASE_PATH} "
+        f"({updated} documents updated, {len(removed_doc_ids)} deleted; "
+        f"embedding cache {cache.hits} hits, {cache.misses} misses)"
+    )
 
     return {
         "status": "success",
         "chunks_ingested": added,
+        "documents_updated": updated,
+        "documents_unchanged": len(documents) - updated,
+        "documents_deleted": len(removed_doc_ids),
+        "embeddings_saved": pipeline.dedup_report.duplicates,
+        "bytes_saved": bytes_saved,
+        "embedding_cache_hits": cache.hits,
+        "embedding_cache_misses": cache.misses,
+        "tokens_saved": cache.tokens_saved,
         "index_path": str(INDEX_PATH),
     }
 
 
-@router.get("")
-def list_documents():
-    """List indexed documents with metadata."""
-    if vector_store.count == 0:
-        return {
-            "status": "empty",
-            "message": "No documents indexed. Run POST /documents/ingest first.",
-            "documents": [],
-        }
-
-    # Get unique documents from metadata
-    seen_docs = {}
-    for meta in vector_store.get_all_metadata():
-        doc_id = meta.get("doc_id")
-        if doc_id and doc_id not in seen_docs:
-            seen_docs[doc_id] = {
-                "doc_id": doc_id,
-                "doc_type": meta.get("doc_type"),
-                "source_file": meta.get("source_file"),
-                "industry": meta.get("industry"),
-            }
+@router.get("", response_model=DocumentListResponse)
+def list_documents(
+    doc_type: DocType | None = None,
+    industry: str | None = None,
+    outcome: DealOutcome | None = None,
+    sort: DocumentSort = DocumentSort.DOC_ID,
+    order: SortOrder = SortOrder.ASC,
+    limit: int = Query(default=50, ge=1, le=500),
+    offset: int = Query(default=0, ge=0),
+):
+    """List indexed documents from the document registry.
+
+    Filtering, sorting and paging run as indexed SQLite queries, so the
+    cost does not depend on the number of chunks in the vector store.
+    """
+    num_documents, total_chunks = document_registry.totals()
+    if num_documents == 0:
+        return DocumentListResponse(
+            status="empty",
+            message="No documents indexed. Run POST /documents/ingest first.",
+            total=0,
+            total_chunks=0,
+            limit=limit,
+            offset=offset,
+            documents=[],
+        )
 
-    return {
-        "status": "ok",
-        "total_chunks": vector_store.count,
-        "documents": list(seen_docs.values()),
+    filters = {
+        "doc_type": doc_type.value if doc_type else None,
+        "industry": industry,
+        "outcome": outcome.value if outcome else None,
     }
+    documents, total = document_registry.list_documents(
+        filters, sort, order, limit, offset
+    )
+
+    return DocumentListResponse(
+        status="ok",
+        total=total,
+        total_chunks=total_chunks,
+        limit=limit,
+        offset=offset,
+        documents=documents,
+    )
 
 
 @router.post("/search", response_model=SearchResponse)
-def search_documents(query: SearchQuery):
-    """Semantic search across the knowledge base."""
-    if vector_store.count == 0:
+async def search_documents(query: SearchQuery):
+    """Semantic search across the knowledge base.
+
+    Async end to end: embedding and (for Pinecone) query round-trips are
+    awaited instead of holding a threadpool thread.
+    """
+    _check_modes([query])
+    if await vector_store.acount() == 0:
         raise HTTPException(
             status_code=400,
             detail="Vector store is empty. Run POST /documents/ingest first.",
@@ -82,4 +180,28 @@ def search_documents(query: SearchQuery):
         f"Search: '{query.query}' (top_k={query.top_k}, filters={query.filters})"
     )
 
-    return vector_store.search(query)
+    return await vector_store.asearch(query)
+
+
+@router.post("/search/batch", response_model=BatchSearchResponse)
+async def search_documents_batch(request: BatchSearchRequest):
+    """Run several semantic searches with one embeddings call."""
+    _check_modes(request.queries)
+    if await vector_store.acount() == 0:
+        raise HTTPException(
+            status_code=400,
+            detail="Vector store is empty. Run POST /documents/ingest first.",
+        )
+
+    logger.info(f"Batch search: {len(request.queries)} queries")
+
+    responses = await vector_store.asearch_many(request.queries)
+    return BatchSearchResponse(responses=responses)
+
+
+def _check_modes(queries: list[SearchQuery]) -> None:
+    """Reject search modes the configured backend does not implement."""
+    try:
+        vector_store.check_modes(queries)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e)) from None
@@ -4,7 +4,9 @@ import datetime
 from enum import Enum
 from typing import Any
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr, model_validator
+
+from app.documents.filters import FilterNode, parse_filters
 
 # =============================================================================
 # Document Type Enums
@@ -87,15 +89,75 @@ class Chunk(BaseModel):
     metadata: DocumentMetadata
     chunk_index: int = Field(..., description="Index of chunk within document")
     total_chunks: int = Field(..., description="Total chunks in parent document")
+    duplicates: list[str] = Field(
+        default_factory=list,
+        description="chunk_ids of near-duplicate chunks collapsed into this one",
+    )
+
+    @property
+    def chunk_id(self) -> str:
+        """Stable chunk id ("{doc_id}#{chunk_index}"), prefixed by its doc_id."""
+        return f"{self.metadata.doc_id}#{self.chunk_index}"
 
     def to_dict(self) -> dict[str, Any]:
         """Convert to dict for vector store."""
         data = self.metadata.to_dict()
         data["chunk_index"] = self.chunk_index
         data["total_chunks"] = self.total_chunks
+        if self.duplicates:
+            data["duplicates"] = self.duplicates
         return data
 
 
+# =============================================================================
+# Document Registry Schemas
+# =============================================================================
+
+
+class DocumentSort(str, Enum):
+    """Sortable fields of GET /documents."""
+
+    DOC_ID = "doc_id"
+    DOC_TYPE = "doc_type"
+    INDUSTRY = "industry"
+    OUTCOME = "outcome"
+    DATE = "date"
+    CHUNK_COUNT = "chunk_count"
+    INDEXED_AT = "indexed_at"
+
+
+class SortOrder(str, Enum):
+    ASC = "asc"
+    DESC = "desc"
+
+
+class DocumentRecord(BaseModel):
+    """An indexed document as tracked by the document registry."""
+
+    doc_id: str
+    doc_type: str
+    industry: str | None = None
+    outcome: str | None = None
+    date: str | None = None
+    source_file: str
+    chunk_count: int = Field(..., description="Chunks stored for the document")
+    content_hash: str = Field(..., description="Hash of chunk contents + metadata")
+    indexed_at: datetime.datetime = Field(..., description="Last (re)index time")
+    metadata: dict[str, Any] = Field(..., description="Document metadata")
+
+
+class DocumentListResponse(BaseModel):
+    """A page of indexed documents."""
+
+    status: str = Field(..., description="'ok', or 'empty' if nothing is indexed")
+    message: str | None = None
+    total: int = Field(..., description="Documents matching the filters")
+    total_chunks: int = Field(..., description="Chunks across all documents")
+    limit: int
+    offset: int
+    documents: list[DocumentRecord]
+
+
 # =============================================================================
 # Search Schemas
 # =============================================================================
@@ -105,8 +167,19 @@ class SearchResult(BaseModel):
     """A single search result from the vector store."""
 
     content: str = Field(..., description="Chunk content")
-    score: float = Field(..., description="Similarity score (0-1)")
+    score: float = Field(
+        ...,
+        description=(
+            "Relevance score: cosine similarity (dense), BM25 (lexical) "
+            "or reciprocal rank fusion (hybrid)"
+        ),
+    )
     metadata: dict[str, Any] = Field(..., description="Document metadata")
+    embedding: list[float] | None = Field(
+        default=None,
+        exclude=True,
+        description="Chunk embedding (set for MMR candidates, never serialised)",
+    )
 
     @property
     def doc_id(self) -> str:
@@ -121,6 +194,14 @@ class SearchResult(BaseModel):
         return self.metadata.get("source_file", "unknown")
 
 
+class SearchMode(str, Enum):
+    """How a search ranks chunks."""
+
+    DENSE = "dense"  # Embedding similarity
+    LEXICAL = "lexical"  # BM25 keyword match (no embeddings call)
+    HYBRID = "hybrid"  # Both, fused by reciprocal rank
+
+
 class SearchQuery(BaseModel):
     """Query for semantic search."""
 
@@ -128,9 +209,46 @@ class SearchQuery(BaseModel):
     top_k: int = Field(default=5, ge=1, le=20, description="Number of results")
     filters: dict[str, Any] | None = Field(
         default=None,
-        description="Metadata filters (e.g., {'doc_type': 'deal', 'industry': 'healthcare'})",
+        description=(
+            "Metadata filters: exact matches such as {'doc_type': 'deal'}, "
+            "or operators $eq, $ne, $in, $nin, $gt, $gte, $lt, $lte "
+            "combined with $and / $or"
+        ),
+    )
+
+    mode: SearchMode = Field(
+        default=SearchMode.DENSE,
+        description="Ranking: dense (embeddings), lexical (BM25) or hybrid",
+    )
+
+    mmr_lambda: float | None = Field(
+        default=None,
+        ge=0,
+        le=1,
+        description=(
+            "Diversify results with Maximal Marginal Relevance "
+            "(1 = relevance only, 0 = diversity only; unset = off)"
+        ),
+    )
+    fetch_k: int | None = Field(
+        default=None,
+        ge=1,
+        le=200,
+        description="Candidates MMR chooses from (default: MMR_FETCH_K)",
     )
 
+    _compiled_filters: FilterNode | None = PrivateAttr(default=None)
+
+    @model_validator(mode="after")
+    def _compile_filters(self) -> "SearchQuery":
+        self._compiled_filters = parse_filters(self.filters) if self.filters else None
+        return self
+
+    @property
+    def compiled_filters(self) -> FilterNode | None:
+        """Filters validated and compiled once, when the query is built."""
+        return self._compiled_filters
+
 
 class SearchResponse(BaseModel):
     """Response from semantic search."""
@@ -138,6 +256,22 @@ class SearchResponse(BaseModel):
     results: list[SearchResult]
     total_searched: int = Field(..., description="Total documents in index")
     query: str
+    mode: SearchMode = Field(
+        default=SearchMode.DENSE,
+        description="Ranking used (lexical when the embeddings call failed)",
+    )
+
+
+class BatchSearchRequest(BaseModel):
+    """Several search queries answered in one call."""
+
+    queries: list[SearchQuery] = Field(..., min_length=1, max_length=50)
+
+
+class BatchSearchResponse(BaseModel):
+    """Responses to a batch search, in query order."""
+
+    responses: list[SearchResponse]
 
 
 # =============================================================================
@@ -149,7 +283,13 @@ class RetrievalResult(BaseModel):
     """A single retrieval result with source tracking."""
 
     content: str = Field(..., description="Retrieved text content")
-    score: float = Field(..., description="Similarity score (0-1)")
+    score: float = Field(
+        ...,
+        description=(
+            "Relevance score: cosine similarity (dense), BM25 (lexical) "
+            "or reciprocal rank fusion (hybrid)"
+        ),
+    )
     doc_id: str = Field(..., description="Source document ID")
     doc_type: str = Field(..., description="Type of document")
     source_file: str = Field(..., description="Original file path")
@@ -177,3 +317,6 @@ class RetrievalObservation(BaseModel):
     total_results: int = Field(default=0)
     total_tokens: int = Field(default=0, description="Tokens in retrieved content")
     filters_applied: dict | None = Field(default=None)
+    rewrite_cache_hit: bool = Field(
+        default=False, description="Rewritten query came from the rewrite cache"
+    )
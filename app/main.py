@@ -1,10 +1,12 @@
 """FastAPI application for the Deal Intelligence Platform."""
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 
 from app.briefings.router import router as briefings_router
 from app.core import get_logger, settings, setup_logging
-from app.documents.memory import vector_store
+from app.core.singleflight import singleflight_stats
+from app.documents.memory import query_cache_stats, vector_store
+from app.documents.memory.snapshots import VersionedVectorStore
 from app.documents.router import router as documents_router
 
 # Initialize logging from config
@@ -17,6 +19,23 @@ app = FastAPI(
     version="0.2.0",
 )
 
+# =============================================================================
+# Middleware
+# =============================================================================
+
+
+@app.middleware("http")
+async def reload_index_version(request: Request, call_next):
+    """Pick up index versions published by other workers.
+
+    Checks the version pointer (one stat call) and loads a new version in
+    the background; requests are never blocked on a reload.
+    """
+    if isinstance(vector_store, VersionedVectorStore):
+        vector_store.poll()
+    return await call_next(request)
+
+
 # =============================================================================
 # Feature Routers
 # =============================================================================
@@ -46,6 +65,10 @@ def status():
         },
         "vector_store": {
             "document_count": vector_store.count,
+            "query_cache": query_cache_stats().to_dict(),
+        },
+        "singleflight": {
+            name: stats.to_dict() for name, stats in singleflight_stats().items()
         },
         "features": {
             "documents": "active",
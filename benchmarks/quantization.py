@@ -0,0 +1,198 @@
+"""Compare quantized FAISS indexes against the flat float32 baseline.
+
+Builds each index layout on a synthetic, clustered corpus of unit
+vectors (shaped like text embeddings) and reports memory per vector,
+recall@k against exact search and per-query latency, with and without
+exact re-ranking.
+
+Usage:
+    uv run python -m benchmarks.quantization --vectors 50000 --dim 1536
+"""
+
+import argparse
+import json
+import time
+from dataclasses import asdict, dataclass
+
+import faiss
+import numpy as np
+
+from app.documents.memory.faiss_index import (
+    IndexType,
+    Quantization,
+    build_index,
+    rerank_exact,
+    search_params,
+    train_index,
+)
+
+
+@dataclass
+class Result:
+    """Measurements for one index configuration."""
+
+    index_type: str
+    quantization: str
+    rerank_factor: int
+    bytes_per_vector: float
+    compression: float
+    build_seconds: float
+    recall_at_k: float
+    latency_p50_ms: float
+    latency_p99_ms: float
+
+
+# =============================================================================
+# Data
+# =============================================================================
+
+
+def make_corpus(
+    num_vectors: int, num_queries: int, dim: int, seed: int = 0
+) -> tuple[np.ndarray, np.ndarray]:
+    """Clustered unit vectors plus queries drawn near corpus points."""
+    rng = np.random.default_rng(seed)
+    num_clusters = max(1, num_vectors // 500)
+    centers = rng.standard_normal((num_clusters, dim)).astype(np.float32)
+    labels = rng.integers(num_clusters, size=num_vectors)
+    corpus = centers[labels] + rng.standard_normal((num_vectors, dim)).astype(
+        np.float32
+    )
+    corpus /= np.linalg.norm(corpus, axis=1, keepdims=True)
+
+    picks = rng.integers(num_vectors, size=num_queries)
+    queries = corpus[picks] + 0.5 * rng.standard_normal((num_queries, dim)).astype(
+        np.float32
+    )
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    return corpus, queries
+
+
+# =============================================================================
+# Measurement
+# =============================================================================
+
+
+def run_config(
+    corpus: np.ndarray,
+    queries: np.ndarray,
+    truth: np.ndarray,
+    index_type: IndexType,
+    quantization: Quantization,
+    rerank_factors: list[int],
+    top_k: int,
+    nprobe: int,
+    ef_search: int,
+) -> list[Result]:
+    """Build one index and measure it for each re-rank factor."""
+    num_vectors, dim = corpus.shape
+
+    start = time.perf_counter()
+    index = build_index(index_type, dim, num_vectors, quantization=quantization)
+    train_index(index, corpus)
+    index.add_with_ids(corpus, np.arange(num_vectors))  # type: ignore[call-arg]
+    build_seconds = time.perf_counter() - start
+
+    bytes_per_vector = faiss.serialize_index(index).nbytes / num_vectors
+    params = search_params(index, nprobe, ef_search)
+
+    results = []
+    factors = rerank_factors if quantization != Quantization.NONE else [0]
+    for factor in factors:
+        fetch_k = top_k * factor if factor else top_k
+        latencies = []
+        found = np.empty((len(queries), top_k), dtype=np.int64)
+
+        for i, query in enumerate(queries):
+            query_np = query[None, :]
+            start = time.perf_counter()
+            scores, ids = index.search(  # type: ignore[call-arg]
+                query_np, fetch_k, params=params
+            )
+            if factor:
+                scores, ids = rerank_exact(query_np, ids, corpus, top_k)
+            latencies.append(time.perf_counter() - start)
+            found[i] = ids[0, :top_k]
+
+        recall = np.mean(
+            [len(np.intersect1d(f, t)) / top_k for f, t in zip(found, truth)]
+        )
+        latencies_ms = np.array(latencies) * 1000
+        results.append(
+            Result(
+                index_type=index_type.value,
+                quantization=quantization.value,
+                rerank_factor=factor,
+                bytes_per_vector=round(bytes_per_vector, 1),
+                compression=round(4 * dim / bytes_per_vector, 1),
+                build_seconds=round(build_seconds, 2),
+                recall_at_k=round(float(recall), 4),
+                latency_p50_ms=round(float(np.percentile(latencies_ms, 50)), 3),
+                latency_p99_ms=round(float(np.percentile(latencies_ms, 99)), 3),
+            )
+        )
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--vectors", type=int, default=50_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument(
+        "--index-type",
+        choices=[t.value for t in IndexType if t != IndexType.AUTO],
+        default=IndexType.FLAT.value,
+    )
+    parser.add_argument("--rerank-factors", type=int, nargs="+", default=[0, 4])
+    parser.add_argument("--nprobe", type=int, default=16)
+    parser.add_argument("--ef-search", type=int, default=64)
+    parser.add_argument("--json", action="store_true", help="Print JSON results")
+    args = parser.parse_args()
+
+    corpus, queries = make_corpus(args.vectors, args.queries, args.dim)
+
+    # Ground truth: exact inner-product search
+    exact = faiss.IndexFlatIP(args.dim)
+    exact.add(corpus)  # type: ignore[call-arg]
+    _, truth = exact.search(queries, args.top_k)  # type: ignore[call-arg]
+
+    results: list[Result] = []
+    for quantization in Quantization:
+        results += run_config(
+            corpus,
+            queries,
+            truth,
+            IndexType(args.index_type),
+            quantization,
+            args.rerank_factors,
+            args.top_k,
+            args.nprobe,
+            args.ef_search,
+        )
+
+    if args.json:
+        print(json.dumps([asdict(r) for r in results], indent=2))
+        return
+
+    print(
+        f"{args.vectors} vectors x {args.dim} dims, {args.queries} queries, "
+        f"recall@{args.top_k} vs exact search\n"
+    )
+    header = (
+        f"{'index':<6} {'quant':<5} {'rerank':>6} {'B/vec':>8} {'ratio':>6} "
+        f"{'build s':>8} {'recall':>7} {'p50 ms':>8} {'p99 ms':>8}"
+    )
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(
+            f"{r.index_type:<6} {r.quantization:<5} {r.rerank_factor:>6} "
+            f"{r.bytes_per_vector:>8} {r.compression:>6} {r.build_seconds:>8} "
+            f"{r.recall_at_k:>7} {r.latency_p50_ms:>8} {r.latency_p99_ms:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
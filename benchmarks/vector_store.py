@@ -0,0 +1,553 @@
+"""Recall/latency benchmark for the vector store backends.
+
+Builds each store on a synthetic corpus of unit vectors with realistic
+chunk metadata and measures it against exact search: recall@k for
+unfiltered and filtered queries, single-query latency percentiles and
+QPS, batched QPS, build time, resident memory and on-disk size.
+Embeddings are looked up from the generated vectors, so no OpenAI calls
+are made.
+
+Results can be saved as JSON (tagged with the git commit) and compared
+with an earlier run; the comparison exits with status 1 on a regression.
+
+Usage:
+    uv run python -m benchmarks.vector_store --vectors 100000 --dim 384
+    uv run python -m benchmarks.vector_store --output bench.json \\
+        --baseline main.json
+"""
+
+import argparse
+import datetime
+import gc
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any
+
+import faiss
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from app.core import settings
+from app.documents.memory.base import VectorStoreRepository
+from app.documents.schemas import (
+    Chunk,
+    CompanySize,
+    DealOutcome,
+    DocType,
+    DocumentMetadata,
+    SearchQuery,
+)
+from benchmarks.quantization import make_corpus
+
+CHUNKS_PER_DOC = 4
+BATCH_SIZE = 50  # Max queries per POST /documents/search/batch
+
+INDUSTRIES = [
+    "fintech",
+    "saas",
+    "healthcare",
+    "retail",
+    "manufacturing",
+    "logistics",
+    "media",
+    "education",
+]
+TAGS = [
+    "pricing",
+    "security",
+    "integration",
+    "onboarding",
+    "renewal",
+    "competitor",
+    "compliance",
+    "expansion",
+]
+
+# Store configurations: name -> (backend, constructor options)
+BACKENDS: dict[str, tuple[str, dict[str, Any]]] = {
+    "faiss-flat": ("faiss", {"index_type": "flat"}),
+    "faiss-hnsw": ("faiss", {"index_type": "hnsw"}),
+    "faiss-ivf": ("faiss", {"index_type": "ivf"}),
+    "faiss-ivf-sq8": ("faiss", {"index_type": "ivf", "quantization": "sq8"}),
+    "faiss-hnsw-pq": ("faiss", {"index_type": "hnsw", "quantization": "pq"}),
+    "faiss-hnsw-truncated": ("faiss", {"index_type": "hnsw", "truncate": True}),
+    "faiss-sharded-flat": ("faiss_sharded", {"index_type": "flat"}),
+    "pinecone": ("pinecone", {}),
+}
+DEFAULT_BACKENDS = [name for name in BACKENDS if name != "pinecone"]
+
+
+@dataclass
+class Result:
+    """Measurements for one store configuration and query scenario."""
+
+    backend: str
+    scenario: str  # unfiltered, or filtered on industry
+    vectors: int
+    dim: int
+    recall_at_k: float
+    qps: float
+    batch_qps: float
+    latency_p50_ms: float
+    latency_p95_ms: float
+    latency_p99_ms: float
+    build_seconds: float
+    memory_mb: float | None  # Resident memory added by building the store
+    disk_mb: float | None  # Saved index size (None for remote stores)
+
+
+# =============================================================================
+# Data
+# =============================================================================
+
+
+def make_vectors(
+    distribution: str, num_vectors: int, num_queries: int, dim: int, seed: int = 0
+) -> tuple[np.ndarray, np.ndarray]:
+    """Corpus and query unit vectors, clustered or uniformly random."""
+    if distribution == "clustered":
+        return make_corpus(num_vectors, num_queries, dim, seed)
+
+    rng = np.random.default_rng(seed)
+    corpus = rng.standard_normal((num_vectors, dim), dtype=np.float32)
+    corpus /= np.linalg.norm(corpus, axis=1, keepdims=True)
+    # Queries near corpus points, so nearest neighbours are meaningful
+    picks = rng.integers(num_vectors, size=num_queries)
+    queries = corpus[picks] + 0.5 * rng.standard_normal(
+        (num_queries, dim), dtype=np.float32
+    )
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    return corpus, queries
+
+
+def make_chunks(num_vectors: int, seed: int = 0) -> tuple[list[Chunk], np.ndarray]:
+    """Chunks with document-level metadata, CHUNKS_PER_DOC per document.
+
+    Industries follow a skewed distribution, so industry filters range
+    from broad to selective.
+
+    Returns:
+        (chunks, industry index of each chunk)
+    """
+    rng = np.random.default_rng(seed)
+    num_docs = -(-num_vectors // CHUNKS_PER_DOC)
+    weights = 1 / np.arange(1, len(INDUSTRIES) + 1)
+    industries = rng.choice(len(INDUSTRIES), size=num_docs, p=weights / weights.sum())
+    doc_types = list(DocType)
+    sizes = list(CompanySize)
+    outcomes = list(DealOutcome)
+    start = datetime.date(2022, 1, 1)
+    words = [f"term{i}" for i in range(2000)]
+
+    chunks = []
+    for doc in range(num_docs):
+        metadata = DocumentMetadata(
+            doc_id=f"doc_{doc:07d}",
+            doc_type=doc_types[rng.integers(len(doc_types))],
+            industry=INDUSTRIES[industries[doc]],
+            company_size=sizes[rng.integers(len(sizes))],
+            deal_value=int(rng.lognormal(11, 1)),
+            outcome=outcomes[rng.integers(len(outcomes))],
+            date=start + datetime.timedelta(days=int(rng.integers(1400))),
+            tags=list(rng.choice(TAGS, size=rng.integers(1, 4), replace=False)),
+            source_file=f"synthetic/doc_{doc:07d}.md",
+        )
+        count = min(CHUNKS_PER_DOC, num_vectors - doc * CHUNKS_PER_DOC)
+        for index in range(count):
+            text = " ".join(words[i] for i in rng.integers(len(words), size=40))
+            chunks.append(
+                Chunk(
+                    content=f"{metadata.doc_id} chunk {index}: {text}",
+                    metadata=metadata,
+                    chunk_index=index,
+                    total_chunks=count,
+                )
+            )
+    return chunks, np.repeat(industries, CHUNKS_PER_DOC)[:num_vectors]
+
+
+class LookupEmbeddings(Embeddings):
+    """Embeddings served from precomputed vectors, keyed by text."""
+
+    def __init__(self, texts: list[str], vectors: np.ndarray):
+        self.rows = {text: i for i, text in enumerate(texts)}
+        self.vectors = vectors
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self.vectors[[self.rows[text] for text in texts]].tolist()
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.vectors[self.rows[text]].tolist()
+
+
+def row_of(metadata: dict) -> int:
+    """Corpus row of a search result."""
+    doc = int(metadata["doc_id"].removeprefix("doc_"))
+    return doc * CHUNKS_PER_DOC + metadata["chunk_index"]
+
+
+def exact_search(
+    corpus: np.ndarray, queries: np.ndarray, top_k: int, rows: np.ndarray | None = None
+) -> np.ndarray:
+    """Ground truth: exact inner-product search, optionally within rows."""
+    index = faiss.IndexFlatIP(corpus.shape[1])
+    index.add(corpus if rows is None else corpus[rows])  # type: ignore[call-arg]
+    _, ids = index.search(queries, top_k)  # type: ignore[call-arg]
+    return ids if rows is None else np.where(ids >= 0, rows[ids], -1)
+
+
+# =============================================================================
+# Measurement
+# =============================================================================
+
+
+def rss_bytes() -> int | None:
+    """Resident memory of this process (Linux only)."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+def directory_bytes(path: Path) -> int:
+    return sum(file.stat().st_size for file in path.rglob("*") if file.is_file())
+
+
+def create_store(
+    name: str, embeddings: Embeddings, dim: int, args: argparse.Namespace
+) -> VectorStoreRepository:
+    backend, options = BACKENDS[name]
+    options = dict(options, wal=False)
+    if options.pop("truncate", False):
+        options["truncate_dim"] = args.truncate_dim or dim // 4
+
+    if backend == "faiss":
+        from app.documents.memory.faiss_store import FAISSVectorStore
+
+        return FAISSVectorStore(embedding_dim=dim, embeddings=embeddings, **options)
+
+    if backend == "faiss_sharded":
+        from app.documents.memory.sharded_store import ShardedFAISSVectorStore
+
+        return ShardedFAISSVectorStore(
+            num_shards=args.shards, embedding_dim=dim, embeddings=embeddings, **options
+        )
+
+    from app.documents.memory.pinecone_store import PineconeVectorStore
+
+    # Never the application's index: the benchmark clears it
+    settings.pinecone_index_name = args.pinecone_index
+    content_path = Path(tempfile.mkdtemp()) / "content.sqlite"
+    return PineconeVectorStore(content_path=content_path, embeddings=embeddings)
+
+
+def build(
+    store: VectorStoreRepository, chunks: list[Chunk], corpus: np.ndarray
+) -> float:
+    """Add the corpus to a store, returning the seconds it took."""
+    start = time.perf_counter()
+    add_embedded = getattr(store, "add_embedded_chunks", None)
+    if add_embedded is not None:
+        add_embedded(chunks, corpus)
+    else:
+        store.clear()
+        store.add_chunks(chunks)
+        # Pinecone is eventually consistent: wait until every vector is served
+        while store.count < len(chunks):
+            time.sleep(1)
+    return time.perf_counter() - start
+
+
+def measure(
+    store: VectorStoreRepository,
+    queries: list[SearchQuery],
+    truth: np.ndarray,
+    warmup: int,
+) -> dict[str, float]:
+    """Recall, latency percentiles and QPS of a store for queries."""
+    for query in queries[:warmup]:
+        store.search(query)
+
+    latencies = []
+    recalls = []
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        response = store.search(query)
+        latencies.append(time.perf_counter() - start)
+
+        found = [row_of(result.metadata) for result in response.results]
+        expected = expected[expected >= 0]
+        if len(expected):
+            recalls.append(len(np.intersect1d(found, expected)) / len(expected))
+
+    start = time.perf_counter()
+    for i in range(0, len(queries), BATCH_SIZE):
+        store.search_many(queries[i : i + BATCH_SIZE])
+    batch_seconds = time.perf_counter() - start
+
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        "recall_at_k": round(float(np.mean(recalls)), 4),
+        "qps": round(len(queries) / sum(latencies), 1),
+        "batch_qps": round(len(queries) / batch_seconds, 1),
+        "latency_p50_ms": round(float(np.percentile(latencies_ms, 50)), 3),
+        "latency_p95_ms": round(float(np.percentile(latencies_ms, 95)), 3),
+        "latency_p99_ms": round(float(np.percentile(latencies_ms, 99)), 3),
+    }
+
+
+def run_backend(
+    name: str,
+    chunks: list[Chunk],
+    corpus: np.ndarray,
+    scenarios: dict[str, tuple[list[SearchQuery], np.ndarray]],
+    embeddings: Embeddings,
+    args: argparse.Namespace,
+) -> list[Result]:
+    """Build one store configuration and measure every scenario."""
+    gc.collect()
+    rss_before = rss_bytes()
+    store = create_store(name, embeddings, corpus.shape[1], args)
+    build_seconds = build(store, chunks, corpus)
+    rss_after = rss_bytes()
+    memory_mb = None
+    if rss_before is not None and rss_after is not None:
+        memory_mb = round((rss_after - rss_before) / 2**20, 1)
+
+    disk_mb = None
+    if BACKENDS[name][0] != "pinecone":
+        with tempfile.TemporaryDirectory() as tmp:
+            store.save(Path(tmp))
+            disk_mb = round(directory_bytes(Path(tmp)) / 2**20, 1)
+
+    results = []
+    for scenario, (queries, truth) in scenarios.items():
+        results.append(
+            Result(
+                backend=name,
+                scenario=scenario,
+                vectors=len(corpus),
+                dim=corpus.shape[1],
+                build_seconds=round(build_seconds, 2),
+                memory_mb=memory_mb,
+                disk_mb=disk_mb,
+                **measure(store, queries, truth, args.warmup),
+            )
+        )
+
+    if BACKENDS[name][0] == "pinecone":
+        store.clear()
+    return results
+
+
+def run_isolated(fn, *args):
+    """Call fn in a forked child, so each store's memory is measured alone.
+
+    In one process, a store reuses pages freed by the previous one and
+    its resident memory growth is understated. Without fork (macOS,
+    Windows) fn runs in this process.
+    """
+    if "fork" not in multiprocessing.get_all_start_methods():
+        return fn(*args)
+    context = multiprocessing.get_context("fork")
+    receiver, sender = context.Pipe(duplex=False)
+    child = context.Process(target=lambda: sender.send(fn(*args)))
+    child.start()
+    sender.close()
+    try:
+        return receiver.recv()
+    except EOFError:
+        raise RuntimeError(f"Benchmark process exited with {child.exitcode}")
+    finally:
+        child.join()
+
+
+# =============================================================================
+# Reporting
+# =============================================================================
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_table(results: list[Result], top_k: int) -> None:
+    header = (
+        f"{'backend':<22} {'scenario':<10} {f'recall@{top_k}':>9} {'QPS':>8} "
+        f"{'batch QPS':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+        f"{'build s':>8} {'mem MB':>7} {'disk MB':>7}"
+    )
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(
+            f"{r.backend:<22} {r.scenario:<10} {r.recall_at_k:>9} {r.qps:>8} "
+            f"{r.batch_qps:>9} {r.latency_p50_ms:>8} {r.latency_p95_ms:>8} "
+            f"{r.latency_p99_ms:>8} {r.build_seconds:>8} "
+            f"{r.memory_mb if r.memory_mb is not None else '-':>7} "
+            f"{r.disk_mb if r.disk_mb is not None else '-':>7}"
+        )
+
+
+def compare(
+    results: list[Result],
+    baseline: dict,
+    max_recall_drop: float,
+    max_latency_increase: float,
+) -> list[str]:
+    """Regressions against a baseline run, as human-readable lines."""
+    previous = {(r["backend"], r["scenario"]): r for r in baseline["results"]}
+    regressions = []
+    for r in results:
+        old = previous.get((r.backend, r.scenario))
+        if old is None:
+            continue
+        label = f"{r.backend}/{r.scenario}"
+        if r.recall_at_k < old["recall_at_k"] - max_recall_drop:
+            regressions.append(
+                f"{label}: recall {old['recall_at_k']} -> {r.recall_at_k}"
+            )
+        if r.latency_p95_ms > old["latency_p95_ms"] * (1 + max_latency_increase):
+            regressions.append(
+                f"{label}: p95 {old['latency_p95_ms']} ms -> {r.latency_p95_ms} ms"
+            )
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--vectors", type=int, default=10_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument(
+        "--distribution", choices=["clustered", "random"], default="clustered"
+    )
+    parser.add_argument(
+        "--backends", nargs="+", choices=list(BACKENDS), default=DEFAULT_BACKENDS
+    )
+    parser.add_argument("--shards", type=int, default=4)
+    parser.add_argument(
+        "--truncate-dim", type=int, default=0, help="First-pass dims (default dim/4)"
+    )
+    parser.add_argument(
+        "--pinecone-index",
+        help="Scratch Pinecone index (1536 dims) for the pinecone backend; "
+        "it is cleared before and after the run",
+    )
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="Write JSON results here")
+    parser.add_argument("--baseline", type=Path, help="JSON results to compare to")
+    parser.add_argument("--max-recall-drop", type=float, default=0.01)
+    parser.add_argument(
+        "--max-latency-increase",
+        type=float,
+        default=0.25,
+        help="Allowed relative p95 increase over the baseline",
+    )
+    args = parser.parse_args()
+
+    if "pinecone" in args.backends:
+        if not args.pinecone_index:
+            parser.error("the pinecone backend needs --pinecone-index")
+        if args.pinecone_index == settings.pinecone_index_name:
+            parser.error("--pinecone-index must not be the application's index")
+        if args.dim != 1536:
+            parser.error("the pinecone backend needs --dim 1536")
+
+    corpus, query_vectors = make_vectors(
+        args.distribution, args.vectors, args.queries, args.dim, args.seed
+    )
+    chunks, industries = make_chunks(args.vectors, args.seed)
+    query_texts = [f"benchmark query {i}" for i in range(args.queries)]
+    embeddings = LookupEmbeddings(
+        [chunk.content for chunk in chunks] + query_texts,
+        np.vstack([corpus, query_vectors]),
+    )
+
+    # Filtered queries each restrict to one industry
+    query_industries = np.arange(args.queries) % len(INDUSTRIES)
+    filtered_truth = np.full((args.queries, args.top_k), -1, dtype=np.int64)
+    for industry in range(len(INDUSTRIES)):
+        picks = np.flatnonzero(query_industries == industry)
+        rows = np.flatnonzero(industries == industry)
+        if len(picks) and len(rows):
+            filtered_truth[picks] = exact_search(
+                corpus, query_vectors[picks], args.top_k, rows
+            )
+    scenarios = {
+        "unfiltered": (
+            [SearchQuery(query=text, top_k=args.top_k) for text in query_texts],
+            exact_search(corpus, query_vectors, args.top_k),
+        ),
+        "filtered": (
+            [
+                SearchQuery(
+                    query=text,
+                    top_k=args.top_k,
+                    filters={"industry": INDUSTRIES[industry]},
+                )
+                for text, industry in zip(query_texts, query_industries)
+            ],
+            filtered_truth,
+        ),
+    }
+
+    results: list[Result] = []
+    for name in args.backends:
+        print(f"Benchmarking {name}...", file=sys.stderr)
+        results += run_isolated(
+            run_backend, name, chunks, corpus, scenarios, embeddings, args
+        )
+
+    print(
+        f"\n{args.vectors} {args.distribution} vectors x {args.dim} dims, "
+        f"{args.queries} queries, recall@{args.top_k} vs exact search\n"
+    )
+    print_table(results, args.top_k)
+
+    if args.output:
+        report = {
+            "commit": git_commit(),
+            "timestamp": datetime.datetime.now(datetime.UTC).isoformat(),
+            "params": {
+                key: value
+                for key, value in vars(args).items()
+                if key not in ("output", "baseline")
+            },
+            "results": [asdict(r) for r in results],
+        }
+        args.output.write_text(json.dumps(report, indent=2, default=str))
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())
+        regressions = compare(
+            results, baseline, args.max_recall_drop, args.max_latency_increase
+        )
+        print(f"\nCompared with {baseline.get('commit') or args.baseline}:")
+        for key in ("vectors", "dim", "top_k", "distribution", "seed"):
+            if baseline["params"].get(key) != getattr(args, key):
+                print(f"  warning: baseline {key} was {baseline['params'].get(key)}")
+        for line in regressions:
+            print(f"  REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+        print("  no regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,9 @@ import streamlit as st
 # API base URL
 API_URL = "http://localhost:8000"
 
+# Documents fetched per request when browsing (the API's maximum page size)
+DOCUMENTS_PAGE_SIZE = 500
+
 
 def render():
     """Render the documents page."""
@@ -178,11 +181,24 @@ def render_browse():
         st.rerun()
 
     try:
-        response = requests.get(f"{API_URL}/documents", timeout=10)
+        # The API returns one page at a time: fetch pages until all
+        # `total` documents are loaded
+        documents, data = [], {}
+        while True:
+            response = requests.get(
+                f"{API_URL}/documents",
+                params={"limit": DOCUMENTS_PAGE_SIZE, "offset": len(documents)},
+                timeout=10,
+            )
+            if not response.ok:
+                break
+            data = response.json()
+            page = data.get("documents", [])
+            documents.extend(page)
+            if not page or len(documents) >= data.get("total", 0):
+                break
 
         if response.ok:
-            data = response.json()
-            documents = data.get("documents", [])
             total_chunks = data.get("total_chunks", 0)
 
             if not documents:
@@ -0,0 +1,29 @@
+"""Shared test fixtures."""
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def embedding_cache_path(tmp_path, monkeypatch):
+    """Keep the embedding cache of stores built in tests out of .index/."""
+    path = tmp_path / "embedding_cache"
+    monkeypatch.setattr("app.documents.memory.embedding_cache.CACHE_PATH", path)
+    return path
+
+
+@pytest.fixture(autouse=True)
+def empty_query_cache(monkeypatch):
+    """Give each test an empty, memory-only query embedding cache."""
+    monkeypatch.setattr("app.documents.memory.query_cache._cache", None)
+    monkeypatch.setattr(
+        "app.documents.memory.query_cache.settings.query_cache_disk", False
+    )
+
+
+@pytest.fixture(autouse=True)
+def rewrite_cache_path(tmp_path, monkeypatch):
+    """Keep the query rewrite cache of tests out of .index/."""
+    path = tmp_path / "rewrite_cache.sqlite"
+    monkeypatch.setattr("app.documents.rewrite_cache.DISK_PATH", path)
+    monkeypatch.setattr("app.documents.rewrite_cache._caches", {})
+    return path
@@ -34,6 +34,11 @@ def test_documents_list_empty():
     assert "status" in data
 
 
+def test_batch_search_validation():
+    response = client.post("/documents/search/batch", json={"queries": []})
+    assert response.status_code == 422
+
+
 def test_briefings_placeholder():
     """Test briefings endpoint returns placeholder."""
     response = client.post(
@@ -0,0 +1,247 @@
+"""Tests for token-aware batching and the embed/write pipelines."""
+
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.documents.memory.batching import (
+    RateLimiter,
+    ScheduledEmbeddings,
+    arun_pipeline,
+    estimate_tokens,
+    retry_delay,
+    run_pipeline,
+    token_batches,
+)
+from tests.test_faiss_store import FakeEmbeddings, make_chunk
+
+
+def fake_embed(texts: list[str]) -> list[list[float]]:
+    return [[float(len(text))] for text in texts]
+
+
+class RateLimited(Exception):
+    """Shaped like openai.RateLimitError."""
+
+    status_code = 429
+    response = SimpleNamespace(headers={"retry-after": "0"})
+
+
+class FlakyEmbeddings(FakeEmbeddings):
+    """Fake embeddings that fail the first call with a 429."""
+
+    def __init__(self, *args, **kwargs):
+        self.calls: list[list[str]] = []
+        self.lock = threading.Lock()
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        with self.lock:
+            self.calls.append(texts)
+            if len(self.calls) == 1:
+                raise RateLimited()
+        time.sleep(0.01 * (len(texts) % 3))  # Finish out of order
+        return fake_embed(texts)
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self.embed_documents(texts)
+
+
+class TestTokenBatches:
+    """Tests for splitting texts under a token budget."""
+
+    def test_respects_token_budget(self):
+        texts = ["x" * 40] * 10  # 11 estimated tokens each
+        batches = token_batches(texts, max_tokens=25)
+
+        assert [len(b) for b in batches] == [2] * 5
+        assert [i for b in batches for i in b] == list(range(10))
+
+    def test_respects_text_limit(self):
+        batches = token_batches(["a"] * 5, max_tokens=1000, max_texts=2)
+
+        assert [len(b) for b in batches] == [2, 2, 1]
+
+    def test_oversized_text_gets_own_batch(self):
+        texts = ["short", "x" * 400, "short"]
+
+        assert token_batches(texts, max_tokens=estimate_tokens("x" * 40)) == [
+            range(0, 1),
+            range(1, 2),
+            range(2, 3),
+        ]
+
+    def test_empty(self):
+        assert token_batches([], max_tokens=10) == []
+
+
+class TestRateLimiter:
+    """Tests for the tokens/requests per minute budget."""
+
+    def test_waits_once_budget_is_spent(self):
+        now = [0.0]
+        limiter = RateLimiter(600, 0, clock=lambda: now[0])
+
+        assert limiter.reserve(600) == 0
+        assert limiter.reserve(60) == pytest.approx(6.0)  # 10 tokens/s refill
+        now[0] = 6.0
+        assert limiter.reserve(10) == pytest.approx(1.0)
+
+    def test_request_budget(self):
+        limiter = RateLimiter(0, 2, clock=lambda: 0.0)
+
+        waits = [limiter.reserve(10**6) for _ in range(3)]
+
+        assert waits == [0, 0, pytest.approx(30.0)]
+
+    def test_retry_delay(self):
+        assert retry_delay(RateLimited(), attempt=3) == 0
+        assert 4 <= retry_delay(ConnectionError(), attempt=3) <= 8
+        assert retry_delay(ValueError(), attempt=0) is None
+
+
+class TestScheduledEmbeddings:
+    """Tests for batched, rate-limited embedding calls."""
+
+    @pytest.fixture
+    def texts(self):
+        return [f"chunk {i} " + "x" * (i % 7) * 40 for i in range(40)]
+
+    def schedule(self, inner):
+        return ScheduledEmbeddings(
+            inner,
+            max_batch_tokens=50,
+            concurrency=4,
+            limiter=RateLimiter(0, 0),
+            max_retries=2,
+        )
+
+    def test_order_preserved_across_batches_and_retry(self, texts):
+        inner = FlakyEmbeddings()
+
+        embeddings = self.schedule(inner).embed_documents(texts)
+
+        assert embeddings == fake_embed(texts)
+        assert len(inner.calls) > 2
+        assert all(
+            sum(map(estimate_tokens, c)) <= 50 or len(c) == 1 for c in inner.calls
+        )
+
+    def test_async(self, texts):
+        inner = FlakyEmbeddings()
+
+        embeddings = asyncio.run(self.schedule(inner).aembed_documents(texts))
+
+        assert embeddings == fake_embed(texts)
+
+    def test_gives_up_after_max_retries(self):
+        class AlwaysLimited(FakeEmbeddings):
+            def embed_documents(self, texts):
+                raise RateLimited()
+
+        with pytest.raises(RateLimited):
+            self.schedule(AlwaysLimited()).embed_documents(["a"])
+
+
+class TestPipeline:
+    """Tests for pipelined embedding and writing."""
+
+    @pytest.fixture
+    def chunks(self):
+        return [make_chunk(f"doc_{i}") for i in range(25)]
+
+    def test_writes_every_chunk_once(self, chunks):
+        written = []
+        lock = threading.Lock()
+
+        def write(batch, embeddings):
+            assert len(batch) == len(embeddings) <= 4
+            with lock:
+                written.extend(chunk.chunk_id for chunk in batch)
+            return len(batch)
+
+        count = run_pipeline(
+            chunks, fake_embed, write, write_batch_size=4, max_batch_tokens=20
+        )
+
+        assert count == 25
+        assert sorted(written) == sorted(chunk.chunk_id for chunk in chunks)
+
+    def test_writes_overlap_embedding(self, chunks):
+        first_write = threading.Event()
+
+        def embed(texts):
+            # The last batch waits until an earlier batch has been written
+            if "doc_24 chunk 0" in texts:
+                assert first_write.wait(timeout=5)
+            return fake_embed(texts)
+
+        def write(batch, embeddings):
+            first_write.set()
+            return len(batch)
+
+        count = run_pipeline(
+            chunks, embed, write, write_batch_size=100, max_batch_tokens=20
+        )
+
+        assert count == 25
+
+    def test_failure_propagates(self, chunks):
+        def write(batch, embeddings):
+            raise RuntimeError("upsert failed")
+
+        with pytest.raises(RuntimeError, match="upsert failed"):
+            run_pipeline(chunks, fake_embed, write, write_batch_size=10)
+
+    def test_async_pipeline(self, chunks):
+        in_flight = peak = 0
+
+        async def embed(texts):
+            return fake_embed(texts)
+
+        async def write(batch, embeddings):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return len(batch)
+
+        count = asyncio.run(
+            arun_pipeline(
+                chunks,
+                embed,
+                write,
+                write_batch_size=2,
+                max_batch_tokens=20,
+                write_concurrency=3,
+            )
+        )
+
+        assert count == 25
+        assert peak == 3
+
+    def test_batches_use_the_model_encoding(self, chunks, monkeypatch):
+        # Dense text: one token per character, far above the estimate
+        encoding = SimpleNamespace(encode=lambda text, **_: list(text))
+        monkeypatch.setattr(
+            "app.documents.memory.batching._encoding", lambda model: encoding
+        )
+        batches = []
+
+        def embed(texts):
+            batches.append(texts)
+            return fake_embed(texts)
+
+        run_pipeline(
+            chunks,
+            embed,
+            lambda batch, embeddings: len(batch),
+            write_batch_size=100,
+            max_batch_tokens=40,
+            model="text-embedding-3-small",
+        )
+
+        assert max(sum(map(len, texts)) for texts in batches) <= 40
@@ -0,0 +1,308 @@
+"""Tests for BM25 lexical search and hybrid retrieval."""
+
+import asyncio
+import time
+
+import numpy as np
+import pytest
+
+from app.documents.memory.bm25 import BM25Index, reciprocal_rank_fusion, tokenize
+from app.documents.memory.faiss_store import FAISSVectorStore
+from app.documents.memory.sharded_store import ShardedFAISSVectorStore, shard_of
+from app.documents.schemas import SearchMode, SearchQuery
+from tests.test_faiss_store import EMBEDDING_DIM, FakeEmbeddings, make_chunk
+
+TEXTS = [
+    "Acme Corp renewed the SKU-4410 license after a pricing review",
+    "Globex churned over onboarding delays",
+    "Initech expanded seats; pricing was not discussed",
+    "Renewal call with Acme about support tiers",
+]
+
+
+class FailingEmbeddings(FakeEmbeddings):
+    """Embeddings whose query calls fail (documents still embed)."""
+
+    def embed_query(self, text: str) -> list[float]:
+        if text.startswith("query:"):
+            raise ConnectionError("embeddings API unavailable")
+        return super().embed_query(text)
+
+    async def aembed_query(self, text: str) -> list[float]:
+        return self.embed_query(text)
+
+
+class SlowEmbeddings(FakeEmbeddings):
+    def embed_query(self, text: str) -> list[float]:
+        if text.startswith("query:"):
+            time.sleep(0.5)
+        return super().embed_query(text)
+
+
+def make_store(embeddings=None) -> FAISSVectorStore:
+    store = FAISSVectorStore(
+        embedding_dim=EMBEDDING_DIM, embeddings=embeddings or FakeEmbeddings()
+    )
+    chunks = []
+    for i, text in enumerate(TEXTS):
+        chunk = make_chunk(f"doc_{i}", industry="fintech" if i % 2 else "saas")
+        chunk.content = text
+        chunks.append(chunk)
+    store.add_chunks(chunks)
+    return store
+
+
+def doc_ids(response) -> list[str]:
+    return [result.metadata["doc_id"] for result in response.results]
+
+
+class TestTokenize:
+    """Tests for term extraction."""
+
+    def test_lowercases_and_drops_stopwords(self):
+        assert tokenize("The Acme deal is WON") == ["acme", "deal", "won"]
+
+    def test_keeps_identifiers_and_their_parts(self):
+        assert tokenize("SKU-4410 v2.1") == [
+            "sku-4410",
+            "sku",
+            "4410",
+            "v2.1",
+            "v2",
+            "1",
+        ]
+
+
+class TestBM25Index:
+    """Tests for ranking, removal and persistence."""
+
+    @pytest.fixture
+    def index(self):
+        index = BM25Index()
+        for text in TEXTS:
+            index.add(text)
+        return index
+
+    def test_exact_identifier_ranks_first(self, index):
+        scores, rows = index.search("sku-4410", top_k=3)
+
+        assert rows.tolist() == [0]
+        assert scores[0] > 0
+
+    def test_rarer_terms_weigh_more(self, index):
+        _, rows = index.search("acme onboarding", top_k=4)
+
+        assert rows[0] == 1
+
+    def test_exclude_mask_and_removal(self, index):
+        exclude = np.array([True, False, False, False])
+        index.remove(0, TEXTS[0])
+
+        _, rows = index.search("acme pricing", top_k=4, exclude=exclude)
+
+        assert 0 not in rows.tolist()
+        assert set(rows.tolist()) == {2, 3}
+
+    def test_unknown_terms_return_nothing(self, index):
+        scores, rows = index.search("zeppelin", top_k=4)
+
+        assert len(scores) == len(rows) == 0
+
+    def test_save_load_round_trip(self, index, tmp_path):
+        index.remove(1, TEXTS[1])
+        index.save(tmp_path)
+
+        loaded = BM25Index()
+        loaded.load(tmp_path)
+        loaded.add("Acme again")
+
+        expected = index.search("acme pricing", top_k=4)
+        actual = loaded.search("acme pricing", top_k=4)
+        assert actual[1][:2].tolist() == expected[1][:2].tolist()
+        assert loaded.size == 5
+
+
+class TestReciprocalRankFusion:
+    """Tests for rank fusion."""
+
+    def test_items_in_both_rankings_win(self):
+        fused = reciprocal_rank_fusion([["a", "b", "c"], ["c", "d"]], k=60)
+
+        assert [key for key, _ in fused] == ["c", "a", "b", "d"]
+        assert fused[0][1] == pytest.approx(1 / 63 + 1 / 61)
+
+
+class TestStoreSearchModes:
+    """Tests for lexical and hybrid search in the FAISS store."""
+
+    def test_lexical_finds_exact_names(self):
+        store = make_store()
+
+        response = store.search(
+            SearchQuery(query="Globex", mode=SearchMode.LEXICAL, top_k=2)
+        )
+
+        assert doc_ids(response) == ["doc_1"]
+        assert response.mode == SearchMode.LEXICAL
+
+    def test_lexical_respects_filters_and_deletes(self):
+        store = make_store()
+        store.delete_document("doc_3")
+
+        response = store.search(
+            SearchQuery(
+                query="acme pricing",
+                mode=SearchMode.LEXICAL,
+                filters={"industry": "fintech"},
+            )
+        )
+
+        assert doc_ids(response) == []
+        response = store.search(SearchQuery(query="acme", mode=SearchMode.LEXICAL))
+        assert doc_ids(response) == ["doc_0"]
+
+    def test_hybrid_fuses_both_rankings(self):
+        store = make_store()
+
+        response = store.search(
+            SearchQuery(query=TEXTS[2], mode=SearchMode.HYBRID, top_k=3)
+        )
+
+        assert response.mode == SearchMode.HYBRID
+        assert doc_ids(response)[0] == "doc_2"
+        assert len(response.results) == 3
+
+    def test_falls_back_to_lexical_when_embeddings_fail(self):
+        store = make_store(FailingEmbeddings())
+
+        response = store.search(SearchQuery(query="query: SKU-4410"))
+
+        assert response.mode == SearchMode.LEXICAL
+        assert doc_ids(response)[0] == "doc_0"
+
+    def test_falls_back_when_embeddings_are_slow(self, monkeypatch):
+        monkeypatch.setattr(
+            "app.documents.memory.query_embeddings.settings.search_embedding_timeout",
+            0.05,
+        )
+        store = make_store(SlowEmbeddings())
+
+        response = store.search(SearchQuery(query="query: Globex"))
+
+        assert response.mode == SearchMode.LEXICAL
+        assert doc_ids(response) == ["doc_1"]
+
+    def test_async_fallback(self):
+        store = make_store(FailingEmbeddings())
+
+        response = asyncio.run(store.asearch(SearchQuery(query="query: Initech")))
+
+        assert response.mode == SearchMode.LEXICAL
+        assert doc_ids(response) == ["doc_2"]
+
+    def test_lexical_index_persists_and_rebuilds(self, tmp_path):
+        store = make_store()
+        store.delete_document("doc_1")
+        store.save(tmp_path)
+        expected = store.search(SearchQuery(query="acme", mode=SearchMode.LEXICAL))
+
+        loaded = FAISSVectorStore(
+            embedding_dim=EMBEDDING_DIM,
+            index_path=tmp_path,
+            embeddings=FakeEmbeddings(),
+            wal=False,
+        )
+        query = SearchQuery(query="acme", mode=SearchMode.LEXICAL)
+        assert loaded.search(query) == expected
+
+        for file in (tmp_path / "lexical").iterdir():
+            file.unlink()
+        (tmp_path / "lexical").rmdir()
+        rebuilt = FAISSVectorStore(
+            embedding_dim=EMBEDDING_DIM,
+            index_path=tmp_path,
+            embeddings=FakeEmbeddings(),
+            wal=False,
+        )
+        assert rebuilt.search(query) == expected
+
+
+class TestShardedHybrid:
+    """Tests for lexical and hybrid search across shards."""
+
+    @pytest.fixture
+    def stores(self, monkeypatch):
+        monkeypatch.setattr(
+            "app.documents.memory.sharded_store.OpenAIEmbeddings", FakeEmbeddings
+        )
+        chunks = []
+        for i in range(40):
+            chunk = make_chunk(f"doc_{i}")
+            chunk.content = f"{TEXTS[i % 4]} (note {i})"
+            chunks.append(chunk)
+
+        single = FAISSVectorStore(
+            embedding_dim=EMBEDDING_DIM, index_type="flat", embeddings=FakeEmbeddings()
+        )
+        sharded = ShardedFAISSVectorStore(
+            num_shards=3, embedding_dim=EMBEDDING_DIM, index_type="flat"
+        )
+        single.add_chunks(chunks)
+        sharded.add_chunks(chunks)
+        return single, sharded
+
+    def test_hybrid_matches_single_store(self, stores):
+        single, sharded = stores
+        query = SearchQuery(
+            query=f"{TEXTS[3]} (note 7)", mode=SearchMode.HYBRID, top_k=5
+        )
+
+        expected = single.search(query)
+        actual = sharded.search(query)
+
+        assert actual.mode == SearchMode.HYBRID
+        assert doc_ids(actual)[0] == doc_ids(expected)[0] == "doc_7"
+
+    def test_lexical_mode(self, stores):
+        _, sharded = stores
+
+        response = sharded.search(
+            SearchQuery(query="SKU-4410", mode=SearchMode.LEXICAL, top_k=20)
+        )
+
+        assert response.mode == SearchMode.LEXICAL
+        assert sorted(doc_ids(response)) == sorted(f"doc_{i}" for i in range(0, 40, 4))
+
+    def test_lexical_scores_use_global_statistics(self, monkeypatch):
+        monkeypatch.setattr(
+            "app.documents.memory.sharded_store.OpenAIEmbeddings", FakeEmbeddings
+        )
+        # "zephyr" is in most chunks of shard 0 and nowhere else; "quasar"
+        # is in one chunk of shard 1, next to short filler chunks
+        ids = [f"doc_{i}" for i in range(200)]
+        chunks = []
+        for doc_id in [d for d in ids if shard_of(d, 2) == 0][:20]:
+            chunks.append(make_chunk(doc_id))
+            chunks[-1].content = "zephyr zephyr report on zephyr engines"
+        for n, doc_id in enumerate([d for d in ids if shard_of(d, 2) == 1][:20]):
+            chunks.append(make_chunk(doc_id))
+            chunks[-1].content = "quasar engines" if n == 0 else f"memo {n}"
+
+        single = FAISSVectorStore(
+            embedding_dim=EMBEDDING_DIM, index_type="flat", embeddings=FakeEmbeddings()
+        )
+        sharded = ShardedFAISSVectorStore(
+            num_shards=2, embedding_dim=EMBEDDING_DIM, index_type="flat"
+        )
+        single.add_chunks(chunks)
+        sharded.add_chunks(chunks)
+        query = SearchQuery(query="zephyr quasar", mode=SearchMode.LEXICAL, top_k=5)
+
+        expected = single.search(query)
+        actual = sharded.search(query)
+
+        # The other hits tie, so only the top one has a defined order
+        assert doc_ids(actual)[0] == doc_ids(expected)[0]
+        assert [r.score for r in actual.results] == pytest.approx(
+            [r.score for r in expected.results]
+        )
@@ -0,0 +1,68 @@
+"""Tests for the SQLite chunk content store."""
+
+import threading
+
+import pytest
+
+from app.documents.memory.content_store import MAX_PARAMS, ContentStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ContentStore(tmp_path / "content.sqlite")
+    yield store
+    store.close()
+
+
+class TestContentStore:
+    """Tests for writes, bulk lookups and persistence."""
+
+    def test_put_and_get_many(self, store):
+        store.put_many([("a#0", "alpha"), ("b#0", "beta")])
+
+        assert store.get_many(["a#0", "b#0", "missing"]) == {
+            "a#0": "alpha",
+            "b#0": "beta",
+        }
+
+    def test_put_replaces(self, store):
+        store.put_many([("a#0", "old")])
+        store.put_many([("a#0", "new")])
+
+        assert store.get_many(["a#0"]) == {"a#0": "new"}
+        assert len(store) == 1
+
+    def test_survives_reopen(self, store, tmp_path):
+        store.put_many([("a#0", "alpha")])
+
+        reopened = ContentStore(tmp_path / "content.sqlite")
+
+        assert reopened.get_many(["a#0"]) == {"a#0": "alpha"}
+        reopened.close()
+
+    def test_large_lookups_are_batched(self, store):
+        items = [(f"doc#{i}", f"text {i}") for i in range(MAX_PARAMS * 2 + 5)]
+        store.put_many(items)
+        ids = [vector_id for vector_id, _ in items]
+
+        assert store.get_many(ids) == dict(items)
+        store.delete_many(ids[:-1])
+        assert len(store) == 1
+
+    def test_clear(self, store):
+        store.put_many([("a#0", "alpha")])
+        store.clear()
+
+        assert store.get_many(["a#0"]) == {}
+
+    def test_concurrent_writers(self, store):
+        def write(worker: int) -> None:
+            store.put_many((f"w{worker}#{i}", "text") for i in range(50))
+
+        threads = [threading.Thread(target=write, args=(i,)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(store) == 200
@@ -0,0 +1,115 @@
+"""Tests for near-duplicate chunk collapsing at ingest."""
+
+import numpy as np
+
+from app.documents.ingestion.dedup import (
+    collapse_near_duplicates,
+    jaccard,
+    minhash,
+    shingles,
+)
+from app.documents.memory.faiss_store import FAISSVectorStore
+from app.documents.memory.registry import document_hash
+from app.documents.schemas import SearchQuery
+from tests.test_faiss_store import EMBEDDING_DIM, FakeEmbeddings, make_chunk
+
+BOILERPLATE = (
+    "Our implementation methodology follows four phases: discovery, "
+    "configuration, user acceptance testing and go-live. Each phase ends with "
+    "a steering committee review, and the customer success manager owns the "
+    "plan from kickoff through the first ninety days after launch."
+)
+
+
+def chunk(doc_id: str, index: int, content: str):
+    result = make_chunk(doc_id, index)
+    result.content = content
+    return result
+
+
+def corpus():
+    return [
+        chunk("proposal_b", 0, "Proposal for Globex"),
+        chunk("proposal_b", 1, BOILERPLATE + " Contact: Globex procurement."),
+        chunk("proposal_a", 0, "Proposal for Acme"),
+        chunk("proposal_a", 1, BOILERPLATE),
+        chunk("proposal_a", 2, "Acme pricing: 400 seats at the enterprise tier"),
+        chunk("proposal_c", 0, BOILERPLATE),
+    ]
+
+
+class TestSignatures:
+    """Tests for shingling and MinHash."""
+
+    def test_minhash_estimates_jaccard(self):
+        a = shingles(BOILERPLATE)
+        b = shingles(BOILERPLATE.replace("ninety", "sixty"))
+
+        estimate = np.mean(minhash(a) == minhash(b))
+
+        assert abs(estimate - jaccard(a, b)) < 0.15
+        assert jaccard(a, a) == 1.0
+
+    def test_short_texts_are_one_shingle(self):
+        assert len(shingles("Proposal for Acme")) == 1
+
+
+class TestCollapse:
+    """Tests for collapsing near-duplicate chunks."""
+
+    def test_collapses_into_first_chunk_in_doc_order(self):
+        kept, report = collapse_near_duplicates(corpus(), threshold=0.8)
+
+        ids = [c.chunk_id for c in kept]
+        assert ids == [
+            "proposal_b#0",
+            "proposal_a#0",
+            "proposal_a#1",
+            "proposal_a#2",
+            "proposal_c#0",
+        ]
+        assert kept[2].duplicates == ["proposal_b#1"]
+        assert kept[2].to_dict()["duplicates"] == ["proposal_b#1"]
+        assert report.chunks == 6
+        assert report.duplicates == 1
+        expected_bytes = len(corpus()[1].content.encode())
+        assert report.content_bytes == expected_bytes
+        assert report.bytes_saved(1536) == expected_bytes + 1536 * 4
+
+    def test_first_chunk_of_a_document_is_kept(self):
+        kept, _ = collapse_near_duplicates(corpus(), threshold=0.8)
+
+        assert {c.metadata.doc_id for c in kept} == {
+            "proposal_a",
+            "proposal_b",
+            "proposal_c",
+        }
+
+    def test_threshold(self):
+        _, strict = collapse_near_duplicates(corpus(), threshold=0.99)
+        _, off = collapse_near_duplicates(corpus(), threshold=0)
+
+        assert strict.duplicates == off.duplicates == 0
+
+    def test_unchanged_chunks_keep_their_hash(self):
+        chunks = corpus()
+        before = document_hash([chunks[4]])
+
+        kept, _ = collapse_near_duplicates(chunks, threshold=0.8)
+
+        assert "duplicates" not in kept[3].to_dict()
+        assert document_hash([kept[3]]) == before
+
+    def test_store_keeps_sources_in_metadata(self):
+        store = FAISSVectorStore(
+            embedding_dim=EMBEDDING_DIM, embeddings=FakeEmbeddings()
+        )
+        kept, _ = collapse_near_duplicates(corpus(), threshold=0.8)
+        store.add_chunks(kept)
+
+        response = store.search(
+            SearchQuery(query=BOILERPLATE, filters={"doc_id": "proposal_a"}, top_k=1)
+        )
+
+        assert response.results[0].metadata["duplicates"] == ["proposal_b#1"]
+        assert store.count == 5
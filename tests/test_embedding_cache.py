@@ -0,0 +1,166 @@
+"""Tests for the persistent embedding cache."""
+
+import asyncio
+
+import numpy as np
+import pytest
+
+from app.documents.memory.embedding_cache import (
+    CachedEmbeddings,
+    EmbeddingCache,
+    cache_stats,
+    cached_embeddings,
+)
+from app.documents.memory.faiss_store import FAISSVectorStore
+from app.documents.schemas import SearchQuery
+from tests.test_faiss_store import EMBEDDING_DIM, FakeEmbeddings, make_chunk
+
+
+class CountingEmbeddings(FakeEmbeddings):
+    """Fake embeddings that record the texts sent to them."""
+
+    def __init__(self, *args, **kwargs):
+        self.embedded: list[str] = []
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        self.embedded.extend(texts)
+        return super().embed_documents(texts)
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self.embed_documents(texts)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return EmbeddingCache(tmp_path, "text-embedding-3-small")
+
+
+class TestEmbeddingCache:
+    """Tests for storage and recovery."""
+
+    def test_round_trip_and_reopen(self, cache, tmp_path):
+        vectors = np.array(FakeEmbeddings().embed_documents(["a", "b"]), np.float32)
+        cache.put_many(["a", "b"], vectors)
+
+        reopened = EmbeddingCache(tmp_path, "text-embedding-3-small")
+        found = reopened.get_many(["b", "c", "a"])
+
+        assert len(reopened) == 2
+        assert found[1] is None
+        np.testing.assert_array_equal(found[0], vectors[1])
+        np.testing.assert_array_equal(found[2], vectors[0])
+
+    def test_models_do_not_share_entries(self, cache, tmp_path):
+        cache.put_many(["a"], np.ones((1, 4), np.float32))
+
+        other = EmbeddingCache(tmp_path, "text-embedding-3-large")
+
+        assert other.get_many(["a"]) == [None]
+
+    def test_float16_rows(self, tmp_path):
+        cache = EmbeddingCache(tmp_path, "m", dtype="float16")
+        vector = np.array(FakeEmbeddings().embed_query("a"), np.float32)
+        cache.put_many(["a"], vector[None, :])
+
+        (found,) = EmbeddingCache(tmp_path, "m").get_many(["a"])
+
+        assert found.dtype == np.float32
+        assert np.abs(found - vector).max() < 1e-3
+        assert (tmp_path / "m" / "vectors.bin").stat().st_size == EMBEDDING_DIM * 2
+
+    def test_torn_append_is_dropped(self, cache, tmp_path):
+        cache.put_many(["a", "b"], np.ones((2, 4), np.float32))
+        with open(cache.path / "vectors.bin", "ab") as f:
+            f.write(b"\0" * 6)  # part of a third row, key never written
+
+        reopened = EmbeddingCache(tmp_path, "text-embedding-3-small")
+        reopened.put_many(["c"], np.full((1, 4), 2, np.float32))
+
+        assert len(reopened) == 3
+        np.testing.assert_array_equal(reopened.get_many(["c"])[0], [2, 2, 2, 2])
+
+    def test_workers_interleave_appends(self, tmp_path):
+        first = EmbeddingCache(tmp_path, "m")
+        second = EmbeddingCache(tmp_path, "m")
+
+        first.put_many(["alpha"], np.full((1, 4), 1, np.float32))
+        second.put_many(["beta"], np.full((1, 4), 2, np.float32))
+        first.put_many(["gamma", "beta"], np.full((2, 4), 3, np.float32))
+
+        for cache in (first, second, EmbeddingCache(tmp_path, "m")):
+            alpha, beta = cache.get_many(["alpha", "beta"])
+            np.testing.assert_array_equal(beta, [2, 2, 2, 2])
+            if alpha is not None:
+                np.testing.assert_array_equal(alpha, [1, 1, 1, 1])
+        assert len(EmbeddingCache(tmp_path, "m")) == 3
+        assert (tmp_path / "m" / "vectors.bin").stat().st_size == 3 * 4 * 4
+
+
+class TestCachedEmbeddings:
+    """Tests for the embeddings wrapper."""
+
+    def test_only_misses_are_embedded(self, cache):
+        inner = CountingEmbeddings()
+        embeddings = CachedEmbeddings(inner, cache)
+
+        first = embeddings.embed_documents(["a", "b", "a"])
+        second = embeddings.embed_documents(["b", "c"])
+
+        assert inner.embedded == ["a", "b", "c"]
+        assert second[0] == pytest.approx(first[1])
+        assert first[0] == first[2]
+        assert cache.stats.hits == 1
+        assert cache.stats.misses == 4
+
+    def test_async(self, cache):
+        inner = CountingEmbeddings()
+        embeddings = CachedEmbeddings(inner, cache)
+
+        asyncio.run(embeddings.aembed_documents(["a"]))
+        asyncio.run(embeddings.aembed_documents(["a"]))
+
+        assert inner.embedded == ["a"]
+
+    def test_disabled(self, monkeypatch):
+        monkeypatch.setattr(
+            "app.documents.memory.embedding_cache.settings.embedding_cache", False
+        )
+        inner = CountingEmbeddings()
+
+        assert cached_embeddings(inner) is inner
+
+
+class TestStoreReingest:
+    """Tests for stores consulting the shared cache."""
+
+    def test_reingest_makes_no_embedding_calls(self, monkeypatch):
+        inner = CountingEmbeddings()
+        monkeypatch.setattr(
+            "app.documents.memory.faiss_store.OpenAIEmbeddings", lambda **_: inner
+        )
+        chunks = [make_chunk(f"doc_{i}") for i in range(5)]
+        FAISSVectorStore(embedding_dim=EMBEDDING_DIM).add_chunks(chunks)
+        before = cache_stats()
+
+        rebuilt = FAISSVectorStore(embedding_dim=EMBEDDING_DIM)
+        rebuilt.add_chunks(chunks)
+
+        stats = cache_stats() - before
+        assert len(inner.embedded) == 5
+        assert (stats.hits, stats.misses) == (5, 0)
+        assert stats.tokens_saved > 0
+        assert rebuilt.count == 5
+
+    def test_query_batches_bypass_the_cache(self, cache):
+        inner = CountingEmbeddings()
+        store = FAISSVectorStore(
+            embedding_dim=EMBEDDING_DIM, embeddings=CachedEmbeddings(inner, cache)
+        )
+        store.add_chunks([make_chunk(f"doc_{i}") for i in range(3)])
+        before = cache.stats.hits, cache.stats.misses
+
+        store.search_many([SearchQuery(query="renewals"), SearchQuery(query="pricing")])
+
+        assert (cache.stats.hits, cache.stats.misses) == before
+        assert len(cache) == 3
+        assert inner.embedded[-2:] == ["renewals", "pricing"]
@@ -0,0 +1,640 @@
+"""Tests for the FAISS vector store."""
+
+import asyncio
+import json
+import zlib
+from unittest.mock import patch
+
+import faiss
+import numpy as np
+import pytest
+
+from app.documents.memory import faiss_index, faiss_store
+from app.documents.memory.columnar import ColumnarStore
+from app.documents.memory.faiss_index import (
+    AUTO_HNSW_MIN_VECTORS,
+    AUTO_IVF_MIN_VECTORS,
+    IndexType,
+    Quantization,
+    quantization_of,
+    select_index_type,
+)
+from app.documents.memory.faiss_store import FAISSVectorStore
+from app.documents.memory.metadata_index import MetadataIndex
+from app.documents.schemas import (
+    Chunk,
+    CompanySize,
+    DealOutcome,
+    DocType,
+    DocumentMetadata,
+    SearchQuery,
+)
+
+EMBEDDING_DIM = 32
+
+
+# =============================================================================
+# Fixtures
+# =============================================================================
+
+
+class FakeEmbeddings:
+    """Deterministic embeddings: each text maps to a fixed unit vector."""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def embed_query(self, text: str) -> list[float]:
+        rng = np.random.default_rng(zlib.crc32(text.encode()))
+        vector = rng.standard_normal(EMBEDDING_DIM)
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return [self.embed_query(text) for text in texts]
+
+    async def aembed_query(self, text: str) -> list[float]:
+        return self.embed_query(text)
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self.embed_documents(texts)
+
+
+def make_chunk(doc_id: str, chunk_index: int = 0, **metadata) -> Chunk:
+    """Create a chunk with unique content and optional metadata."""
+    metadata.setdefault("doc_type", DocType.DEAL)
+    return Chunk(
+        content=f"{doc_id} chunk {chunk_index}",
+        metadata=DocumentMetadata(
+            doc_id=doc_id,
+            source_file=f"{doc_id}.md",
+            **metadata,
+        ),
+        chunk_index=chunk_index,
+        total_chunks=1,
+    )
+
+
+@pytest.fixture
+def make_store():
+    """Factory for FAISS stores with fake embeddings."""
+    with patch("app.documents.memory.faiss_store.OpenAIEmbeddings", FakeEmbeddings):
+
+        def factory(**kwargs) -> FAISSVectorStore:
+            return FAISSVectorStore(embedding_dim=EMBEDDING_DIM, **kwargs)
+
+        yield factory
+
+
+# =============================================================================
+# Index Layout Tests
+# =============================================================================
+
+
+class TestIndexSelection:
+    """Tests for automatic index type selection."""
+
+    def test_auto_uses_flat_for_small_corpus(self):
+        assert select_index_type(IndexType.AUTO, 100) == IndexType.FLAT
+
+    def test_auto_scales_to_ann_indexes(self):
+        assert (
+            select_index_type(IndexType.AUTO, AUTO_HNSW_MIN_VECTORS) == IndexType.HNSW
+        )
+        assert select_index_type(IndexType.AUTO, AUTO_IVF_MIN_VECTORS) == IndexType.IVF
+
+    def test_explicit_type_is_kept(self):
+        assert select_index_type(IndexType.IVF, 10) == IndexType.IVF
+
+
+class TestFAISSIndexModes:
+    """Tests for flat / IVF / HNSW stores."""
+
+    @pytest.mark.parametrize("index_type", ["flat", "ivf", "hnsw"])
+    def test_search_finds_exact_match(self, make_store, index_type):
+        store = make_store(index_type=index_type)
+        store.add_chunks([make_chunk(f"doc_{i}") for i in range(300)])
+
+        assert store.count == 300
+        assert store.active_index_type == IndexType(index_type)
+
+        response = store.search(SearchQuery(query="doc_42 chunk 0", top_k=1))
+        assert response.results[0].metadata["doc_id"] == "doc_42"
+        assert response.results[0].score == pytest.approx(1.0, abs=1e-3)
+
+    def test_ivf_trains_on_first_add(self, make_store):
+        store = make_store(index_type="ivf")
+        store.add_chunks([make_chunk(f"doc_{i}") for i in range(200)])
+
+        assert store.index.is_trained
+
+    def test_save_load_preserves_index_type(self, make_store, tmp_path):
+        store = make_store(index_type="hnsw")
+        store.add_chunks([make_chunk(f"doc_{i}") for i in range(50)])
+        store.save(tmp_path)
+
+        loaded = make_store(index_path=tmp_path)
+
+        assert loaded.count == 50
+        assert loaded.active_index_type == IndexType.HNSW
+
+
+class TestQuantization:
+    """Tests for SQ8/PQ stores with exact re-ranking."""
+
+    @pytest.fixture(autouse=True)
+    def small_pq_threshold(self, monkeypatch):
+        monkeypatch.setattr(faiss_index, "PQ_MIN_VECTORS", 256)
+
+    @pytest.mark.parametrize("index_type", ["flat", "ivf", "hnsw"])
+    @pytest.mark.parametrize("quantization", ["sq8", "pq"])
+    def test_rerank_returns_exact_scores(self, make_store, index_type, quantization):
+        store = make_store(index_type=index_type, quantization=quantization)
+        store.add_chunks([make_chunk(f"doc_{i}") for i in range(300)])
+
+        assert quantization_of(store.index) == Quantization(quantization)
+        response = store.search(SearchQuery(query="doc_42 chunk 0", top_k=3))
+        assert response.results[0].metadata["doc_id"] == "doc_42"
+        assert response.results[0].score == pytest.approx(1.0, abs=1e-4)
+
+    def test_pq_waits_for_enough_training_data(self, make_store):
+        store = make_store(quantization="pq")
+        store.add_chunks([make_chunk(f"doc_{i}") for i in range(100)])
+
+        assert quantization_of(store.index) == Quantization.NONE
+
+        store.add_chunks([make_chunk(f"doc_{i}") for i in range(100, 300)])
+
+        assert quantization_of(store.index) == Quantization.PQ
+        assert len(store.full_vectors) == 300
+
+    def test_rerank_can_be_disabled(self, make_store):
+        store = make_store(quantization="pq", rerank_factor=0)
+        store.add_chunks([make_chunk(f"doc_{i}") for i in range(300)])
+
+        with patch.object(faiss_store, "rerank_exact") as rerank:
+            response = store.search(SearchQuery(query="doc_42 chunk 0", top_k=1))
+
+        rerank.assert_not_called()
+        assert response.results[0].metadata["doc_id"] == "doc_42"
+
+    def test_full_vectors_are_memory_mapped(self, make_store, tmp_path):
+        store = make_store(quantization="sq8")
+        store.add_chunks([make_chunk(f"doc_{i}", industry="x") for i in range(50)])
+        store.save(tmp_path)
+
+        loaded = make_store(index_path=tmp_path, quantization="sq8")
+        response = loaded.search(
+            SearchQuery(query="doc_7 chunk 0", top_k=1, filters={"industry": "x"})
+        )
+
+        assert isinstance(loaded.full_vectors.stored, np.memmap)
+        assert response.results[0].score == pytest.approx(1.0, abs=1e-4)
+
+    def test_appends_after_load_stay_out_of_the_mapped_rows(self, make_store, tmp_path):
+        store = make_store(quantization="sq8")
+        store.add_chunks([make_chunk(f"doc_{i}") for i in range(50)])
+        store.save(tmp_path)
+
+        loaded = make_store(index_path=tmp_path, quantization="sq8")
+        loaded.add_chunks([make_chunk("doc_new")])
+        response = loaded.search(SearchQuery(query="doc_new chunk 0", top_k=1))
+
+        assert isinstance(loaded.full_vectors.stored, np.memmap)
+        assert len(loaded.full_vectors.stored) == 50
+        assert len(loaded.full_vectors) == 51
+        assert response.results[0].score == pytest.approx(1.0, abs=1e-4)
+
+        loaded.save(tmp_path)
+        assert len(loaded.full_vectors.stored) == 51
+
+    def test_unquantized_store_migrates(self, make_store, tmp_path):
+        store = make_store()
+        store.add_chunks([make_chunk(f"doc_{i}") for i in range(20)])
+        store.save(tmp_path)
+
+        loaded = make_store(index_path=tmp_path, quantization="sq8")
+        loaded.add_chunks([make_chunk("doc_new")])
+
+        assert quantization_of(loaded.index) == Quantization.SQ8
+        response = loaded.search(SearchQuery(query="doc_3 chunk 0", top_k=1))
+        assert response.results[0].score == pytest.approx(1.0, abs=1e-4)
+
+
+class TestTruncatedSearch:
+    """Tests for the truncated first pass with full-dim re-ranking."""
+
+    @pytest.mark.parametrize("index_type", ["flat", "hnsw"])
+    def test_rerank_returns_full_dim_scores(self, make_store, index_type):
+        store = make_store(index_type=index_type, truncate_dim=8)
+        store.add_chunks([make_chunk(f"doc_{i}") for i in range(200)])
+
+        response = store.search(SearchQuery(query="doc_42 chunk 0", top_k=3))
+
+        assert store.index.d == 8
+        assert response.results[0].metadata["doc_id"] == "doc_42"
+        assert response.results[0].score == pytest.approx(1.0, abs=1e-4)
+
+    def test_filtered_exact_scan_uses_full_vectors(self, make_store):
+        store = make_store(truncate_dim=8)
+        store.add_chunks([make_chunk(f"doc_{i}", industry="x") for i in range(20)])
+
+        query = SearchQuery(query="doc_5 chunk 0", top_k=20, filters={"industry": "x"})
+        response = store.search(query)
+
+        query_np = np.array([store.embeddings.embed_query(query.query)])
+        vectors = store.full_vectors.get(np.arange(len(store.full_vectors)))
+        expected = np.sort(vectors @ query_np[0])[::-1]
+        assert [r.score for r in response.results] == pytest.approx(expected, abs=1e-4)
+
+    def test_truncation_can_be_enabled_on_existing_store(self, make_store, tmp_path):
+        store = make_store()
+        store.add_chunks([make_chunk(f"doc_{i}") for i in range(20)])
+        store.save(tmp_path)
+
+        loaded = make_store(index_path=tmp_path, truncate_dim=8)
+        loaded.add_chunks([make_chunk("doc_new")])
+        loaded.save(tmp_path)
+
+        reloaded = make_store(index_path=tmp_path, truncate_dim=8)
+        response = reloaded.search(SearchQuery(query="doc_3 chunk 0", top_k=1))
+        assert reloaded.index.d == 8
+        assert response.results[0].score == pytest.approx(1.0, abs=1e-4)
+
+    def test_invalid_truncate_dim(self, make_store):
+        with pytest.raises(ValueError):
+            make_store(truncate_dim=EMBEDDING_DIM + 1)
+
+
+class TestMemoryMappedLoad:
+    """Tests for read-only memory-mapped index loading."""
+
+    @pytest.mark.parametrize("index_type", ["flat", "ivf", "hnsw"])
+    def test_mapped_index_searches(self, make_store, tmp_path, index_type):
+        store = make_store(index_type=index_type)
+        store.add_chunks([make_chunk(f"doc_{i}", industry="x") for i in range(200)])
+        store.save(tmp_path)
+
+        loaded = make_store(index_path=tmp_path, mmap=True)
+
+        assert loaded._index_mapped
+        response = loaded.search(
+            SearchQuery(query="doc_3 chunk 0", top_k=1, filters={"industry": "x"})
+        )
+        assert response.results[0].metadata["doc_id"] == "doc_3"
+
+    def test_writes_copy_mapped_index(self, make_store, tmp_path):
+        store = make_store()
+        store.add_chunks([make_chunk(f"doc_{i}") for i in range(10)])
+        store.save(tmp_path)
+
+        loaded = make_store(index_path=tmp_path, mmap=True)
+        loaded.add_chunks([make_chunk("doc_new")])
+        loaded.save(tmp_path)
+
+        assert not loaded._index_mapped
+        assert make_store(index_path=tmp_path, mmap=True).count == 11
+
+
+# =============================================================================
+# Metadata Filtering Tests
+# =============================================================================
+
+
+class TestMetadataIndex:
+    """Tests for the inverted metadata index."""
+
+    def test_match_intersects_fields(self):
+        index = MetadataIndex()
+        index.add({"doc_type": "deal", "industry": "healthcare"})
+        index.add({"doc_type": "deal", "industry": "fintech"})
+        index.add({"doc_type": "proposal", "industry": "healthcare"})
+
+        ids = index.match({"doc_type": "deal", "industry": "healthcare"})
+
+        assert ids.tolist() == [0]
+
+    def test_match_list_membership(self):
+        index = MetadataIndex()
+        index.add({"tags": ["pricing", "enterprise"]})
+        index.add({"tags": ["pricing"]})
+
+        assert index.match({"tags": "enterprise"}).tolist() == [0]
+        assert index.match({"tags": "pricing"}).tolist() == [0, 1]
+
+    def test_values_are_type_sensitive(self):
+        index = MetadataIndex()
+        index.add({"deal_value": 5})
+
+        assert index.match({"deal_value": "5"}).tolist() == []
+
+    def test_save_load_roundtrip(self, tmp_path):
+        index = MetadataIndex()
+        index.add({"doc_type": "deal"})
+        index.add({"doc_type": "proposal"})
+        index.save(tmp_path / "filters")
+
+        loaded = MetadataIndex()
+        loaded.load(tmp_path / "filters")
+        loaded.add({"doc_type": "deal"})
+
+        assert loaded.match({"doc_type": "deal"}).tolist() == [0, 2]
+
+
+class TestFilteredSearch:
+    """Tests for filter push-down in FAISSVectorStore.search."""
+
+    @pytest.fixture
+    def store(self, make_store):
+        store = make_store(index_type="hnsw")
+        chunks = [
+            make_chunk(
+                f"doc_{i}",
+                industry="healthcare" if i % 50 == 0 else "fintech",
+                tags=["priority"] if i % 2 else [],
+            )
+            for i in range(500)
+        ]
+        store.add_chunks(chunks)
+        return store
+
+    def test_selective_filter_returns_full_top_k(self, store):
+        response = store.search(
+            SearchQuery(query="anything", top_k=10, filters={"industry": "healthcare"})
+        )
+
+        assert len(response.results) == 10
+        assert all(r.metadata["industry"] == "healthcare" for r in response.results)
+
+    def test_selector_path_matches_exact_path(self, store, monkeypatch):
+        query = SearchQuery(
+            query="doc_7 chunk 0", top_k=5, filters={"tags": "priority"}
+        )
+        exact = store.search(query)
+
+        monkeypatch.setattr(faiss_store, "EXACT_SCAN_MAX_CANDIDATES", 0)
+        indexed = store.search(query)
+
+        assert [r.metadata["doc_id"] for r in indexed.results][0] == "doc_7"
+        assert all("priority" in r.metadata["tags"] for r in indexed.results)
+        assert len(indexed.results) == len(exact.results) == 5
+
+    def test_no_matches_returns_empty(self, store):
+        response = store.search(
+            SearchQuery(query="anything", filters={"industry": "retail"})
+        )
+
+        assert response.results == []
+        assert response.total_searched == 500
+
+    def test_filters_survive_save_load(self, store, make_store, tmp_path):
+        store.save(tmp_path)
+        loaded = make_store(index_path=tmp_path)
+
+        response = loaded.search(
+            SearchQuery(query="anything", top_k=20, filters={"industry": "healthcare"})
+        )
+
+        assert len(response.results) == 10
+
+
+class TestBatchSearch:
+    """Tests for search_many."""
+
+    @pytest.mark.parametrize("index_type", ["flat", "hnsw"])
+    def test_matches_individual_searches(self, make_store, index_type):
+        store = make_store(index_type=index_type)
+        store.add_chunks(
+            [make_chunk(f"doc_{i}", industry="x" if i % 3 else "y") for i in range(60)]
+        )
+        queries = [
+            SearchQuery(query="doc_1 chunk 0", top_k=3),
+            SearchQuery(query="doc_2 chunk 0", top_k=5, filters={"industry": "y"}),
+            SearchQuery(query="doc_4 chunk 0", top_k=1),
+        ]
+
+        batched = store.search_many(queries)
+
+        assert [len(r.results) for r in batched] == [3, 5, 1]
+        assert batched == [store.search(query) for query in queries]
+
+    def test_embeds_queries_in_one_call(self, make_store):
+        store = make_store()
+        store.add_chunks([make_chunk("doc_1")])
+
+        # Queries go to the client under the embedding cache
+        client = store.embeddings.embeddings.embeddings
+        with patch.object(
+            client, "embed_documents", wraps=client.embed_documents
+        ) as embed:
+            store.search_many([SearchQuery(query="a"), SearchQuery(query="b")])
+
+        embed.assert_called_once_with(["a", "b"])
+
+    def test_empty_store(self, make_store):
+        responses = make_store().search_many([SearchQuery(query="a")])
+
+        assert responses[0].results == []
+
+
+class TestAsyncAPI:
+    """Tests for the async store methods."""
+
+    def test_async_methods_match_sync(self, make_store):
+        store = make_store()
+        chunks = [make_chunk(f"doc_{i}", industry="x") for i in range(20)]
+        query = SearchQuery(query="doc_3 chunk 0", top_k=3, filters={"industry": "x"})
+
+        async def run():
+            added = await store.aadd_chunks(chunks)
+            return added, await store.acount(), await store.asearch(query)
+
+        added, count, response = asyncio.run(run())
+
+        assert added == count == 20
+        assert response == store.search(query)
+
+    def test_asearch_many(self, make_store):
+        store = make_store()
+        store.add_chunks([make_chunk(f"doc_{i}") for i in range(5)])
+        queries = [SearchQuery(query="doc_1 chunk 0"), SearchQuery(query="b")]
+
+        responses = asyncio.run(store.asearch_many(queries))
+
+        assert responses == store.search_many(queries)
+
+
+# =============================================================================
+# Incremental Update Tests
+# =============================================================================
+
+
+class TestIncrementalUpdates:
+    """Tests for upsert_document / delete_document."""
+
+    @pytest.mark.parametrize("index_type", ["flat", "ivf", "hnsw"])
+    def test_delete_document(self, make_store, index_type):
+        store = make_store(index_type=index_type)
+        store.add_chunks([make_chunk(f"doc_{i}") for i in range(300)])
+
+        assert store.delete_document("doc_42") == 1
+        assert store.delete_document("doc_42") == 0
+
+        response = store.search(SearchQuery(query="doc_42 chunk 0", top_k=5))
+        assert store.count == 299
+        assert "doc_42" not in [r.metadata["doc_id"] for r in response.results]
+
+    def test_deleted_rows_excluded_from_filters(self, make_store):
+        store = make_store()
+        store.add_chunks([make_chunk(f"doc_{i}", industry="x") for i in range(5)])
+        store.delete_document("doc_1")
+
+        response = store.search(
+            SearchQuery(query="doc_1 chunk 0", top_k=10, filters={"industry": "x"})
+        )
+
+        assert len(response.results) == 4
+        assert "doc_1" not in [r.metadata["doc_id"] for r in response.results]
+
+    def test_upsert_replaces_chunks(self, make_store):
+        store = make_store()
+        store.add_chunks([make_chunk("doc_1", i) for i in range(3)])
+
+        written = store.upsert_document("doc_1", [make_chunk("doc_1", industry="x")])
+
+        assert written == 1
+        assert store.count == 1
+        assert store.get_all_metadata()[0]["industry"] == "x"
+
+    def test_upsert_skips_unchanged_document(self, make_store):
+        store = make_store()
+        chunks = [make_chunk("doc_1", i) for i in range(3)]
+        store.add_chunks(chunks)
+
+        with patch.object(store.embeddings, "embed_documents") as embed:
+            written = store.upsert_document("doc_1", list(reversed(chunks)))
+
+        assert written == 0
+        embed.assert_not_called()
+
+    def test_row_ids_are_stable(self, make_store):
+        store = make_store()
+        store.add_chunks([make_chunk(f"doc_{i}") for i in range(3)])
+        store.delete_document("doc_0")
+        store.add_chunks([make_chunk("doc_3")])
+
+        response = store.search(SearchQuery(query="doc_2 chunk 0", top_k=1))
+
+        assert response.results[0].content == "doc_2 chunk 0"
+
+    def test_deletes_survive_save_load(self, make_store, tmp_path):
+        store = make_store(index_type="hnsw")
+        store.add_chunks([make_chunk(f"doc_{i}") for i in range(10)])
+        store.delete_document("doc_3")
+        store.save(tmp_path)
+
+        loaded = make_store(index_path=tmp_path, mmap=True)
+        loaded.delete_document("doc_4")
+
+        response = loaded.search(SearchQuery(query="doc_3 chunk 0", top_k=10))
+        assert loaded.count == 8
+        assert {"doc_3", "doc_4"}.isdisjoint(
+            r.metadata["doc_id"] for r in response.results
+        )
+
+    def test_rebuild_drops_tombstones(self, make_store):
+        store = make_store(index_type="hnsw")
+        store.add_chunks([make_chunk(f"doc_{i}") for i in range(10)])
+        store.delete_document("doc_3")
+
+        store._rebuild(IndexType.HNSW, Quantization.NONE)
+
+        assert store.index.ntotal == 9
+        assert store.count == 9
+
+
+# =============================================================================
+# Columnar Storage Tests
+# =============================================================================
+
+
+class TestColumnarStore:
+    """Tests for columnar metadata/content storage."""
+
+    @pytest.fixture
+    def chunk(self):
+        return make_chunk(
+            "deal_001",
+            industry="healthcare",
+            company_size=CompanySize.ENTERPRISE,
+            deal_value=75000,
+            outcome=DealOutcome.WON,
+            tags=["hipaa", "analytics"],
+        )
+
+    def test_roundtrip_matches_chunk_dict(self, chunk, tmp_path):
+        store = ColumnarStore()
+        store.append(chunk.to_dict(), chunk.content)
+        store.append(make_chunk("doc_2").to_dict(), "second")
+        store.save(tmp_path)
+
+        loaded = ColumnarStore.load(tmp_path)
+
+        assert len(loaded) == 2
+        assert loaded.metadata(0) == chunk.to_dict()
+        assert list(loaded.metadata(0)) == list(chunk.to_dict())
+        assert loaded.metadata(1)["industry"] is None
+        assert loaded.content(1) == "second"
+
+    def test_columns_are_memory_mapped(self, chunk, tmp_path):
+        store = ColumnarStore()
+        store.append(chunk.to_dict(), chunk.content)
+        store.save(tmp_path)
+
+        loaded = ColumnarStore.load(tmp_path)
+
+        assert isinstance(loaded._content._blob, np.memmap)
+        assert isinstance(loaded._enums["doc_type"]._array, np.memmap)
+
+    def test_append_after_load(self, chunk, tmp_path):
+        store = ColumnarStore()
+        store.append(chunk.to_dict(), chunk.content)
+        store.save(tmp_path)
+
+        loaded = ColumnarStore.load(tmp_path)
+        loaded.append(chunk.to_dict(), "again")
+        loaded.save(tmp_path)
+
+        reloaded = ColumnarStore.load(tmp_path)
+        assert reloaded.metadata(1) == chunk.to_dict()
+        assert reloaded.content(1) == "again"
+
+    def test_extra_metadata_is_kept(self):
+        store = ColumnarStore()
+        store.append({"doc_id": "x", "doc_type": "deal", "custom": [1, 2]}, "text")
+
+        assert store.metadata(0)["custom"] == [1, 2]
+
+    def test_store_converts_legacy_metadata_json(self, make_store, tmp_path):
+        store = make_store()
+        chunks = [make_chunk(f"doc_{i}") for i in range(3)]
+        store.add_chunks(chunks)
+        # Older stores used a positional (not id-mapped) index
+        legacy_index = faiss.IndexFlatIP(EMBEDDING_DIM)
+        legacy_index.add(store.index.reconstruct_batch(np.arange(3)))
+        faiss.write_index(legacy_index, str(tmp_path / "index.faiss"))
+        (tmp_path / "metadata.json").write_text(
+            json.dumps(
+                {
+                    "metadata": [c.to_dict() for c in chunks],
+                    "content": [c.content for c in chunks],
+                }
+            )
+        )
+
+        loaded = make_store(index_path=tmp_path)
+
+        assert loaded.get_all_metadata() == [c.to_dict() for c in chunks]
+
+        loaded.delete_document("doc_0")
+        response = loaded.search(SearchQuery(query="doc_2 chunk 0", top_k=1))
+        assert response.results[0].metadata["doc_id"] == "doc_2"
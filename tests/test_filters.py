@@ -0,0 +1,320 @@
+"""Tests for the metadata filter language."""
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from pydantic import ValidationError
+
+from app.documents.filters import (
+    AllOf,
+    AnyOf,
+    Condition,
+    FilterNode,
+    FilterOp,
+    parse_filters,
+    select_rows,
+    to_pinecone,
+)
+from app.documents.memory.columnar import ColumnarStore
+from app.documents.memory.metadata_index import MetadataIndex
+from app.documents.memory.pinecone_store import PineconeVectorStore
+from app.documents.schemas import CompanySize, DealOutcome, SearchQuery
+from app.main import app
+from tests.test_faiss_store import make_chunk, make_store  # noqa: F401
+
+INDUSTRIES = ["fintech", "healthcare", "retail", None]
+OUTCOMES = [DealOutcome.WON, DealOutcome.LOST, None]
+
+
+def corpus_chunks(count: int = 60):
+    return [
+        make_chunk(
+            f"doc_{i}",
+            industry=INDUSTRIES[i % 4],
+            outcome=OUTCOMES[i % 3],
+            company_size=CompanySize.STARTUP if i % 2 else None,
+            deal_value=i * 10_000 if i % 5 else None,
+            date=f"2024-{i % 12 + 1:02d}-15",
+            tags=["pricing", "q4"][: i % 3],
+        )
+        for i in range(count)
+    ]
+
+
+def reference(node: FilterNode, metadata: dict) -> bool:
+    """Per-row evaluation of a filter tree (the slow path being replaced)."""
+    if isinstance(node, Condition):
+        return node.matches(metadata.get(node.field))
+    results = (reference(child, metadata) for child in node.children)
+    return all(results) if isinstance(node, AllOf) else any(results)
+
+
+FILTERS = [
+    {"industry": "fintech"},
+    {"industry": {"$in": ["fintech", "retail"]}},
+    {"industry": {"$ne": "fintech"}},
+    {"industry": {"$nin": ["fintech", "healthcare"]}},
+    {"industry": None},
+    {"outcome": {"$ne": "lost"}},
+    {"company_size": {"$in": ["startup", "enterprise"]}},
+    {"deal_value": {"$gte": 100_000, "$lt": 400_000}},
+    {"deal_value": {"$ne": 50_000}},
+    {"deal_value": {"$gt": "abc"}},
+    {"date": {"$gte": "2024-03-01", "$lte": "2024-06-30"}},
+    {"tags": "pricing"},
+    {"tags": {"$in": ["q4", "missing"]}},
+    {"tags": {"$nin": ["q4"]}},
+    {"tags": None},
+    {"chunk_index": 0, "industry": "healthcare"},
+    {"$or": [{"industry": "retail"}, {"deal_value": {"$gt": 500_000}}]},
+    {
+        "outcome": "won",
+        "$or": [{"tags": "q4"}, {"date": {"$lt": "2024-02-01"}}],
+    },
+    {"$and": [{"industry": {"$ne": None}}, {"tags": {"$ne": "pricing"}}]},
+]
+
+
+# =============================================================================
+# Parsing
+# =============================================================================
+
+
+class TestParseFilters:
+    """Tests for filter validation and compilation."""
+
+    def test_plain_value_is_exact_match(self):
+        assert parse_filters({"industry": "fintech"}) == Condition(
+            "industry", FilterOp.EQ, "fintech"
+        )
+
+    def test_fields_are_anded_cheapest_first(self):
+        node = parse_filters(
+            {"deal_value": {"$gt": 5}, "industry": "fintech", "$or": [{"a": 1}]}
+        )
+
+        assert isinstance(node, AllOf)
+        assert [type(child) for child in node.children] == [
+            Condition,
+            Condition,
+            AnyOf,
+        ]
+        assert node.children[0].op == FilterOp.EQ
+
+    @pytest.mark.parametrize(
+        "filters",
+        [
+            {"industry": {"$regex": "fin"}},
+            {"$not": {"industry": "fintech"}},
+            {"industry": {"$in": "fintech"}},
+            {"industry": {"$in": [["nested"]]}},
+            {"deal_value": {"$gt": None}},
+            {"industry": {}},
+            {"$or": []},
+            {"tags": ["pricing"]},
+        ],
+    )
+    def test_rejects_malformed_filters(self, filters):
+        with pytest.raises(ValueError):
+            parse_filters(filters)
+
+    def test_search_query_compiles_once(self):
+        query = SearchQuery(query="q", filters={"industry": {"$in": ["fintech"]}})
+
+        assert query.compiled_filters == Condition("industry", FilterOp.IN, ["fintech"])
+        assert SearchQuery(query="q").compiled_filters is None
+
+    def test_search_query_rejects_bad_operator(self):
+        with pytest.raises(ValidationError):
+            SearchQuery(query="q", filters={"industry": {"$like": "fin"}})
+
+    def test_api_returns_422_for_bad_filter(self):
+        response = TestClient(app).post(
+            "/documents/search",
+            json={"query": "q", "filters": {"deal_value": {"$gt": [1]}}},
+        )
+
+        assert response.status_code == 422
+
+
+class TestConditionSemantics:
+    """Tests for scalar and list evaluation."""
+
+    def test_ranges_never_match_missing_or_mistyped_values(self):
+        condition = Condition("deal_value", FilterOp.GT, 10)
+
+        assert condition.test(20)
+        assert not condition.test(None)
+        assert not condition.test("20")
+        assert not condition.test(True)
+
+    def test_negations_match_missing_values(self):
+        assert Condition("industry", FilterOp.NE, "fintech").test(None)
+        assert Condition("industry", FilterOp.NIN, ["fintech"]).test(None)
+
+    def test_lists_match_if_any_element_matches(self):
+        assert Condition("tags", FilterOp.EQ, "q4").matches(["pricing", "q4"])
+        assert not Condition("tags", FilterOp.NE, "q4").matches(["pricing", "q4"])
+        assert Condition("tags", FilterOp.NE, "q4").matches([])
+
+
+# =============================================================================
+# Vectorised Evaluation
+# =============================================================================
+
+
+class TestSelectRows:
+    """Tests for mask evaluation over columnar metadata."""
+
+    @pytest.fixture
+    def columns(self):
+        chunks = corpus_chunks()
+        columns, postings = ColumnarStore(), MetadataIndex()
+        for chunk in chunks:
+            metadata = chunk.to_dict()
+            columns.append(metadata, chunk.content)
+            postings.add(metadata)
+        return columns, postings, [chunk.to_dict() for chunk in chunks]
+
+    @pytest.mark.parametrize("filters", FILTERS)
+    def test_matches_per_row_evaluation(self, columns, filters):
+        columns, postings, metadatas = columns
+        node = parse_filters(filters)
+
+        rows = select_rows(node, columns, postings)
+
+        expected = [i for i, m in enumerate(metadatas) if reference(node, m)]
+        assert rows.tolist() == expected
+        assert rows.dtype == np.int64
+
+    def test_extra_fields_are_evaluated(self, columns):
+        columns, postings, _ = columns
+        columns.append({"doc_id": "x", "region": "emea", "score": 7}, "x")
+        postings.add({"doc_id": "x", "region": "emea", "score": 7})
+
+        node = parse_filters({"region": "emea", "score": {"$gte": 5}})
+
+        assert select_rows(node, columns, postings).tolist() == [len(columns) - 1]
+
+    @pytest.mark.parametrize(
+        "filters",
+        [
+            {"deal_value": {"$eq": 70000.0}},
+            {"deal_value": {"$in": [10000.0, 20000, 0.5]}},
+        ],
+    )
+    def test_float_operands_match_on_both_paths(self, columns, filters):
+        columns, postings, metadatas = columns
+        node = parse_filters(filters)
+
+        by_postings = select_rows(node, columns, postings)
+        by_columns = np.flatnonzero(columns.condition_mask(node))
+
+        expected = [i for i, m in enumerate(metadatas) if reference(node, m)]
+        assert by_postings.tolist() == by_columns.tolist() == expected != []
+
+    def test_float_keys_are_normalised_on_load(self, tmp_path):
+        postings = MetadataIndex()
+        postings.add({"deal_value": 50000})
+        postings.add({"deal_value": 50000})
+        # As saved before float keys were normalised
+        postings._postings["deal_value"] = {"50000.0": [0], "50000": [1]}
+        postings._arrays.clear()
+        postings.save(tmp_path)
+
+        loaded = MetadataIndex()
+        loaded.load(tmp_path)
+
+        assert loaded.match_any("deal_value", (50000.0,)).tolist() == [0, 1]
+
+
+class TestFilteredSearch:
+    """Tests for operator filters in FAISS search."""
+
+    def test_range_and_negation(self, make_store):  # noqa: F811
+        store = make_store()
+        store.add_chunks(corpus_chunks())
+
+        response = store.search(
+            SearchQuery(
+                query="doc_12 chunk 0",
+                top_k=20,
+                filters={
+                    "deal_value": {"$gte": 100_000},
+                    "industry": {"$ne": "retail"},
+                    "date": {"$lt": "2024-07-01"},
+                },
+            )
+        )
+
+        assert response.results[0].metadata["doc_id"] == "doc_12"
+        for result in response.results:
+            metadata = result.metadata
+            assert metadata["deal_value"] >= 100_000
+            assert metadata["industry"] != "retail"
+            assert metadata["date"] < "2024-07-01"
+
+    def test_deleted_rows_are_excluded(self, make_store):  # noqa: F811
+        store = make_store()
+        store.add_chunks(corpus_chunks(10))
+        store.delete_document("doc_2")
+
+        response = store.search(
+            SearchQuery(query="q", top_k=20, filters={"industry": {"$ne": "x"}})
+        )
+
+        doc_ids = {r.metadata["doc_id"] for r in response.results}
+        assert doc_ids == {f"doc_{i}" for i in range(10)} - {"doc_2"}
+
+
+# =============================================================================
+# Pinecone Translation
+# =============================================================================
+
+
+class TestPineconeFilter:
+    """Tests for translation to Pinecone operators."""
+
+    def test_translates_operators(self):
+        node = parse_filters(
+            {
+                "industry": {"$in": ["fintech", "saas"]},
+                "$or": [{"outcome": "won"}, {"deal_value": {"$gt": 10}}],
+            }
+        )
+
+        assert to_pinecone(node) == {
+            "$and": [
+                {"industry": {"$in": ["fintech", "saas"]}},
+                {
+                    "$or": [
+                        {"outcome": {"$eq": "won"}},
+                        {"deal_value": {"$gt": 10}},
+                    ]
+                },
+            ]
+        }
+
+    def test_date_ranges_use_numeric_copy(self):
+        node = parse_filters({"date": {"$gte": "2024-03-01"}, "industry": "x"})
+
+        assert PineconeVectorStore._build_pinecone_filter(None, node) == {
+            "$and": [
+                {"industry": {"$eq": "x"}},
+                {"date_number": {"$gte": 20240301}},
+            ]
+        }
+
+    def test_null_tests_existence(self):
+        assert to_pinecone(parse_filters({"industry": None})) == {
+            "industry": {"$exists": False}
+        }
+        assert to_pinecone(parse_filters({"industry": {"$ne": None}})) == {
+            "industry": {"$exists": True}
+        }
+        assert to_pinecone(parse_filters({"industry": {"$in": ["x", None]}})) == {
+            "$or": [{"industry": {"$in": ["x"]}}, {"industry": {"$exists": False}}]
+        }
+        assert to_pinecone(parse_filters({"industry": {"$nin": [None, "x"]}})) == {
+            "$and": [{"industry": {"$nin": ["x"]}}, {"industry": {"$exists": True}}]
+        }
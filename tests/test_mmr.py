@@ -0,0 +1,148 @@
+"""Tests for MMR diversity re-ranking."""
+
+import numpy as np
+import pytest
+
+from app.documents.memory.faiss_store import FAISSVectorStore
+from app.documents.memory.mmr import diversify, mmr_depth, mmr_select
+from app.documents.memory.sharded_store import ShardedFAISSVectorStore
+from app.documents.schemas import SearchMode, SearchQuery, SearchResult
+from tests.test_faiss_store import EMBEDDING_DIM, FakeEmbeddings, make_chunk
+
+
+def unit(*components: tuple[int, float]) -> list[float]:
+    vector = np.zeros(EMBEDDING_DIM)
+    for axis, value in components:
+        vector[axis] = value
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+# Three near-copies of the query topic, and one chunk that is less
+# relevant but covers something else
+VECTORS = {
+    "pricing": unit((0, 1.0)),
+    "pricing v1": unit((0, 1.0), (2, 0.01)),
+    "pricing v2": unit((0, 1.0), (3, 0.01)),
+    "pricing v3": unit((0, 1.0), (4, 0.01)),
+    "pricing and onboarding": unit((0, 1.0), (1, 1.0)),
+}
+DUPLICATE_PAIR_AND_OTHER = [
+    VECTORS["pricing v1"],
+    VECTORS["pricing v2"],
+    VECTORS["pricing and onboarding"],
+]
+
+
+class TopicEmbeddings(FakeEmbeddings):
+    """Embeddings with hand-picked vectors, counting embedded texts."""
+
+    texts = 0
+
+    def embed_query(self, text: str) -> list[float]:
+        TopicEmbeddings.texts += 1
+        if text in VECTORS:
+            return VECTORS[text]
+        return super().embed_query(text)
+
+
+def topic_chunks():
+    chunks = []
+    for i, text in enumerate(VECTORS):
+        if text == "pricing":
+            continue
+        chunk = make_chunk(f"doc_{i}")
+        chunk.content = text
+        chunks.append(chunk)
+    return chunks
+
+
+def contents(response) -> list[str]:
+    return [result.content for result in response.results]
+
+
+class TestMMRSelect:
+    """Tests for the greedy selection."""
+
+    def test_lambda_one_keeps_relevance_order(self):
+        relevance = np.array([0.2, 0.9, 0.5], dtype=np.float32)
+        vectors = np.eye(3, dtype=np.float32)
+
+        assert mmr_select(relevance, vectors, 3, 1.0).tolist() == [1, 2, 0]
+
+    def test_penalises_duplicates(self):
+        relevance = np.array([1.0, 0.99, 0.7], dtype=np.float32)
+        vectors = np.array(DUPLICATE_PAIR_AND_OTHER, dtype=np.float32)
+
+        assert mmr_select(relevance, vectors, 2, 0.3).tolist() == [0, 2]
+
+    def test_handles_fewer_candidates_than_top_k(self):
+        picked = mmr_select(np.array([0.5]), np.ones((1, 4)), 5, 0.5)
+
+        assert picked.tolist() == [0]
+
+    def test_depth(self, monkeypatch):
+        monkeypatch.setattr("app.documents.memory.mmr.settings.mmr_fetch_k", 20)
+
+        assert mmr_depth(SearchQuery(query="q", top_k=5)) == 5
+        assert mmr_depth(SearchQuery(query="q", top_k=5, mmr_lambda=0.5)) == 20
+        query = SearchQuery(query="q", top_k=15, mmr_lambda=0.5, fetch_k=10)
+        assert mmr_depth(query) == 15
+
+    def test_diversify_without_embeddings_trims(self):
+        results = [
+            SearchResult(content=str(i), score=1 - i / 10, metadata={})
+            for i in range(4)
+        ]
+        query = SearchQuery(query="q", top_k=2, mmr_lambda=0.5)
+
+        assert diversify(results, query, SearchMode.DENSE) == results[:2]
+
+
+class TestStoreMMR:
+    """Tests for MMR in the FAISS stores."""
+
+    @pytest.fixture
+    def store(self):
+        store = FAISSVectorStore(
+            embedding_dim=EMBEDDING_DIM, embeddings=TopicEmbeddings()
+        )
+        store.add_chunks(topic_chunks())
+        return store
+
+    def test_plain_ranking_returns_duplicates(self, store):
+        response = store.search(SearchQuery(query="pricing", top_k=2))
+
+        assert set(contents(response)) <= {"pricing v1", "pricing v2", "pricing v3"}
+        assert all(result.embedding is None for result in response.results)
+
+    def test_mmr_picks_diverse_results_from_stored_vectors(self, store):
+        TopicEmbeddings.texts = 0
+
+        response = store.search(SearchQuery(query="pricing", top_k=2, mmr_lambda=0.3))
+
+        assert contents(response)[1] == "pricing and onboarding"
+        assert response.results[0].score > response.results[1].score
+        assert response.results[1].embedding == pytest.approx(
+            VECTORS["pricing and onboarding"], abs=1e-5
+        )
+        assert "embedding" not in response.results[0].model_dump()
+        assert TopicEmbeddings.texts == 1  # the query only
+
+    def test_lexical_mmr(self, store):
+        query = SearchQuery(
+            query="pricing", mode=SearchMode.LEXICAL, top_k=2, mmr_lambda=0.3
+        )
+
+        response = store.search(query)
+
+        assert "pricing and onboarding" in contents(response)
+
+    def test_sharded_matches_single_store(self, store, monkeypatch):
+        monkeypatch.setattr(
+            "app.documents.memory.sharded_store.OpenAIEmbeddings", TopicEmbeddings
+        )
+        sharded = ShardedFAISSVectorStore(num_shards=2, embedding_dim=EMBEDDING_DIM)
+        sharded.add_chunks(topic_chunks())
+        query = SearchQuery(query="pricing", top_k=2, mmr_lambda=0.3)
+
+        assert contents(sharded.search(query)) == contents(store.search(query))
@@ -0,0 +1,86 @@
+"""Tests for the Pinecone store (against an in-memory index)."""
+
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.documents.memory.pinecone_store import PineconeVectorStore
+from app.documents.schemas import SearchMode, SearchQuery
+from app.main import app
+from tests.test_faiss_store import FakeEmbeddings, make_chunk
+
+
+class FakeIndex:
+    """In-memory stand-in for the Pinecone data-plane client."""
+
+    def __init__(self, ids: list[str]):
+        self.ids = set(ids)
+        self.lock = threading.Lock()
+
+    def list(self, prefix: str):
+        matches = sorted(i for i in self.ids if i.startswith(prefix))
+        yield SimpleNamespace(vectors=[SimpleNamespace(id=i) for i in matches])
+
+    def upsert(self, vectors, **kwargs):
+        with self.lock:
+            self.ids.update(vector["id"] for vector in vectors)
+
+    def delete(self, ids):
+        with self.lock:
+            self.ids.difference_update(ids)
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    # Ids written before chunk ids used "#", plus look-alikes of other docs
+    index = FakeIndex(["deal_1_0", "deal_1_1", "deal_1_2", "deal_1_2_0", "deal_10_0"])
+    monkeypatch.setattr(
+        "app.documents.memory.pinecone_store.settings.pinecone_api_key", "test"
+    )
+    monkeypatch.setattr(
+        "app.documents.memory.pinecone_store.Pinecone",
+        lambda **_: SimpleNamespace(Index=lambda name: index),
+    )
+    return PineconeVectorStore(
+        content_path=tmp_path / "content.sqlite", embeddings=FakeEmbeddings()
+    )
+
+
+class TestLegacyIds:
+    """Tests for documents indexed with "{doc_id}_{chunk_index}" ids."""
+
+    def test_upsert_replaces_legacy_ids(self, store):
+        store.upsert_document("deal_1", [make_chunk("deal_1", i) for i in range(2)])
+
+        assert store.index.ids == {"deal_1#0", "deal_1#1", "deal_1_2_0", "deal_10_0"}
+
+    def test_delete_removes_legacy_ids_only_of_the_document(self, store):
+        assert store.delete_document("deal_1") == 3
+        assert store.index.ids == {"deal_1_2_0", "deal_10_0"}
+
+
+class TestSearchModes:
+    """Tests for modes Pinecone cannot rank with."""
+
+    @pytest.mark.parametrize("mode", [SearchMode.LEXICAL, SearchMode.HYBRID])
+    def test_non_dense_modes_are_rejected(self, store, mode):
+        query = SearchQuery(query="renewals", mode=mode)
+
+        with pytest.raises(ValueError, match=mode.value):
+            store.search(query)
+        with pytest.raises(ValueError, match=mode.value):
+            asyncio.run(store.asearch_many([SearchQuery(query="q"), query]))
+
+    def test_api_returns_422(self, store, monkeypatch):
+        monkeypatch.setattr("app.documents.router.vector_store", store)
+        client = TestClient(app)
+        query = {"query": "renewals", "mode": "lexical"}
+
+        response = client.post("/documents/search", json=query)
+        batch = client.post("/documents/search/batch", json={"queries": [query]})
+
+        assert response.status_code == batch.status_code == 422
+        assert "not supported by PineconeVectorStore" in response.json()["detail"]
@@ -0,0 +1,133 @@
+"""Tests for the query embedding cache."""
+
+import asyncio
+
+import numpy as np
+import pytest
+
+from app.documents.memory.faiss_store import FAISSVectorStore
+from app.documents.memory.query_cache import QueryEmbeddingCache, query_cache_stats
+from app.documents.schemas import SearchQuery
+from tests.test_faiss_store import EMBEDDING_DIM, FakeEmbeddings, make_chunk
+
+
+class CountingEmbeddings(FakeEmbeddings):
+    """Fake embeddings that count embeddings calls."""
+
+    def __init__(self, *args, **kwargs):
+        self.calls = 0
+
+    def embed_query(self, text: str) -> list[float]:
+        self.calls += 1
+        return super().embed_query(text)
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        self.calls += 1
+        embed = super().embed_query
+        return [embed(text) for text in texts]
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def vector(value: float) -> np.ndarray:
+    return np.full((1, 4), value, np.float32)
+
+
+class TestQueryEmbeddingCache:
+    """Tests for LRU, TTL and the disk tier."""
+
+    def test_normalised_text_hits(self):
+        cache = QueryEmbeddingCache(max_entries=4, ttl=60)
+        cache.put_many("m", ["Healthcare deals"], vector(1))
+
+        (found,) = cache.get_many("m", ["  healthcare   DEALS "])
+
+        np.testing.assert_array_equal(found, [1, 1, 1, 1])
+        assert cache.get_many("other-model", ["healthcare deals"]) == [None]
+        assert (cache.stats.hits, cache.stats.misses) == (1, 1)
+        assert cache.stats.hit_rate == 0.5
+
+    def test_least_recently_used_is_evicted(self):
+        cache = QueryEmbeddingCache(max_entries=2, ttl=60)
+        cache.put_many("m", ["a", "b"], np.vstack([vector(1), vector(2)]))
+        cache.get_many("m", ["a"])
+
+        cache.put_many("m", ["c"], vector(3))
+
+        assert [v is not None for v in cache.get_many("m", ["a", "b", "c"])] == [
+            True,
+            False,
+            True,
+        ]
+        assert len(cache) == 2
+
+    def test_entries_expire(self):
+        clock = Clock()
+        cache = QueryEmbeddingCache(max_entries=4, ttl=60, clock=clock)
+        cache.put_many("m", ["a"], vector(1))
+
+        clock.now += 61
+
+        assert cache.get_many("m", ["a"]) == [None]
+        assert len(cache) == 0
+
+    def test_disk_tier_is_shared(self, tmp_path):
+        path = tmp_path / "query_cache.sqlite"
+        QueryEmbeddingCache(4, 60, path).put_many("m", ["a"], vector(1))
+
+        other = QueryEmbeddingCache(4, 60, path)
+        (found,) = other.get_many("m", ["A"])
+
+        np.testing.assert_array_equal(found, [1, 1, 1, 1])
+        assert other.stats.disk_hits == 1
+        assert other.get_many("m", ["a"])[0] is not None  # Now in memory
+        assert other.stats.disk_hits == 1
+
+
+class TestStoreSearch:
+    """Tests for stores skipping the embeddings call on a hit."""
+
+    @pytest.fixture
+    def store(self):
+        embeddings = CountingEmbeddings()
+        store = FAISSVectorStore(embedding_dim=EMBEDDING_DIM, embeddings=embeddings)
+        store.add_chunks([make_chunk(f"doc_{i}") for i in range(5)])
+        embeddings.calls = 0
+        return store
+
+    def test_repeated_query_is_not_embedded(self, store):
+        first = store.search(SearchQuery(query="healthcare deals"))
+        second = store.search(SearchQuery(query="Healthcare deals"))
+
+        assert store.embeddings.calls == 1
+        assert second.results == first.results
+        stats = query_cache_stats()
+        assert (stats.hits, stats.misses) == (1, 1)
+
+    def test_async_and_batch(self, store):
+        asyncio.run(store.asearch(SearchQuery(query="renewals")))
+
+        store.search_many(
+            [SearchQuery(query="renewals"), SearchQuery(query="healthcare deals")]
+        )
+        asyncio.run(store.asearch(SearchQuery(query="healthcare deals")))
+
+        # Only "healthcare deals" in the batch was embedded
+        assert store.embeddings.calls == 2
+        assert query_cache_stats().hits == 2
+
+    def test_disabled(self, store, monkeypatch):
+        monkeypatch.setattr(
+            "app.documents.memory.query_cache.settings.query_cache_size", 0
+        )
+
+        store.search(SearchQuery(query="renewals"))
+        store.search(SearchQuery(query="renewals"))
+
+        assert store.embeddings.calls == 2
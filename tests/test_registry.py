@@ -0,0 +1,132 @@
+"""Tests for the document registry and GET /documents."""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.documents import router
+from app.documents.memory.registry import DocumentRegistry, document_hash
+from app.documents.schemas import DealOutcome, DocumentSort, SortOrder
+from app.main import app
+from tests.test_faiss_store import make_chunk
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def registry(tmp_path):
+    return DocumentRegistry(tmp_path / "registry.sqlite")
+
+
+def register(registry: DocumentRegistry, doc_id: str, chunks: int = 1, **metadata):
+    registry.upsert(doc_id, [make_chunk(doc_id, i, **metadata) for i in range(chunks)])
+
+
+class TestDocumentHash:
+    """Tests for change detection hashes."""
+
+    def test_ignores_chunk_order(self):
+        chunks = [make_chunk("doc_1", i) for i in range(3)]
+
+        assert document_hash(chunks) == document_hash(chunks[::-1])
+
+    def test_changes_with_content_or_metadata(self):
+        base = document_hash([make_chunk("doc_1")])
+
+        assert document_hash([make_chunk("doc_1", industry="fintech")]) != base
+        edited = make_chunk("doc_1")
+        edited.content += " (edited)"
+        assert document_hash([edited]) != base
+
+
+class TestDocumentRegistry:
+    """Tests for registry writes and queries."""
+
+    def test_reads_before_first_write(self, registry):
+        assert registry.hashes() == {}
+        assert registry.totals() == (0, 0)
+        assert registry.list_documents() == ([], 0)
+        assert not registry.path.exists()
+
+    def test_upsert_and_delete(self, registry):
+        register(registry, "doc_1", chunks=3)
+        register(registry, "doc_2")
+        register(registry, "doc_1", chunks=2)
+        registry.delete("doc_2")
+
+        documents, total = registry.list_documents()
+
+        assert total == 1
+        assert documents[0].doc_id == "doc_1"
+        assert documents[0].chunk_count == 2
+        assert documents[0].metadata["source_file"] == "doc_1.md"
+        assert registry.totals() == (1, 2)
+
+    def test_filter_sort_and_page(self, registry):
+        for i in range(6):
+            register(
+                registry,
+                f"doc_{i}",
+                chunks=i + 1,
+                industry="fintech" if i % 2 else "healthcare",
+                outcome=DealOutcome.WON,
+            )
+
+        documents, total = registry.list_documents(
+            {"industry": "fintech", "outcome": "won"},
+            sort=DocumentSort.CHUNK_COUNT,
+            order=SortOrder.DESC,
+            limit=2,
+            offset=1,
+        )
+
+        assert total == 3
+        assert [d.doc_id for d in documents] == ["doc_3", "doc_1"]
+
+    def test_rejects_unknown_filter(self, registry):
+        with pytest.raises(ValueError):
+            registry.list_documents({"source_file": "x"})
+
+    def test_failed_transaction_rolls_back(self, registry):
+        register(registry, "doc_1")
+
+        with pytest.raises(RuntimeError):
+            with registry.transaction() as writer:
+                writer.delete("doc_1")
+                register(writer, "doc_2")
+                raise RuntimeError("index publish failed")
+
+        assert set(registry.hashes()) == {"doc_1"}
+
+
+class TestListDocumentsEndpoint:
+    """Tests for GET /documents served from the registry."""
+
+    @pytest.fixture(autouse=True)
+    def use_registry(self, registry, monkeypatch):
+        monkeypatch.setattr(router, "document_registry", registry)
+
+    def test_empty(self):
+        data = client.get("/documents").json()
+
+        assert data["status"] == "empty"
+        assert data["documents"] == []
+
+    def test_paginated_and_filtered(self, registry):
+        for i in range(5):
+            register(registry, f"doc_{i}", outcome="won" if i < 3 else "lost")
+
+        response = client.get(
+            "/documents",
+            params={"outcome": "won", "sort": "doc_id", "order": "desc", "limit": 2},
+        )
+        data = response.json()
+
+        assert response.status_code == 200
+        assert data["total"] == 3
+        assert data["total_chunks"] == 5
+        assert [d["doc_id"] for d in data["documents"]] == ["doc_2", "doc_1"]
+
+    def test_validates_parameters(self):
+        assert client.get("/documents", params={"limit": 0}).status_code == 422
+        assert client.get("/documents", params={"sort": "x"}).status_code == 422
+        assert client.get("/documents", params={"doc_type": "x"}).status_code == 422
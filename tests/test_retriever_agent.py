@@ -269,6 +269,28 @@ class TestQueryRewriting:
         assert rewritten == "optimized healthcare deals query"
         retriever_agent.llm.invoke.assert_called_once()
 
+    def test_rewrite_is_cached(self, retriever_agent):
+        """Test that a repeated query reuses its rewrite."""
+        query = "show me healthcare deals that we won"
+
+        first = retriever_agent.retrieve(query, filters={"industry": "healthcare"})
+        second = retriever_agent.retrieve(query, filters={"industry": "healthcare"})
+
+        retriever_agent.llm.invoke.assert_called_once()
+        assert not first.rewrite_cache_hit
+        assert second.rewrite_cache_hit
+        assert second.rewritten_query == first.rewritten_query
+
+    def test_failed_rewrite_is_not_cached(self, retriever_agent, mock_llm_response):
+        """Test that a failed rewrite is retried on the next retrieval."""
+        query = "show me healthcare deals that we won"
+        retriever_agent.llm.invoke = MagicMock(
+            side_effect=[TimeoutError(), mock_llm_response]
+        )
+
+        assert retriever_agent._rewrite_query(query) == query
+        assert retriever_agent._rewrite_query(query) == mock_llm_response.content
+
 
 class TestContextWindowManagement:
     """Tests for context window token management."""
@@ -0,0 +1,89 @@
+"""Tests for the query rewrite cache."""
+
+import sqlite3
+
+from app.documents.rewrite_cache import RewriteCache, prompt_version, rewrite_key
+
+VERSION = prompt_version("system prompt", "user prompt")
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def key(query: str, filters: dict | None = None, version: str = VERSION) -> bytes:
+    return rewrite_key("gpt-4o-mini", version, query, filters)
+
+
+class TestRewriteCache:
+    """Tests for keys, the LRU and the persistent tier."""
+
+    def test_key_normalises_query_and_filter_order(self):
+        assert key("Healthcare  deals we won") == key("healthcare deals we won")
+        assert key("q", {"a": 1, "b": 2}) == key("q", {"b": 2, "a": 1})
+        assert key("q", {"a": 1}) != key("q", {"a": 2})
+        assert key("q") != key("q", version=prompt_version("edited", "user prompt"))
+
+    def test_least_recently_used_is_evicted(self):
+        cache = RewriteCache(max_entries=2, version=VERSION)
+        cache.put(key("a"), "A")
+        cache.put(key("b"), "B")
+        cache.get(key("a"))
+
+        cache.put(key("c"), "C")
+
+        assert [cache.get(key(q)) for q in "abc"] == ["A", None, "C"]
+        assert (cache.stats.hits, cache.stats.misses) == (3, 1)
+
+    def test_persists_across_restarts(self, tmp_path):
+        path = tmp_path / "rewrite_cache.sqlite"
+        RewriteCache(4, VERSION, path).put(key("a"), "A")
+
+        reopened = RewriteCache(4, VERSION, path)
+
+        assert reopened.get(key("a")) == "A"
+        assert reopened.stats.disk_hits == 1
+
+    def test_prompt_versions_share_the_file(self, tmp_path):
+        path = tmp_path / "rewrite_cache.sqlite"
+        RewriteCache(4, VERSION, path).put(key("a"), "A")
+        edited = prompt_version("edited", "user prompt")
+
+        # A worker with the edited prompts starts during a rolling deploy
+        RewriteCache(4, edited, path).put(key("a", version=edited), "A2")
+
+        assert RewriteCache(4, VERSION, path).get(key("a")) == "A"
+        assert RewriteCache(4, edited, path).get(key("a", version=edited)) == "A2"
+
+    def test_old_versions_expire(self, tmp_path):
+        path = tmp_path / "rewrite_cache.sqlite"
+        clock = Clock()
+        RewriteCache(4, VERSION, path, ttl=60, clock=clock).put(key("a"), "A")
+        edited = prompt_version("edited", "user prompt")
+
+        clock.now += 61
+        RewriteCache(4, edited, path, ttl=60, clock=clock).get(key("b"))
+
+        assert RewriteCache(4, VERSION, path, ttl=60, clock=clock).get(key("a")) is None
+
+    def test_files_without_ages_are_migrated(self, tmp_path):
+        path = tmp_path / "rewrite_cache.sqlite"
+        with sqlite3.connect(path) as conn:
+            conn.execute(
+                "CREATE TABLE rewrites (key BLOB PRIMARY KEY, "
+                "prompt_version TEXT NOT NULL, rewritten TEXT NOT NULL)"
+            )
+            conn.execute(
+                "INSERT INTO rewrites VALUES (?, ?, ?)", [key("a"), VERSION, "A"]
+            )
+        conn.close()
+
+        cache = RewriteCache(4, VERSION, path)
+        cache.put(key("b"), "B")
+
+        assert cache.get(key("a")) == "A"
+        assert RewriteCache(4, VERSION, path).get(key("b")) == "B"
@@ -0,0 +1,118 @@
+"""Tests for the sharded FAISS vector store."""
+
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from app.documents.memory.faiss_store import FAISSVectorStore
+from app.documents.memory.sharded_store import ShardedFAISSVectorStore, shard_of
+from app.documents.schemas import SearchQuery
+from tests.test_faiss_store import EMBEDDING_DIM, FakeEmbeddings, make_chunk
+
+
+@pytest.fixture
+def make_sharded_store():
+    """Factory for sharded stores with fake embeddings."""
+    with patch("app.documents.memory.sharded_store.OpenAIEmbeddings", FakeEmbeddings):
+
+        def factory(**kwargs) -> ShardedFAISSVectorStore:
+            kwargs.setdefault("num_shards", 3)
+            return ShardedFAISSVectorStore(embedding_dim=EMBEDDING_DIM, **kwargs)
+
+        yield factory
+
+
+@pytest.fixture
+def chunks():
+    return [
+        make_chunk(f"doc_{i}", industry="healthcare" if i % 4 == 0 else "fintech")
+        for i in range(120)
+    ]
+
+
+class TestShardedSearch:
+    """Tests for fan-out search and top-k merging."""
+
+    @pytest.mark.parametrize("filters", [None, {"industry": "healthcare"}])
+    def test_matches_single_store(self, make_sharded_store, chunks, filters):
+        single = FAISSVectorStore(
+            embedding_dim=EMBEDDING_DIM, index_type="flat", embeddings=FakeEmbeddings()
+        )
+        single.add_chunks(chunks)
+        sharded = make_sharded_store(index_type="flat")
+        sharded.add_chunks(chunks)
+
+        query = SearchQuery(query="doc_8 chunk 0", top_k=10, filters=filters)
+
+        assert sharded.count == single.count == 120
+        assert sharded.search(query) == single.search(query)
+
+    def test_chunks_are_spread_across_shards(self, make_sharded_store, chunks):
+        store = make_sharded_store()
+        store.add_chunks(chunks)
+
+        assert all(shard.count > 0 for shard in store.shards)
+
+    def test_search_many_merges_per_query(self, make_sharded_store, chunks):
+        store = make_sharded_store()
+        store.add_chunks(chunks)
+        queries = [
+            SearchQuery(query="doc_1 chunk 0", top_k=2),
+            SearchQuery(
+                query="doc_4 chunk 0", top_k=4, filters={"industry": "fintech"}
+            ),
+        ]
+
+        responses = store.search_many(queries)
+
+        assert [len(r.results) for r in responses] == [2, 4]
+        assert responses[0].results[0].metadata["doc_id"] == "doc_1"
+        assert all(r.metadata["industry"] == "fintech" for r in responses[1].results)
+
+    def test_asearch_matches_search(self, make_sharded_store, chunks):
+        store = make_sharded_store()
+        asyncio.run(store.aadd_chunks(chunks))
+        query = SearchQuery(query="doc_9 chunk 0", filters={"industry": "fintech"})
+
+        assert asyncio.run(store.asearch(query)) == store.search(query)
+
+
+class TestShardedUpdates:
+    """Tests for document routing and persistence."""
+
+    def test_document_operations_use_one_shard(self, make_sharded_store):
+        store = make_sharded_store()
+        store.add_chunks([make_chunk("doc_1", i) for i in range(5)])
+        shard = store.shards[shard_of("doc_1", store.num_shards)]
+
+        assert shard.count == store.count == 5
+        assert store.delete_document("doc_1") == 5
+        assert store.count == 0
+
+    def test_save_load_keeps_shard_count(self, make_sharded_store, chunks, tmp_path):
+        store = make_sharded_store()
+        store.add_chunks(chunks)
+        store.save(tmp_path)
+
+        loaded = make_sharded_store(index_path=tmp_path, num_shards=5)
+
+        assert loaded.num_shards == 3
+        assert loaded.count == 120
+        response = loaded.search(SearchQuery(query="doc_7 chunk 0", top_k=1))
+        assert response.results[0].metadata["doc_id"] == "doc_7"
+
+    def test_readers_write_nothing(self, make_sharded_store, tmp_path):
+        make_sharded_store(index_path=tmp_path)
+        assert not any(tmp_path.iterdir())
+
+        writer = make_sharded_store(index_path=tmp_path)
+        with writer.transaction() as store:
+            store.add_chunks([make_chunk(f"doc_{i}") for i in range(6)])
+        files = sorted(p.relative_to(tmp_path) for p in tmp_path.rglob("*"))
+
+        reader = make_sharded_store(index_path=tmp_path)
+
+        assert reader.count == 6
+        assert all(shard.wal is None for shard in reader.shards)
+        assert sorted(p.relative_to(tmp_path) for p in tmp_path.rglob("*")) == files
@@ -0,0 +1,118 @@
+"""Tests for single-flight coalescing of identical calls."""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.core.singleflight import SingleFlight, singleflight_stats
+from app.documents.memory.faiss_store import FAISSVectorStore
+from app.documents.schemas import SearchQuery
+from tests.test_faiss_store import EMBEDDING_DIM, FakeEmbeddings, make_chunk
+
+# Set once every caller is waiting on the shared call
+release = threading.Event()
+
+
+def run_concurrently(flight: SingleFlight, key, fn, callers: int) -> list:
+    """Start `callers` threads on flight.do and release fn once all wait."""
+    with ThreadPoolExecutor(max_workers=callers) as pool:
+        futures = [pool.submit(flight.do, key, fn) for _ in range(callers)]
+        while flight.snapshot().coalesced < callers - 1:
+            time.sleep(0.001)
+        release.set()
+        return [future.exception() or future.result() for future in futures]
+
+
+@pytest.fixture(autouse=True)
+def reset_release():
+    release.clear()
+
+
+class TestSingleFlight:
+    """Tests for the coalescing primitive."""
+
+    def test_concurrent_calls_share_one_result(self):
+        flight = SingleFlight("test_share")
+        calls = []
+
+        def call():
+            calls.append(1)
+            release.wait()
+            return ["result"]
+
+        results = run_concurrently(flight, "key", call, callers=4)
+
+        assert calls == [1]
+        assert results == [["result"]] * 4
+        assert singleflight_stats()["test_share"].to_dict() == {
+            "calls": 1,
+            "coalesced": 3,
+        }
+
+    def test_exception_is_shared_and_next_call_is_new(self):
+        flight = SingleFlight("test_error")
+
+        def fail():
+            release.wait()
+            raise ConnectionError("boom")
+
+        results = run_concurrently(flight, "key", fail, callers=3)
+
+        assert all(isinstance(r, ConnectionError) for r in results)
+        assert flight.do("key", lambda: "fresh") == "fresh"
+        assert flight.snapshot().calls == 2
+
+    def test_async(self):
+        flight = SingleFlight("test_async")
+        calls = []
+
+        async def call():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "result"
+
+        async def main():
+            return await asyncio.gather(
+                *(flight.ado("key", call) for _ in range(5)),
+                flight.ado("other", call),
+            )
+
+        assert asyncio.run(main()) == ["result"] * 6
+        assert len(calls) == 2
+        assert flight.snapshot().coalesced == 4
+
+
+class TestConcurrentSearch:
+    """Tests for searches sharing a query embedding call."""
+
+    def test_identical_queries_embed_once(self):
+        class SlowEmbeddings(FakeEmbeddings):
+            calls = 0
+
+            def embed_query(self, text):
+                if "deals" in text:  # Searches wait; ingestion does not
+                    SlowEmbeddings.calls += 1
+                    release.wait()
+                return super().embed_query(text)
+
+        store = FAISSVectorStore(
+            embedding_dim=EMBEDDING_DIM, embeddings=SlowEmbeddings()
+        )
+        store.add_chunks([make_chunk(f"doc_{i}") for i in range(5)])
+        queries = ["healthcare deals", "Healthcare  deals", "healthcare deals"]
+        before = singleflight_stats()["query_embedding"]
+
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            futures = [pool.submit(store.search, SearchQuery(query=q)) for q in queries]
+            while singleflight_stats()["query_embedding"].coalesced < (
+                before.coalesced + 2
+            ):
+                time.sleep(0.001)
+            release.set()
+            responses = [future.result() for future in futures]
+
+        assert SlowEmbeddings.calls == 1
+        assert responses[0].results == responses[1].results == responses[2].results
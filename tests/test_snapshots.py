@@ -0,0 +1,152 @@
+"""Tests for versioned index snapshots and hot reload."""
+
+import os
+from pathlib import Path
+
+import pytest
+
+from app.documents.memory.faiss_store import FAISSVectorStore
+from app.documents.memory.snapshots import SnapshotManager, VersionedVectorStore
+from app.documents.schemas import SearchQuery
+from tests.test_faiss_store import EMBEDDING_DIM, FakeEmbeddings, make_chunk
+
+
+def faiss_factory(path: Path | None) -> FAISSVectorStore:
+    return FAISSVectorStore(
+        embedding_dim=EMBEDDING_DIM, index_path=path, embeddings=FakeEmbeddings()
+    )
+
+
+@pytest.fixture
+def make_versioned(tmp_path):
+    """Factory for versioned stores sharing one root directory."""
+
+    def factory(**kwargs) -> VersionedVectorStore:
+        kwargs.setdefault("gc_grace_seconds", 600)
+        return VersionedVectorStore(faiss_factory, tmp_path, **kwargs)
+
+    return factory
+
+
+def doc_ids(store) -> set[str]:
+    return {meta["doc_id"] for meta in store.get_all_metadata()}
+
+
+class TestSnapshotManager:
+    """Tests for the version directory and pointer."""
+
+    def test_publish_moves_pointer(self, tmp_path):
+        snapshots = SnapshotManager(tmp_path)
+        assert snapshots.current() is None
+
+        first, _ = snapshots.create_version()
+        snapshots.publish(first)
+        second, _ = snapshots.create_version()
+        snapshots.publish(second)
+
+        assert snapshots.current() == second
+        assert (tmp_path / "versions" / first / "RETIRED").exists()
+
+    def test_garbage_collection_keeps_current(self, tmp_path):
+        snapshots = SnapshotManager(tmp_path)
+        versions = [snapshots.create_version()[0] for _ in range(3)]
+        for version in versions:
+            snapshots.publish(version)
+
+        deleted = snapshots.collect_garbage(grace_seconds=0)
+
+        assert sorted(deleted) == sorted(versions[:2])
+        assert snapshots.path_of(versions[2]).exists()
+
+    def test_garbage_collection_respects_grace(self, tmp_path):
+        snapshots = SnapshotManager(tmp_path)
+        old, _ = snapshots.create_version()
+        snapshots.publish(old)
+        snapshots.publish(snapshots.create_version()[0])
+
+        assert snapshots.collect_garbage(grace_seconds=600) == []
+
+    def test_legacy_root_index(self, tmp_path):
+        store = faiss_factory(None)
+        store.add_chunks([make_chunk("doc_1")])
+        store.save(tmp_path)
+
+        snapshots = SnapshotManager(tmp_path)
+
+        assert snapshots.path_of(None) == tmp_path
+        assert faiss_factory(snapshots.path_of(None)).count == 1
+
+    def test_legacy_root_clone_keeps_only_index_files(self, tmp_path):
+        store = faiss_factory(None)
+        store.add_chunks([make_chunk("doc_1")])
+        store.save(tmp_path)
+        (tmp_path / "embedding_cache").mkdir()
+        (tmp_path / "embedding_cache" / "shard_00.sqlite").touch()
+        (tmp_path / "registry.sqlite").touch()
+
+        _, path = SnapshotManager(tmp_path).create_version(tmp_path)
+
+        assert not (path / "embedding_cache").exists()
+        assert not (path / "registry.sqlite").exists()
+        assert (path / "index.faiss").exists()
+        assert faiss_factory(path).count == 1
+
+
+class TestVersionedStore:
+    """Tests for publishing and swapping versions."""
+
+    def test_transaction_publishes_new_version(self, make_versioned):
+        store = make_versioned()
+        store.add_chunks([make_chunk("doc_1")])
+        first = store.version
+
+        with store.transaction() as writer:
+            writer.upsert_document("doc_2", [make_chunk("doc_2")])
+            # Readers keep the published version until commit
+            assert doc_ids(store) == {"doc_1"}
+
+        assert store.version != first
+        assert doc_ids(store) == {"doc_1", "doc_2"}
+
+    def test_failed_transaction_is_discarded(self, make_versioned, tmp_path):
+        store = make_versioned()
+        store.add_chunks([make_chunk("doc_1")])
+        version = store.version
+
+        with pytest.raises(RuntimeError):
+            with store.transaction() as writer:
+                writer.delete_document("doc_1")
+                raise RuntimeError("ingest failed")
+
+        assert store.version == version
+        assert doc_ids(store) == {"doc_1"}
+        assert os.listdir(tmp_path / "versions") == [version]
+
+    def test_other_instances_pick_up_new_version(self, make_versioned):
+        writer = make_versioned()
+        reader = make_versioned()
+        assert reader.count == 0
+
+        writer.add_chunks([make_chunk("doc_1", i) for i in range(3)])
+        reader.poll()
+        reader._reload_thread.join()
+
+        assert reader.version == writer.version
+        response = reader.search(SearchQuery(query="doc_1 chunk 2", top_k=1))
+        assert response.results[0].metadata["chunk_index"] == 2
+
+    def test_refresh_without_new_version_is_noop(self, make_versioned):
+        store = make_versioned()
+        store.add_chunks([make_chunk("doc_1")])
+        served = store.store
+
+        assert store.refresh() is False
+        assert store.store is served
+
+    def test_superseded_versions_are_collected(self, make_versioned, tmp_path):
+        store = make_versioned(gc_grace_seconds=0)
+        for i in range(3):
+            store.add_chunks([make_chunk(f"doc_{i}")])
+
+        assert os.listdir(tmp_path / "versions") == [store.version]
+        assert store.count == 3
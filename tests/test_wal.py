@@ -0,0 +1,212 @@
+"""Tests for the write-ahead log and its replay into FAISS stores."""
+
+import os
+
+import numpy as np
+import pytest
+
+from app.documents.memory.faiss_store import FAISSVectorStore
+from app.documents.memory.snapshots import VersionedVectorStore
+from app.documents.memory.wal import WAL_FILE, WalOp, WriteAheadLog, read_records
+from app.documents.schemas import SearchQuery
+from tests.test_faiss_store import EMBEDDING_DIM, FakeEmbeddings, make_chunk
+
+
+def open_store(path, **kwargs) -> FAISSVectorStore:
+    return FAISSVectorStore(
+        embedding_dim=EMBEDDING_DIM,
+        index_path=path,
+        embeddings=FakeEmbeddings(),
+        **kwargs,
+    )
+
+
+def open_writer(path, **kwargs) -> FAISSVectorStore:
+    store = open_store(path, **kwargs)
+    store.attach_wal(path)
+    return store
+
+
+def doc_ids(store) -> set[str]:
+    return {meta["doc_id"] for meta in store.get_all_metadata()}
+
+
+class TestWriteAheadLog:
+    """Tests for the log file format."""
+
+    def test_records_round_trip(self, tmp_path):
+        log = WriteAheadLog(tmp_path / WAL_FILE)
+        vectors = np.random.default_rng(0).random((2, 4), dtype=np.float32)
+
+        log.append_add([{"doc_id": "a"}, {"doc_id": "b"}], ["x", "y"], vectors)
+        log.append_delete(np.array([1]))
+        log.append_clear()
+
+        records = list(read_records(tmp_path / WAL_FILE))
+        assert [(r.seq, r.op) for r in records] == [
+            (1, WalOp.ADD),
+            (2, WalOp.DELETE),
+            (3, WalOp.CLEAR),
+        ]
+        assert records[0].metadatas == [{"doc_id": "a"}, {"doc_id": "b"}]
+        assert records[0].contents == ["x", "y"]
+        np.testing.assert_array_equal(records[0].array, vectors)
+        np.testing.assert_array_equal(records[1].array, [1])
+        assert [r.seq for r in read_records(tmp_path / WAL_FILE, after_seq=2)] == [3]
+
+    def test_torn_tail_is_dropped(self, tmp_path):
+        file = tmp_path / WAL_FILE
+        log = WriteAheadLog(file)
+        log.append_delete(np.array([0]))
+        log.append_delete(np.array([1]))
+        log.close()
+        with open(file, "r+b") as f:
+            f.truncate(os.path.getsize(file) - 3)
+
+        reopened = WriteAheadLog(file)
+
+        assert reopened.last_seq == 1
+        assert reopened.size == os.path.getsize(file)
+        assert reopened.append_delete(np.array([2])) == 2
+        assert [r.seq for r in read_records(file)] == [1, 2]
+
+    def test_reset_keeps_sequence(self, tmp_path):
+        log = WriteAheadLog(tmp_path / WAL_FILE)
+        log.append_clear()
+        log.reset()
+
+        assert log.size == 0
+        assert log.append_clear() == 2
+
+
+class TestStoreLogging:
+    """Tests for logged writes, replay and compaction."""
+
+    def test_writes_survive_without_save(self, tmp_path):
+        store = open_writer(tmp_path)
+        store.add_chunks([make_chunk(f"doc_{i}") for i in range(3)])
+        store.delete_document("doc_1")
+        store.upsert_document("doc_2", [make_chunk("doc_2", i) for i in range(2)])
+
+        reopened = open_store(tmp_path)
+
+        assert not (tmp_path / "index.faiss").exists()
+        assert reopened.count == store.count == 3
+        assert doc_ids(reopened) == {"doc_0", "doc_2"}
+        response = reopened.search(SearchQuery(query="doc_2 chunk 1", top_k=1))
+        assert response.results[0].metadata["chunk_index"] == 1
+
+    def test_replay_on_top_of_snapshot(self, tmp_path):
+        store = open_writer(tmp_path)
+        store.add_chunks([make_chunk("doc_0")])
+        store.compact()
+        store.add_chunks([make_chunk("doc_1")])
+
+        assert store.log_bytes > 0
+        assert open_store(tmp_path).count == 2
+
+    def test_compaction_empties_log(self, tmp_path):
+        store = open_writer(tmp_path)
+        store.add_chunks([make_chunk("doc_0")])
+        store.compact()
+
+        assert store.log_bytes == 0
+        assert os.path.getsize(tmp_path / WAL_FILE) == 0
+        assert open_store(tmp_path).count == 1
+
+    def test_snapshot_records_are_not_replayed_twice(self, tmp_path):
+        store = open_writer(tmp_path)
+        store.add_chunks([make_chunk("doc_0")])
+        log_copy = (tmp_path / WAL_FILE).read_bytes()
+        store.compact()
+        # Crash between writing the snapshot and emptying the log
+        (tmp_path / WAL_FILE).write_bytes(log_copy)
+
+        assert open_store(tmp_path).count == 1
+
+    def test_clear_is_logged(self, tmp_path):
+        store = open_writer(tmp_path)
+        store.add_chunks([make_chunk("doc_0")])
+        store.clear()
+
+        assert open_store(tmp_path).count == 0
+
+    def test_without_log_transaction_saves(self, tmp_path):
+        store = open_store(tmp_path, wal=False)
+        with store.transaction() as writer:
+            writer.add_chunks([make_chunk("doc_0")])
+
+        assert (tmp_path / "index.faiss").exists()
+        assert not (tmp_path / WAL_FILE).exists()
+
+    def test_reader_leaves_damaged_log_alone(self, tmp_path):
+        store = open_writer(tmp_path)
+        store.add_chunks([make_chunk("doc_0")])
+        with open(tmp_path / WAL_FILE, "ab") as f:
+            f.write(b"torn")
+        damaged = (tmp_path / WAL_FILE).read_bytes()
+
+        reader = open_store(tmp_path)
+
+        assert reader.wal is None
+        assert reader.count == 1
+        assert (tmp_path / WAL_FILE).read_bytes() == damaged
+
+    def test_transaction_attaches_log(self, tmp_path):
+        store = open_store(tmp_path)
+        with store.transaction() as writer:
+            writer.add_chunks([make_chunk("doc_0")])
+
+        assert store.log_bytes > 0
+        assert not (tmp_path / "index.faiss").exists()
+        assert open_store(tmp_path).count == 1
+
+
+class TestVersionedLogging:
+    """Tests for logged writes in versioned stores."""
+
+    @pytest.fixture
+    def versioned(self, tmp_path):
+        return VersionedVectorStore(open_store, tmp_path, gc_grace_seconds=600)
+
+    def test_new_version_links_snapshot(self, versioned, tmp_path):
+        versioned.add_chunks([make_chunk("doc_0")])
+        versioned.compact()
+        base = tmp_path / "versions" / versioned.version
+
+        versioned.add_chunks([make_chunk("doc_1")])
+        new = tmp_path / "versions" / versioned.version
+
+        inode = (base / "index.faiss").stat().st_ino
+        assert (new / "index.faiss").stat().st_ino == inode
+        assert os.path.getsize(new / WAL_FILE) > os.path.getsize(base / WAL_FILE) == 0
+        assert doc_ids(versioned) == {"doc_0", "doc_1"}
+
+    def test_large_log_is_compacted_in_background(
+        self, versioned, tmp_path, monkeypatch
+    ):
+        monkeypatch.setattr(
+            "app.documents.memory.snapshots.settings.faiss_wal_compact_bytes", 0
+        )
+        versioned.add_chunks([make_chunk("doc_0")])
+        versioned._compaction_thread.join()
+
+        current = tmp_path / "versions" / versioned.version
+        assert (current / "index.faiss").exists()
+        assert os.path.getsize(current / WAL_FILE) == 0
+        assert versioned.count == 1
+
+    def test_readers_do_not_modify_published_log(self, versioned, tmp_path):
+        versioned.add_chunks([make_chunk("doc_0")])
+        published = tmp_path / "versions" / versioned.version / WAL_FILE
+        with open(published, "ab") as f:
+            f.write(b"torn")
+        damaged = published.read_bytes()
+
+        reader = VersionedVectorStore(open_store, tmp_path, gc_grace_seconds=600)
+        versioned.add_chunks([make_chunk("doc_1")])
+
+        assert reader.store.wal is None
+        assert reader.count == 1
+        assert published.read_bytes() == damaged
+        assert doc_ids(versioned) == {"doc_0", "doc_1"}